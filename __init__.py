@@ -1,29 +1,78 @@
-from .get_device_type import NODE_CLASS_MAPPINGS as GET_DEVICE_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as GET_DEVICE_DISPLAY_MAPPINGS
-from .add_video_text_watermark import NODE_CLASS_MAPPINGS as TEXT_WATERMARK_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as TEXT_WATERMARK_DISPLAY_MAPPINGS
-from .separate_video_audio import NODE_CLASS_MAPPINGS as SEPARATE_VIDEO_AUDIO_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as SEPARATE_VIDEO_AUDIO_DISPLAY_MAPPINGS
-from .wav2srt import NODE_CLASS_MAPPINGS as WAV2SRT_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as WAV2SRT_DISPLAY_MAPPINGS
-from .load_audio_url import NODE_CLASS_MAPPINGS as LOAD_AUDIO_URL_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as LOAD_AUDIO_URL_DISPLAY_MAPPINGS
-from .load_video_url import NODE_CLASS_MAPPINGS as LOAD_VIDEO_URL_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as LOAD_VIDEO_URL_DISPLAY_MAPPINGS
-from .load_image_url import NODE_CLASS_MAPPINGS as LOAD_IMAGE_URL_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as LOAD_IMAGE_URL_DISPLAY_MAPPINGS
-
-NODE_CLASS_MAPPINGS = {}
-NODE_DISPLAY_NAME_MAPPINGS = {}
-
-NODE_CLASS_MAPPINGS.update(GET_DEVICE_MAPPINGS)
-NODE_CLASS_MAPPINGS.update(TEXT_WATERMARK_MAPPINGS)
-NODE_CLASS_MAPPINGS.update(SEPARATE_VIDEO_AUDIO_MAPPINGS)
-NODE_CLASS_MAPPINGS.update(WAV2SRT_MAPPINGS)
-NODE_CLASS_MAPPINGS.update(LOAD_AUDIO_URL_MAPPINGS)
-NODE_CLASS_MAPPINGS.update(LOAD_VIDEO_URL_MAPPINGS)
-NODE_CLASS_MAPPINGS.update(LOAD_IMAGE_URL_MAPPINGS)
-
-NODE_DISPLAY_NAME_MAPPINGS.update(GET_DEVICE_DISPLAY_MAPPINGS)
-NODE_DISPLAY_NAME_MAPPINGS.update(TEXT_WATERMARK_DISPLAY_MAPPINGS)
-NODE_DISPLAY_NAME_MAPPINGS.update(SEPARATE_VIDEO_AUDIO_DISPLAY_MAPPINGS)
-NODE_DISPLAY_NAME_MAPPINGS.update(WAV2SRT_DISPLAY_MAPPINGS)
-NODE_DISPLAY_NAME_MAPPINGS.update(LOAD_AUDIO_URL_DISPLAY_MAPPINGS)
-NODE_DISPLAY_NAME_MAPPINGS.update(LOAD_VIDEO_URL_DISPLAY_MAPPINGS)
-NODE_DISPLAY_NAME_MAPPINGS.update(LOAD_IMAGE_URL_DISPLAY_MAPPINGS)
+import os
+import importlib
+import threading
 
-__all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
+from .metrics import register_routes
+
+# Node name -> (module, display name). Registration only reads this manifest;
+# a node's module (and the torch/numpy/cv2/torchaudio/requests imports it pulls
+# in) is imported the first time ComfyUI touches the node class.
+NODE_MANIFEST = {
+    "GetDeviceType": ("get_device_type", "Get Device Type"),
+    "GetDeviceCapabilities": ("get_device_type", "Get Device Capabilities"),
+    "AddVideoTextWatermark": ("add_video_text_watermark", "Add Video Text Watermark"),
+    "AddVideoTextWatermarkBatch": ("add_video_text_watermark", "Add Video Text Watermark (Batch)"),
+    "AddImageTextWatermark": ("add_image_text_watermark", "Add Image Text Watermark"),
+    "SeparateVideoAudio": ("separate_video_audio", "Separate Video Audio"),
+    "Wav2Srt": ("wav2srt", "Wav2Srt - Speech to Subtitle"),
+    "LoadAudioByUrl": ("load_audio_url", "Load Audio By URL"),
+    "LoadVideoByUrl": ("load_video_url", "Load Video By URL"),
+    "LoadImageByUrl": ("load_image_url", "Load Image By URL"),
+    "LoadImageBatchByUrl": ("load_image_url", "Load Image Batch By URL"),
+}
+
+# Set LUMA_EAGER_IMPORT=1 to import every node module at startup (surfaces import errors immediately)
+EAGER_IMPORT = os.environ.get("LUMA_EAGER_IMPORT", "0").lower() in ("1", "true", "yes")
+
+_import_lock = threading.Lock()
+
+
+def _load_node_class(node_name):
+    module_name = NODE_MANIFEST[node_name][0]
+    with _import_lock:
+        module = importlib.import_module(f".{module_name}", __name__)
+    return module.NODE_CLASS_MAPPINGS[node_name]
+
+
+class _LazyNodeType(type):
+    """Metaclass for node placeholders that resolve to the real node class on first use.
+
+    Class attributes the placeholder does not define (INPUT_TYPES, RETURN_TYPES,
+    FUNCTION, IS_CHANGED, ...) are read from the real class, and instantiating the
+    placeholder returns an instance of the real class. Attributes ComfyUI sets on
+    the registered class (e.g. RELATIVE_PYTHON_MODULE) stay on the placeholder.
+    """
+
+    def resolve(cls):
+        node_class = cls.__dict__.get("_node_class")
+        if node_class is None:
+            node_class = _load_node_class(cls._node_name)
+            cls._node_class = node_class
+        return node_class
 
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(cls.resolve(), name)
+
+    def __call__(cls, *args, **kwargs):
+        return cls.resolve()(*args, **kwargs)
+
+    def __repr__(cls):
+        return f"<lazy node {cls._node_name} from {NODE_MANIFEST[cls._node_name][0]}>"
+
+
+def _lazy_node(node_name):
+    return _LazyNodeType(node_name, (), {"_node_name": node_name, "_node_class": None, "__module__": __name__})
+
+
+if EAGER_IMPORT:
+    NODE_CLASS_MAPPINGS = {name: _load_node_class(name) for name in NODE_MANIFEST}
+else:
+    NODE_CLASS_MAPPINGS = {name: _lazy_node(name) for name in NODE_MANIFEST}
+NODE_DISPLAY_NAME_MAPPINGS = {name: display_name for name, (_, display_name) in NODE_MANIFEST.items()}
+
+# Expose /luma/metrics on ComfyUI's server (no-op outside ComfyUI)
+register_routes()
+
+__all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
@@ -0,0 +1,135 @@
+import torch
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageColor
+
+from . import metrics
+
+# 与 ffmpeg drawtext 默认的 Sans 字体尽量一致，找不到时回退到 Pillow 内置字体
+FONT_CANDIDATES = ["DejaVuSans.ttf", "Arial.ttf", "arial.ttf", "Helvetica.ttc", "msyh.ttc", "NotoSansCJK-Regular.ttc"]
+
+
+def load_font(font_size):
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, font_size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=font_size)
+    except TypeError:
+        # Pillow < 10.1 的内置字体不支持调整大小
+        return ImageFont.load_default()
+
+
+def parse_color(color):
+    """解析 ffmpeg 风格的颜色：white、#RRGGBB、0xRRGGBB，可带 @透明度（如 white@0.5）"""
+    color = color.strip()
+    alpha = 1.0
+    if "@" in color:
+        color, alpha_str = color.rsplit("@", 1)
+        alpha = float(alpha_str)
+    if color.lower().startswith("0x"):
+        color = "#" + color[2:]
+    rgba = ImageColor.getrgb(color)
+    if len(rgba) == 4:
+        alpha *= rgba[3] / 255.0
+    return rgba[:3], max(0.0, min(1.0, alpha))
+
+
+def render_text_sprite(text, font_size, font_color):
+    """把文本渲染成紧贴字形边界的RGBA精灵，返回 (rgb [h,w,3], alpha [h,w,1]) 浮点数组"""
+    font = load_font(font_size)
+    left, top, right, bottom = font.getbbox(text)
+    width, height = max(1, right - left), max(1, bottom - top)
+
+    rgb, alpha = parse_color(font_color)
+    mask = Image.new("L", (width, height), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255)
+
+    alpha_array = np.asarray(mask, dtype=np.float32)[..., None] / 255.0 * alpha
+    rgb_array = np.broadcast_to(np.array(rgb, dtype=np.float32) / 255.0, (height, width, 3))
+    return rgb_array, alpha_array
+
+
+def sprite_position(position, frame_w, frame_h, sprite_w, sprite_h, margin_x, margin_y):
+    """与 AddVideoTextWatermark 的 drawtext x/y 表达式保持一致"""
+    positions = {
+        "top-left": (margin_x, margin_y),
+        "top-right": (frame_w - sprite_w - margin_x, margin_y),
+        "bottom-left": (margin_x, frame_h - sprite_h - margin_y),
+        "bottom-right": (frame_w - sprite_w - margin_x, frame_h - sprite_h - margin_y),
+        "center": ((frame_w - sprite_w) // 2, (frame_h - sprite_h) // 2),
+    }
+    return positions.get(position, positions["bottom-right"])
+
+
+class AddImageTextWatermark:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "images": ("IMAGE",),
+                "watermark_text": ("STRING", {"default": "Watermark", "multiline": False}),
+                "position": (["top-left", "top-right", "bottom-left", "bottom-right", "center"], {"default": "bottom-right"}),
+                "margin_x": ("INT", {"default": 10, "min": 0, "max": 1000}),
+                "margin_y": ("INT", {"default": 10, "min": 0, "max": 1000}),
+                "font_size": ("INT", {"default": 24, "min": 10, "max": 200}),
+                "font_color": ("STRING", {"default": "white", "multiline": False}),
+            },
+            "optional": {
+                # 直接修改输入张量，省去一次整批拷贝；上游节点的缓存输出也会被改写
+                "inplace": ("BOOLEAN", {"default": False}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE",)
+    RETURN_NAMES = ("images",)
+    FUNCTION = "add_text_watermark"
+    CATEGORY = "Luma"
+
+    @metrics.instrument
+    def add_text_watermark(self, images, watermark_text, position, margin_x, margin_y, font_size, font_color, inplace=False):
+        if not watermark_text:
+            raise ValueError("水印文本不能为空")
+
+        # 文字只渲染一次
+        rgb, alpha = render_text_sprite(watermark_text, font_size, font_color)
+        sprite_h, sprite_w = alpha.shape[:2]
+        frame_h, frame_w = images.shape[1], images.shape[2]
+        x, y = sprite_position(position, frame_w, frame_h, sprite_w, sprite_h, margin_x, margin_y)
+
+        # 裁剪到画面范围内
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame_w, x + sprite_w), min(frame_h, y + sprite_h)
+        output = images if inplace else images.clone()
+        metrics.count("frames_watermarked", images.shape[0])
+        metrics.record_tensor(output)
+        if x0 >= x1 or y0 >= y1:
+            return (output,)
+
+        sx, sy = x0 - x, y0 - y
+        rgb = torch.from_numpy(np.ascontiguousarray(rgb[sy:sy + y1 - y0, sx:sx + x1 - x0]))
+        alpha = torch.from_numpy(np.ascontiguousarray(alpha[sy:sy + y1 - y0, sx:sx + x1 - x0]))
+
+        # 只处理精灵覆盖的区域，并在批次维度上一次性混合：out = src * (1 - a) + color * a
+        roi = output[:, y0:y1, x0:x1, :3]
+        if output.dtype == torch.uint8:
+            # uint8 输出（见 LoadVideoByUrl 的 output_dtype）先转为浮点混合再写回
+            rgb, alpha = rgb.to(output.device) * 255.0, alpha.to(output.device)
+            blended = roi.float().mul_(1.0 - alpha).add_(rgb * alpha)
+            roi.copy_(blended.round_().clamp_(0, 255))
+        else:
+            rgb = rgb.to(device=output.device, dtype=output.dtype)
+            alpha = alpha.to(device=output.device, dtype=output.dtype)
+            roi.mul_(1.0 - alpha).add_(rgb * alpha)
+
+        return (output,)
+
+
+NODE_CLASS_MAPPINGS = {
+    "AddImageTextWatermark": AddImageTextWatermark
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "AddImageTextWatermark": "Add Image Text Watermark"
+}
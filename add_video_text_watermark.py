@@ -2,9 +2,41 @@ import subprocess
 import os
 import folder_paths
 import time
+import glob
+import itertools
+import json
 import random
-import platform
 import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    import comfy.utils
+    import comfy.model_management
+except ImportError:
+    comfy = None
+
+from . import metrics
+from .ffmpeg_utils import find_ffmpeg, detect_hardware_encoders, probe_media, video_packets
+from .ffmpeg_runner import run_ffmpeg, processing_interrupted
+from .result_cache import get_result_cache, input_file_hash
+from .encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE, encoder_config, encoder_args, job_threads, mp4_audio_args
+
+# 需要重编码的时长超过全片的这个比例时，分段拼接不再划算
+SPLICE_MIN_SAVING = 0.9
+
+
+def enable_window(start, end=None):
+    """drawtext 的 enable 表达式，end 为 None 表示到结尾
+
+    逗号用反斜杠转义而不是靠引号包裹：水印文本里的单引号会打乱滤镜参数的引号配对，
+    未转义的逗号就会被当成滤镜分隔符
+    """
+    if end is None:
+        return f"gte(t\\,{start:.3f})"
+    return f"between(t\\,{start:.3f}\\,{end:.3f})"
+
 
 class AddVideoTextWatermark:
     @classmethod
@@ -19,6 +51,14 @@ class AddVideoTextWatermark:
                 "font_size": ("INT", {"default": 24, "min": 10, "max": 200}),
                 "font_color": ("STRING", {"default": "white", "multiline": False}),
                 "use_gpu": (["cpu", "gpu"], {"default": "cpu"}),
+            },
+            "optional": {
+                # 只在这段时间内显示水印（秒），end_time 为 0 表示到视频结尾
+                "start_time": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 86400.0, "step": 0.1}),
+                "end_time": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 86400.0, "step": 0.1}),
+                # 编码速度/质量档位，throughput 适合批量任务；单个视频只影响预设和质量参数，
+                # 线程数交给编码器决定，批量节点还按档位分配每个任务的线程数
+                "encoder_profile": (ENCODER_PROFILES, {"default": DEFAULT_PROFILE}),
             }
         }
 
@@ -27,126 +67,36 @@ class AddVideoTextWatermark:
     FUNCTION = "add_text_watermark"
     CATEGORY = "Luma"
 
+    @classmethod
+    def IS_CHANGED(s, video_path, **kwargs):
+        # 按文件内容判断，而不是路径或修改时间
+        return input_file_hash(video_path)
+
     @staticmethod
     def find_ffmpeg():
         """查找ffmpeg可执行文件的路径"""
-        # 首先尝试使用shutil.which（会检查PATH）
-        ffmpeg_path = shutil.which("ffmpeg")
-        if ffmpeg_path:
-            return ffmpeg_path
-        
-        # 如果找不到，尝试常见的安装路径
-        common_paths = [
-            "/opt/homebrew/bin/ffmpeg",  # macOS Homebrew (Apple Silicon)
-            "/usr/local/bin/ffmpeg",     # macOS Homebrew (Intel) / Linux
-            "/usr/bin/ffmpeg",           # Linux系统路径
-            "C:\\ffmpeg\\bin\\ffmpeg.exe",  # Windows常见路径
-            "C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",  # Windows另一个常见路径
-        ]
-        
-        for path in common_paths:
-            if os.path.exists(path) and os.access(path, os.X_OK):
-                return path
-        
-        return None
+        return find_ffmpeg()
 
     @staticmethod
-    def detect_available_encoders(ffmpeg_path):
-        """检测系统可用的硬件编码器"""
-        available_encoders = {
-            "cpu": "libx264",  # 默认CPU编码器
-            "nvenc": None,
-            "videotoolbox": None,
-            "qsv": None,
-            "amf": None
-        }
-        
-        if not ffmpeg_path:
-            return available_encoders
-        
-        try:
-            # 检查FFmpeg是否可用
-            result = subprocess.run(
-                [ffmpeg_path, "-hide_banner", "-encoders"],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                env=os.environ.copy()
-            )
-            
-            encoders_output = result.stdout + result.stderr
-            
-            # 检测NVIDIA NVENC
-            if "h264_nvenc" in encoders_output:
-                available_encoders["nvenc"] = "h264_nvenc"
-            
-            # 检测Apple VideoToolbox (macOS)
-            if platform.system() == "Darwin" and "h264_videotoolbox" in encoders_output:
-                available_encoders["videotoolbox"] = "h264_videotoolbox"
-            
-            # 检测Intel Quick Sync Video
-            if "h264_qsv" in encoders_output:
-                available_encoders["qsv"] = "h264_qsv"
-            
-            # 检测AMD AMF
-            if "h264_amf" in encoders_output:
-                available_encoders["amf"] = "h264_amf"
-                
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-            pass
-        
-        return available_encoders
+    def detect_available_encoders(ffmpeg_path=None):
+        """检测系统可用的硬件编码器（探测结果在进程内和磁盘上缓存）"""
+        return detect_hardware_encoders()
 
     @staticmethod
-    def get_encoder_config(use_gpu, available_encoders):
+    def get_encoder_config(use_gpu, available_encoders, profile=DEFAULT_PROFILE):
         """根据选择获取编码器配置"""
-        if use_gpu == "cpu":
-            return {
-                "encoder": "libx264",
-                "preset": "medium",
-                "crf": "23",
-                "extra_args": []
-            }
-        
-        # GPU模式：按优先级选择硬件编码器
-        if available_encoders["nvenc"]:
-            return {
-                "encoder": "h264_nvenc",
-                "preset": "p4",  # NVENC预设：p1-p7 (p4是平衡质量和速度)
-                "crf": None,
-                "extra_args": ["-rc", "vbr", "-cq", "23", "-b:v", "0"]  # NVENC使用CQ而不是CRF
-            }
-        elif available_encoders["videotoolbox"]:
-            return {
-                "encoder": "h264_videotoolbox",
-                "preset": None,
-                "crf": None,
-                "extra_args": ["-allow_sw", "1", "-b:v", "5000k", "-realtime", "1"]
-            }
-        elif available_encoders["qsv"]:
-            return {
-                "encoder": "h264_qsv",
-                "preset": "medium",
-                "crf": "23",
-                "extra_args": []
-            }
-        elif available_encoders["amf"]:
-            return {
-                "encoder": "h264_amf",
-                "preset": "balanced",
-                "crf": None,
-                "extra_args": ["-quality", "balanced", "-rc", "vbr_peak", "-qmin", "18", "-qmax", "28"]
-            }
-        else:
-            # 如果没有可用的硬件编码器，回退到CPU
-            return {
-                "encoder": "libx264",
-                "preset": "medium",
-                "crf": "23",
-                "extra_args": []
-            }
+        encoder = "libx264"
+        if use_gpu != "cpu":
+            # GPU模式：按优先级选择硬件编码器，没有可用的硬件编码器时回退到CPU
+            for key in ("nvenc", "videotoolbox", "qsv", "amf"):
+                if available_encoders.get(key):
+                    encoder = available_encoders[key]
+                    break
+        return encoder_config(encoder, profile)
 
-    def add_text_watermark(self, video_path, watermark_text, position, margin_x, margin_y, font_size, font_color, use_gpu):
+    @metrics.instrument
+    def add_text_watermark(self, video_path, watermark_text, position, margin_x, margin_y, font_size, font_color, use_gpu,
+                           start_time=0.0, end_time=0.0, encoder_profile=DEFAULT_PROFILE):
         if not video_path or not os.path.exists(video_path):
             raise ValueError(f"视频文件不存在: {video_path}")
         
@@ -162,12 +112,65 @@ class AddVideoTextWatermark:
         available_encoders = self.detect_available_encoders(ffmpeg_path)
         
         # 获取编码器配置
-        encoder_config = self.get_encoder_config(use_gpu, available_encoders)
+        encoder_config = self.get_encoder_config(use_gpu, available_encoders, encoder_profile)
         
         # 如果选择GPU但没有可用硬件编码器，给出警告但继续使用CPU
         if use_gpu == "gpu" and encoder_config["encoder"] == "libx264":
             print("警告: 未检测到可用的GPU硬件编码器，将使用CPU编码")
 
+        output_path = self.watermark_video(ffmpeg_path, video_path, watermark_text, position, margin_x, margin_y,
+                                           font_size, font_color, encoder_config,
+                                           start_time=start_time, end_time=end_time)
+        return (output_path,)
+
+    @staticmethod
+    def watermark_range(start_time, end_time, duration):
+        """把 start_time/end_time 规范化为 (开始, 结束) 秒；覆盖整个视频时返回 None"""
+        start = max(0.0, float(start_time or 0.0))
+        end = float(end_time or 0.0)
+        if end <= 0 or (duration and end >= duration):
+            end = None
+        if end is not None and end <= start:
+            raise ValueError(f"水印结束时间必须大于开始时间: {start_time} - {end_time}")
+        if start <= 0 and end is None:
+            return None
+        return start, end
+
+    @staticmethod
+    def encoder_args(encoder_config, threads=0):
+        """视频编码参数（编码器、预设、质量、线程数和像素格式）"""
+        return encoder_args(encoder_config, threads) + ["-pix_fmt", "yuv420p"]  # 确保兼容性，大多数播放器都支持
+
+    def watermark_video(self, ffmpeg_path, video_path, watermark_text, position, margin_x, margin_y,
+                        font_size, font_color, encoder_config, threads=0, progress_bar=True, should_cancel=None,
+                        start_time=0.0, end_time=0.0):
+        """给单个视频添加水印并返回输出路径（命中结果缓存时直接返回已有输出）"""
+        try:
+            media_info = probe_media(video_path, ffmpeg_path)
+        except Exception:
+            media_info = {"duration": 0.0, "video": None, "audio": None}
+        duration = media_info["duration"] or None
+        # 源音频可以直接放进MP4时不重新编码
+        audio_args = mp4_audio_args(media_info["audio"]["codec"] if media_info["audio"] else None)
+        time_range = self.watermark_range(start_time, end_time, duration)
+
+        # 相同视频内容和参数已经处理过时直接返回之前的输出
+        result_cache = get_result_cache()
+        cache_key = result_cache.make_key("AddVideoTextWatermark", video_path, {
+            "watermark_text": watermark_text,
+            "position": position,
+            "margin_x": margin_x,
+            "margin_y": margin_y,
+            "font_size": font_size,
+            "font_color": font_color,
+            "encoder_config": encoder_config,
+            "time_range": time_range,
+        })
+        cached = result_cache.get(cache_key)
+        if cached:
+            print(f"命中结果缓存，跳过ffmpeg: {cached[0]}")
+            return cached[0]
+
         # 获取输出目录
         output_dir = folder_paths.get_output_directory()
         os.makedirs(output_dir, exist_ok=True)
@@ -202,31 +205,36 @@ class AddVideoTextWatermark:
         # 构建 drawtext 滤镜参数
         # 使用单引号包裹文本，确保特殊字符被正确处理
         drawtext_filter = f"drawtext=text='{escaped_text}':{text_position}:fontsize={font_size}:fontcolor={font_color}"
+
+        try:
+            # 只给一段时间加水印时，优先只重编码覆盖该时间段的GOP，其余部分直接复制
+            if time_range is not None and self.splice_watermark(
+                    ffmpeg_path, video_path, output_path, drawtext_filter, time_range, media_info,
+                    encoder_config, audio_args, threads, progress_bar, should_cancel):
+                result_cache.put(cache_key, [output_path])
+                return output_path
+        except subprocess.CalledProcessError as e:
+            last_line = (e.stderr or "").strip().splitlines()[-1:] or [str(e)]
+            print(f"警告: 分段拼接失败，改为完整重编码: {last_line[0]}")
+
+        if time_range is not None:
+            # 整段重编码，但滤镜只在时间窗口内生效
+            drawtext_filter += f":enable={enable_window(*time_range)}"
         
         # 构建 ffmpeg 命令
         cmd = [
             ffmpeg_path,
             "-i", video_path,
             "-vf", drawtext_filter,
-            "-c:v", encoder_config["encoder"],
         ]
-        
-        # 添加编码器特定参数
-        if encoder_config["preset"]:
-            cmd.extend(["-preset", encoder_config["preset"]])
-        
-        if encoder_config["crf"]:
-            cmd.extend(["-crf", encoder_config["crf"]])
-        
-        # 添加额外参数
-        cmd.extend(encoder_config["extra_args"])
+        cmd.extend(self.encoder_args(encoder_config, threads))
         
         # 添加通用参数
         cmd.extend([
-            "-pix_fmt", "yuv420p",  # 确保兼容性，大多数播放器都支持
             "-movflags", "+faststart",  # 优化流媒体播放，允许边下载边播放
-            "-c:a", "aac",  # 使用 aac 编码音频，确保兼容性
-            "-b:a", "192k",
+        ])
+        cmd.extend(audio_args)
+        cmd.extend([
             "-avoid_negative_ts", "make_zero",  # 处理时间戳问题
             "-y",  # 覆盖输出文件
             output_path
@@ -234,16 +242,11 @@ class AddVideoTextWatermark:
         
         try:
             # 执行 ffmpeg 命令，确保使用正确的环境变量
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                env=os.environ.copy()
-            )
+            run_ffmpeg(cmd, duration=duration, progress_bar=progress_bar, should_cancel=should_cancel)
             
             if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                return (output_path,)
+                result_cache.put(cache_key, [output_path])
+                return output_path
             else:
                 raise RuntimeError(f"FFmpeg 执行成功但输出文件不存在或为空: {output_path}")
                 
@@ -254,11 +257,246 @@ class AddVideoTextWatermark:
         except FileNotFoundError:
             raise RuntimeError(f"未找到 ffmpeg 可执行文件。已尝试路径: {ffmpeg_path}")
 
+    def splice_watermark(self, ffmpeg_path, video_path, output_path, drawtext_filter, time_range, media_info,
+                         encoder_config, audio_args, threads=0, progress_bar=True, should_cancel=None):
+        """只重编码与水印时间段重叠的GOP，前后部分直接流复制后拼接
+
+        要求源视频是无旋转的 yuv420p H.264，并且能用ffprobe读取包信息；
+        条件不满足或节省不明显时返回 False，由调用方整段重编码。
+        """
+        duration = media_info["duration"]
+        video = media_info["video"]
+        if (not duration or video is None or video["codec"] != "h264" or video.get("pix_fmt") != "yuv420p"
+                or video["rotation"] or not video["fps"]):
+            return False
+        packets = video_packets(video_path, ffmpeg_path)
+        if not packets:
+            return False
+        frame_duration = 1.0 / video["fps"]
+
+        # 解码顺序在关键帧之前的帧都先于它显示（封闭GOP），才能在这个关键帧处切开
+        shown_before = list(itertools.accumulate((pts for pts, _ in packets), max, initial=float("-inf")))
+        shown_after = list(itertools.accumulate((pts for pts, _ in reversed(packets)), min))[::-1]
+
+        def closed_gop(index):
+            return shown_before[index] < packets[index][0] <= shown_after[index]
+
+        first = min(pts for pts, _ in packets)
+        start, end = time_range
+        keyframes = [(index, pts - first) for index, (pts, key) in enumerate(packets) if key]
+        # 重编码区间：水印开始前最近的关键帧 到 水印结束后第一个关键帧
+        head = [(index, pts) for index, pts in keyframes if pts <= start + frame_duration / 2 and closed_gop(index)]
+        tail = [(index, pts) for index, pts in keyframes
+                if end is not None and pts >= end - frame_duration / 2 and closed_gop(index)]
+        start_index, segment_start = head[-1] if head else (0, 0.0)
+        end_index, segment_end = tail[0] if tail else (len(packets), None)
+        encoded = (segment_end if segment_end is not None else duration) - segment_start
+        if encoded >= duration * SPLICE_MIN_SAVING:
+            return False
+
+        print(f"分段水印: 重编码 {segment_start:.3f}s - "
+              f"{segment_end if segment_end is not None else duration:.3f}s，其余部分流复制")
+        temp_dir = tempfile.mkdtemp(prefix="luma_splice_", dir=folder_paths.get_temp_directory())
+        try:
+            # 各片段的H.264参数集不同（重编码片段用的是新的编码参数），所以每个关键帧前都带上
+            # SPS/PPS，拼接后解码器在片段边界自动切换
+            segments = []
+            if start_index > 0:
+                segments.append(os.path.join(temp_dir, "head.mp4"))
+                run_ffmpeg([ffmpeg_path, "-y", "-i", video_path, "-map", "0:v:0", "-frames:v", str(start_index),
+                            "-c:v", "copy", "-bsf:v", "h264_mp4toannexb", segments[-1]],
+                           progress_bar=False, should_cancel=should_cancel)
+
+            # 片段内时间从0开始，滤镜窗口要减去片段起点；定位时留半帧余量避免取整误差
+            window = enable_window(start - segment_start, end - segment_start if end is not None else None)
+            segments.append(os.path.join(temp_dir, "middle.mp4"))
+            cmd = [ffmpeg_path, "-y", "-ss", f"{max(0.0, segment_start - frame_duration / 2):.6f}", "-i", video_path,
+                   "-map", "0:v:0", "-frames:v", str(end_index - start_index),
+                   "-vf", f"{drawtext_filter}:enable={window}"]
+            cmd.extend(self.encoder_args(encoder_config, threads))
+            cmd.extend(["-bsf:v", "dump_extra=freq=keyframe", segments[-1]])
+            run_ffmpeg(cmd, duration=encoded, progress_bar=progress_bar, should_cancel=should_cancel)
+
+            if segment_end is not None:
+                # 流复制时 -ss 落在关键帧之后半帧处，首帧时间戳会是负数，拼接时会和中间片段的最后一帧重叠；
+                # make_zero 让尾段从0开始
+                segments.append(os.path.join(temp_dir, "tail.mp4"))
+                run_ffmpeg([ffmpeg_path, "-y", "-ss", f"{segment_end + frame_duration / 2:.6f}", "-i", video_path,
+                            "-map", "0:v:0", "-c:v", "copy", "-bsf:v", "h264_mp4toannexb",
+                            "-avoid_negative_ts", "make_zero", segments[-1]],
+                           progress_bar=False, should_cancel=should_cancel)
+
+            # 前段和中间片段写明时长，后一段的起点不依赖容器里推算出的片段时长
+            durations = [segment_start] if start_index > 0 else []
+            durations.append(segment_end - segment_start if segment_end is not None else None)
+            list_path = os.path.join(temp_dir, "segments.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for segment, segment_duration in itertools.zip_longest(segments, durations):
+                    escaped = segment.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+                    if segment_duration is not None:
+                        f.write(f"duration {segment_duration:.6f}\n")
+
+            # 拼接视频并复用原始音频
+            run_ffmpeg([ffmpeg_path, "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-i", video_path,
+                        "-map", "0:v:0", "-map", "1:a:0?", "-c:v", "copy"] + audio_args +
+                       ["-movflags", "+faststart", output_path],
+                       progress_bar=False, should_cancel=should_cancel)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return os.path.exists(output_path) and os.path.getsize(output_path) > 0
+
+# 常见视频文件扩展名，用于展开目录输入
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v", ".flv", ".ts")
+
+# 硬件编码器可同时运行的会话数（消费级NVIDIA驱动通常限制为3~8路），可通过环境变量覆盖
+HW_ENCODER_SESSIONS = {
+    "h264_nvenc": int(os.environ.get("LUMA_NVENC_MAX_SESSIONS", 3)),
+    "h264_videotoolbox": 2,
+    "h264_qsv": 4,
+    "h264_amf": 2,
+}
+
+
+class AddVideoTextWatermarkBatch(AddVideoTextWatermark):
+    @classmethod
+    def INPUT_TYPES(s):
+        inputs = AddVideoTextWatermark.INPUT_TYPES()
+        required = {
+            # 每行一个视频路径、目录或通配符（如 /data/clips/*.mp4）
+            "video_paths": ("STRING", {"default": "", "multiline": True}),
+        }
+        required.update({k: v for k, v in inputs["required"].items() if k != "video_path"})
+        # 0 表示根据CPU核心数或硬件编码器会话上限自动决定
+        required["max_workers"] = ("INT", {"default": 0, "min": 0, "max": 64})
+        return {"required": required, "optional": inputs["optional"]}
+
+    RETURN_TYPES = ("STRING", "STRING", "INT")
+    RETURN_NAMES = ("output_video_paths", "report_json", "success_count")
+    FUNCTION = "add_text_watermark_batch"
+    CATEGORY = "Luma"
+
+    @classmethod
+    def IS_CHANGED(s, video_paths, **kwargs):
+        # 按所有输入文件的内容判断
+        return "\n".join(input_file_hash(path) for path in s.expand_paths(video_paths))
+
+    @staticmethod
+    def expand_paths(video_paths):
+        """展开输入：普通路径、目录（其中的视频文件）和通配符"""
+        paths = []
+        for line in video_paths.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if glob.has_magic(line):
+                paths.extend(sorted(p for p in glob.glob(line, recursive=True) if os.path.isfile(p)))
+            elif os.path.isdir(line):
+                paths.extend(sorted(
+                    os.path.join(line, name) for name in os.listdir(line)
+                    if name.lower().endswith(VIDEO_EXTENSIONS)
+                ))
+            else:
+                paths.append(line)
+        # 去重并保持顺序
+        return list(dict.fromkeys(paths))
+
+    @staticmethod
+    def pool_size(encoder, job_count, max_workers=0, profile=DEFAULT_PROFILE):
+        """返回 (并发任务数, 每个任务的编码线程数)"""
+        cpu_count = os.cpu_count() or 1
+        if max_workers > 0:
+            workers = max_workers
+        elif encoder in HW_ENCODER_SESSIONS:
+            workers = HW_ENCODER_SESSIONS[encoder]
+        else:
+            # libx264 单个任务在4线程左右之后扩展性明显下降，多开任务比多开线程更划算；
+            # 每个任务的目标线程数由编码档位决定
+            workers = max(1, cpu_count // (job_threads(encoder, profile) or 4))
+        workers = max(1, min(workers, job_count))
+        threads = 0 if encoder in HW_ENCODER_SESSIONS else max(1, cpu_count // workers)
+        return workers, threads
+
+    @metrics.instrument
+    def add_text_watermark_batch(self, video_paths, watermark_text, position, margin_x, margin_y, font_size,
+                                 font_color, use_gpu, max_workers=0, start_time=0.0, end_time=0.0,
+                                 encoder_profile=DEFAULT_PROFILE):
+        paths = self.expand_paths(video_paths)
+        if not paths:
+            raise ValueError("未提供任何视频文件")
+
+        if not watermark_text:
+            raise ValueError("水印文本不能为空")
+
+        # 查找ffmpeg路径
+        ffmpeg_path = self.find_ffmpeg()
+        if not ffmpeg_path:
+            raise RuntimeError("未找到 ffmpeg，请确保已安装 FFmpeg。常见路径: /opt/homebrew/bin/ffmpeg (macOS), /usr/local/bin/ffmpeg, /usr/bin/ffmpeg")
+
+        encoder_config = self.get_encoder_config(use_gpu, self.detect_available_encoders(ffmpeg_path), encoder_profile)
+        if use_gpu == "gpu" and encoder_config["encoder"] == "libx264":
+            print("警告: 未检测到可用的GPU硬件编码器，将使用CPU编码")
+
+        workers, threads = self.pool_size(encoder_config["encoder"], len(paths), max_workers, encoder_profile)
+        print(f"批量水印: {len(paths)} 个视频, {workers} 个并发任务, 编码器 {encoder_config['encoder']}")
+
+        cancel_event = threading.Event()
+
+        def run_job(video_path):
+            started = time.time()
+            report = {"input": video_path, "output": None, "seconds": 0.0, "error": None}
+            try:
+                if not os.path.exists(video_path):
+                    raise ValueError(f"视频文件不存在: {video_path}")
+                report["output"] = self.watermark_video(
+                    ffmpeg_path, video_path, watermark_text, position, margin_x, margin_y, font_size,
+                    font_color, encoder_config, threads=threads, progress_bar=False,
+                    should_cancel=cancel_event.is_set, start_time=start_time, end_time=end_time,
+                )
+            except Exception as e:
+                report["error"] = str(e)
+            report["seconds"] = round(time.time() - started, 3)
+            return report
+
+        progress_bar = comfy.utils.ProgressBar(len(paths)) if comfy is not None else None
+        reports = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(metrics.bind(run_job), path): index for index, path in enumerate(paths)}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report = future.result()
+                    reports[futures[future]] = report
+                    status = "失败: " + report["error"] if report["error"] else report["output"]
+                    print(f"[{len(reports)}/{len(paths)}] {report['input']} ({report['seconds']}s) -> {status}")
+                    if progress_bar is not None:
+                        progress_bar.update_absolute(len(reports), len(paths))
+                if processing_interrupted():
+                    # 取消排队中的任务并结束正在运行的ffmpeg
+                    cancel_event.set()
+                    for future in pending:
+                        future.cancel()
+                    executor.shutdown(wait=True)
+                    comfy.model_management.throw_exception_if_processing_interrupted()
+
+        ordered = [reports[index] for index in range(len(paths))]
+        outputs = [report["output"] for report in ordered if report["output"]]
+        metrics.count("videos_processed", len(outputs))
+        metrics.count("videos_failed", len(ordered) - len(outputs))
+        if not outputs:
+            raise RuntimeError("所有视频处理失败:\n" + "\n".join(f"{r['input']}: {r['error']}" for r in ordered))
+
+        return ("\n".join(outputs), json.dumps(ordered, ensure_ascii=False), len(outputs))
+
 NODE_CLASS_MAPPINGS = {
-    "AddVideoTextWatermark": AddVideoTextWatermark
+    "AddVideoTextWatermark": AddVideoTextWatermark,
+    "AddVideoTextWatermarkBatch": AddVideoTextWatermarkBatch,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "AddVideoTextWatermark": "Add Video Text Watermark"
+    "AddVideoTextWatermark": "Add Video Text Watermark",
+    "AddVideoTextWatermarkBatch": "Add Video Text Watermark (Batch)",
 }
 
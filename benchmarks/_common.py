@@ -0,0 +1,118 @@
+"""Helpers shared by the benchmark scripts.
+
+The benchmarks import the node modules directly from the repository without
+going through ComfyUI, so they register the repository as a package and
+provide a ``folder_paths`` module that points at a scratch directory.
+"""
+import os
+import sys
+import time
+import types
+import statistics
+import importlib
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "comfyui_luma"
+
+
+def import_module(name):
+    """Import ``<repo>/<name>.py`` as a submodule of the repository package."""
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+def install_folder_paths(base_dir):
+    """Provide ComfyUI's ``folder_paths`` with input/output/temp under ``base_dir``."""
+    module = types.ModuleType("folder_paths")
+    for kind in ("input", "output", "temp"):
+        directory = os.path.join(base_dir, kind)
+        os.makedirs(directory, exist_ok=True)
+        setattr(module, f"get_{kind}_directory", lambda directory=directory: directory)
+    sys.modules["folder_paths"] = module
+    return module
+
+
+def generate_video(path, ffmpeg_path, width=1280, height=720, seconds=10, fps=30, audio=True):
+    """Encode a synthetic H.264/AAC clip with ffmpeg's testsrc2 and sine sources."""
+    if os.path.exists(path):
+        return path
+    cmd = [ffmpeg_path, "-nostdin", "-v", "error", "-y",
+           "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}"]
+    if audio:
+        cmd.extend(["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+                    "-c:a", "aac", "-b:a", "128k"])
+    cmd.extend(["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-g", str(fps * 2), path])
+    subprocess.run(cmd, check=True)
+    return path
+
+
+def generate_audio(path, ffmpeg_path, seconds=60, sample_rate=48000, channels=2):
+    """Write a PCM WAV with a tone that pauses for 1s every 10s (gives silencedetect something to find)."""
+    if os.path.exists(path):
+        return path
+    tone = "sin(2*PI*440*t)*0.5*gt(mod(t\\,10)\\,1)"
+    cmd = [ffmpeg_path, "-nostdin", "-v", "error", "-y",
+           "-f", "lavfi", "-i", f"aevalsrc={tone}:s={sample_rate}:d={seconds}",
+           "-ac", str(channels), "-c:a", "pcm_s16le", path]
+    subprocess.run(cmd, check=True)
+    return path
+
+
+def generate_image(path, width=1920, height=1080, alpha=False):
+    """Save a gradient test image with PIL (RGBA when ``alpha``)."""
+    if os.path.exists(path):
+        return path
+    import numpy as np
+    from PIL import Image
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    channels = [np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                np.broadcast_to((x + y) / 2, (height, width))]
+    if alpha:
+        channels.append(np.broadcast_to(255 - y, (height, width)))
+    pixels = np.stack(channels, axis=-1).astype(np.uint8)
+    Image.fromarray(pixels, "RGBA" if alpha else "RGB").save(path)
+    return path
+
+
+def percentile(samples, q):
+    """Linear-interpolated percentile (``q`` in 0-100) of a non-empty sample list."""
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def git_revision():
+    """Commit hash of the repository and whether the working tree has changes, or None outside git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": bool(status.strip())}
+
+
+def measure(fn, repeat=3, warmup=1):
+    """Run ``fn`` and return wall-clock statistics in seconds plus the last result."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+        "samples": samples,
+    }, result
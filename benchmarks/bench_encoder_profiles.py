@@ -0,0 +1,92 @@
+"""Compare the watermark encoder profiles on a generated clip.
+
+Reports encode fps and output size for every profile of each available H.264
+encoder, using the same ffmpeg arguments as AddVideoTextWatermark. By default
+that is a single-video encode (no -threads limit); --batch-jobs N uses the
+per-job thread count AddVideoTextWatermarkBatch picks for N videos instead.
+
+    python benchmarks/bench_encoder_profiles.py --width 1920 --height 1080 --seconds 10
+    python benchmarks/bench_encoder_profiles.py --batch-jobs 8
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import import_module, install_folder_paths, generate_video, measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--encoders", nargs="+", help="encoders to test (default: all available)")
+    parser.add_argument("--batch-jobs", type=int, default=0,
+                        help="use the per-job threads of a batch of this many videos (0 = single video)")
+    parser.add_argument("--threads", type=int, help="override -threads per encode (0 = ffmpeg default)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "luma_bench"))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    install_folder_paths(args.workdir)
+    ffmpeg_utils = import_module("ffmpeg_utils")
+    ffmpeg_runner = import_module("ffmpeg_runner")
+    encoder_profiles = import_module("encoder_profiles")
+    watermark = import_module("add_video_text_watermark")
+
+    ffmpeg_path = ffmpeg_utils.find_ffmpeg()
+    if not ffmpeg_path:
+        sys.exit("ffmpeg is required to generate the test clip")
+
+    os.makedirs(args.workdir, exist_ok=True)
+    clip = os.path.join(args.workdir, f"testsrc_{args.width}x{args.height}_{args.seconds}s_{args.fps}fps_audio.mp4")
+    generate_video(clip, ffmpeg_path, args.width, args.height, args.seconds, args.fps, audio=True)
+    info = ffmpeg_utils.probe_media(clip, ffmpeg_path)
+    frames = args.seconds * args.fps
+    audio_args = encoder_profiles.mp4_audio_args(info["audio"]["codec"] if info["audio"] else None)
+
+    encoders = args.encoders or [name for name in encoder_profiles.PROFILE_SETTINGS if ffmpeg_utils.has_encoder(name)]
+    output = os.path.join(args.workdir, "profile_output.mp4")
+    drawtext = "drawtext=text='Watermark':x=w-tw-10:y=h-th-10:fontsize=24:fontcolor=white"
+
+    results = []
+    print(f"clip: {clip}")
+    print(f"{'encoder':<20}{'profile':<12}{'threads':>8}{'median s':>10}{'fps':>10}{'size MB':>10}")
+    for encoder in encoders:
+        for profile in encoder_profiles.ENCODER_PROFILES:
+            config = encoder_profiles.encoder_config(encoder, profile)
+            if args.threads is not None:
+                threads = args.threads
+            elif args.batch_jobs > 0:
+                _, threads = watermark.AddVideoTextWatermarkBatch.pool_size(encoder, args.batch_jobs, 0, profile)
+            else:
+                threads = 0
+            cmd = [ffmpeg_path, "-y", "-i", clip, "-vf", drawtext]
+            cmd.extend(watermark.AddVideoTextWatermark.encoder_args(config, threads))
+            cmd.extend(audio_args + ["-movflags", "+faststart", output])
+
+            try:
+                stats, _ = measure(lambda: ffmpeg_runner.run_ffmpeg(cmd, progress_bar=False), repeat=args.repeat)
+            except Exception as e:
+                print(f"{encoder:<20}{profile:<12}{threads:>8} failed: {e}")
+                continue
+            fps = frames / stats["median"] if stats["median"] else 0.0
+            size = os.path.getsize(output)
+            results.append({"encoder": encoder, "profile": profile, "threads": threads, **stats, "fps": fps,
+                            "bytes": size})
+            print(f"{encoder:<20}{profile:<12}{threads:>8}{stats['median']:>10.3f}{fps:>10.1f}{size / 1e6:>10.2f}")
+
+    if os.path.exists(output):
+        os.remove(output)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"clip": clip, "frames": frames, "batch_jobs": args.batch_jobs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Measure how long registering the node package takes.
+
+Each sample imports the package ``__init__`` in a fresh interpreter, the way
+ComfyUI loads custom nodes, once with lazy node modules (the default) and once
+with LUMA_EAGER_IMPORT=1 (every node module imported up front, the old
+behaviour). It also reports which heavy libraries registration pulled in and
+the cost of the first INPUT_TYPES call on every node.
+
+    python benchmarks/bench_import_time.py --repeat 10
+
+Pass --preload torch to import torch before the package, as ComfyUI itself does.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import REPO_ROOT, PACKAGE_NAME
+
+HEAVY_MODULES = ["torch", "torchaudio", "numpy", "cv2", "av", "PIL", "requests", "soundfile"]
+
+SAMPLE = r"""
+import os, sys, json, time, importlib, importlib.util
+sys.path.insert(0, {benchmarks_dir!r})
+from _common import install_folder_paths
+install_folder_paths({workdir!r})
+for name in {preload!r}:
+    importlib.import_module(name)
+before = set(sys.modules)
+
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location({package!r}, os.path.join({repo!r}, "__init__.py"),
+                                              submodule_search_locations=[{repo!r}])
+package = importlib.util.module_from_spec(spec)
+sys.modules[{package!r}] = package
+spec.loader.exec_module(package)
+register = time.perf_counter() - start
+loaded = sorted(name for name in {heavy!r} if name in sys.modules and name not in before)
+
+start = time.perf_counter()
+for node_class in package.NODE_CLASS_MAPPINGS.values():
+    node_class.INPUT_TYPES()
+first_use = time.perf_counter() - start
+
+mismatched = []
+if {check!r}:
+    for name, (module_name, display_name) in package.NODE_MANIFEST.items():
+        module = importlib.import_module(f"{package}.{{module_name}}")
+        if module.NODE_DISPLAY_NAME_MAPPINGS.get(name) != display_name:
+            mismatched.append(name)
+    for module_name in {{module_name for module_name, _ in package.NODE_MANIFEST.values()}}:
+        module = importlib.import_module(f"{package}.{{module_name}}")
+        mismatched.extend(name for name in module.NODE_CLASS_MAPPINGS if name not in package.NODE_MANIFEST)
+
+print(json.dumps({{"register": register, "first_use": first_use, "loaded": loaded, "mismatched": mismatched}}))
+"""
+
+
+def run_sample(eager, args, check=False):
+    code = SAMPLE.format(
+        benchmarks_dir=os.path.dirname(os.path.abspath(__file__)),
+        workdir=args.workdir,
+        preload=args.preload,
+        package=PACKAGE_NAME,
+        repo=REPO_ROOT,
+        heavy=HEAVY_MODULES,
+        check=check,
+    )
+    env = dict(os.environ, LUMA_EAGER_IMPORT="1" if eager else "0")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        sys.exit(f"sample failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--preload", nargs="*", default=[], help="modules to import before the package")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "luma_bench"))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    # One untimed run warms the bytecode cache and checks the manifest against the modules
+    check = run_sample(False, args, check=True)
+    if check["mismatched"]:
+        sys.exit(f"NODE_MANIFEST is out of date for: {', '.join(check['mismatched'])}")
+
+    results = {}
+    print(f"{'mode':<8}{'register ms':>14}{'first use ms':>14}  heavy modules imported at registration")
+    for mode in ("eager", "lazy"):
+        samples = [run_sample(mode == "eager", args) for _ in range(args.repeat)]
+        register = statistics.median(sample["register"] for sample in samples)
+        first_use = statistics.median(sample["first_use"] for sample in samples)
+        loaded = samples[-1]["loaded"]
+        results[mode] = {"register": register, "first_use": first_use, "loaded": loaded,
+                         "samples": [sample["register"] for sample in samples]}
+        print(f"{mode:<8}{register * 1000:>14.1f}{first_use * 1000:>14.1f}  {', '.join(loaded) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"preload": args.preload, "repeat": args.repeat, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""End-to-end benchmark of the media nodes on generated media.
+
+Test media is generated into --workdir (ffmpeg testsrc2/sine, PIL images) and
+served from a local HTTP server, next to a stub ASR endpoint for Wav2Srt. Each
+node then runs in its own interpreter so peak RSS is attributed per node, and
+the results (latency percentiles, throughput, peak RSS, per-stage time from
+the node metrics) are written as JSON tagged with the git commit.
+
+    python benchmarks/bench_nodes.py --json base.json
+    # ...change something...
+    python benchmarks/bench_nodes.py --json new.json --compare base.json
+
+The download/result/transcription caches are cleared before every iteration,
+so downloads, ffmpeg runs and uploads are measured; pass --warm to keep them
+and measure cache hits instead.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import statistics
+import http.server
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import (import_module, install_folder_paths, generate_video, generate_audio, generate_image,
+                     percentile, git_revision)
+
+NODES = ["LoadImageByUrl", "LoadAudioByUrl", "LoadVideoByUrl", "SeparateVideoAudio", "AddVideoTextWatermark",
+         "Wav2Srt"]
+SCHEMA_VERSION = 1
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubAsrHandler(http.server.BaseHTTPRequestHandler):
+    """Accepts any multipart upload and answers with one cue every 5 seconds of the benchmark audio."""
+
+    audio_seconds = 60.0
+    latency = 0.0
+
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                self.rfile.read(size + 2)
+                if size == 0:
+                    break
+        else:
+            remaining = int(self.headers.get("Content-Length", 0))
+            while remaining > 0:
+                remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        time.sleep(self.latency)
+
+        cues = []
+        start = 0.0
+        while start < self.audio_seconds:
+            end = min(start + 5.0, self.audio_seconds)
+            cues.append({"id": len(cues) + 1, "start": start, "end": end, "text": f"cue {len(cues) + 1}"})
+            start = end
+        body = json.dumps({"code": 200, "data": cues}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def prepare_media(args):
+    ffmpeg_utils = import_module("ffmpeg_utils")
+    ffmpeg_path = ffmpeg_utils.find_ffmpeg()
+    if not ffmpeg_path:
+        sys.exit("ffmpeg is required to generate the test media")
+
+    media_dir = os.path.join(args.workdir, "media")
+    os.makedirs(media_dir, exist_ok=True)
+    video = f"testsrc_{args.width}x{args.height}_{args.seconds}s_{args.fps}fps_audio.mp4"
+    audio = f"tone_{args.audio_seconds}s.wav"
+    image = f"gradient_{args.width}x{args.height}_alpha.png"
+    generate_video(os.path.join(media_dir, video), ffmpeg_path, args.width, args.height, args.seconds, args.fps)
+    generate_audio(os.path.join(media_dir, audio), ffmpeg_path, args.audio_seconds)
+    generate_image(os.path.join(media_dir, image), args.width, args.height, alpha=True)
+    return media_dir, {"video": video, "audio": audio, "image": image}, ffmpeg_utils.get_ffmpeg_capabilities()
+
+
+def build_case(node, config):
+    """Return (run, units, unit_name) for one node; ``run()`` executes the node once."""
+    media_dir, media, base_url = config["media_dir"], config["media"], config["media_url"]
+    video_path = os.path.join(media_dir, media["video"])
+    audio_path = os.path.join(media_dir, media["audio"])
+
+    if node == "LoadImageByUrl":
+        instance = import_module("load_image_url").LoadImageByUrl()
+        return partial(instance.load_image, f"{base_url}/{media['image']}"), lambda result: 1, "images"
+    if node == "LoadAudioByUrl":
+        instance = import_module("load_audio_url").LoadAudioByUrl()
+        return (partial(instance.load_audio, f"{base_url}/{media['audio']}"),
+                lambda result: result[0]["waveform"].shape[-1] / result[0]["sample_rate"], "audio_seconds")
+    if node == "LoadVideoByUrl":
+        instance = import_module("load_video_url").LoadVideoByUrl()
+        return (partial(instance.load_video, f"{base_url}/{media['video']}", frame_limit=config["frame_limit"]),
+                lambda result: result[0].shape[0], "frames")
+    if node == "SeparateVideoAudio":
+        instance = import_module("separate_video_audio").SeparateVideoAudio()
+        return (partial(instance.separate, video_path, "mp3", config["video_codec"]),
+                lambda result: config["seconds"], "video_seconds")
+    if node == "AddVideoTextWatermark":
+        instance = import_module("add_video_text_watermark").AddVideoTextWatermark()
+        return (partial(instance.add_text_watermark, video_path, "Benchmark", "bottom-right", 10, 10, 24, "white",
+                        "cpu", encoder_profile=config["encoder_profile"]),
+                lambda result: config["seconds"] * config["fps"], "frames")
+    if node == "Wav2Srt":
+        instance = import_module("wav2srt").Wav2Srt()
+        return (partial(instance.wav2srt, audio_path, config["asr_url"], chunk_seconds=config["chunk_seconds"],
+                        upload_format=config["upload_format"]),
+                lambda result: config["audio_seconds"], "audio_seconds")
+    raise ValueError(f"unknown node {node}")
+
+
+def clear_caches():
+    for module_name, getter in (("download_cache", "get_download_cache"), ("result_cache", "get_result_cache"),
+                                ("transcription_cache", "get_transcription_cache")):
+        getattr(import_module(module_name), getter)().clear()
+
+
+def peak_rss_bytes(who):
+    import resource
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_worker(node, config_path, result_path):
+    """Benchmark one node in this process and write its results to ``result_path``."""
+    import resource
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    install_folder_paths(os.path.join(config["workdir"], "comfy"))
+    metrics = import_module("metrics")
+    run, units_of, unit_name = build_case(node, config)
+
+    samples, units = [], 0
+    for iteration in range(config["warmup"] + config["repeat"]):
+        if not config["warm"]:
+            clear_caches()
+        if iteration == config["warmup"]:
+            metrics.registry.reset()
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        if iteration >= config["warmup"]:
+            samples.append(elapsed)
+            units += units_of(result)
+
+    node_metrics = metrics.registry.snapshot()["nodes"].get(node, {})
+    runs = node_metrics.get("runs") or 1
+    total = sum(samples)
+    report = {
+        "samples": samples,
+        "mean": statistics.mean(samples),
+        "p50": percentile(samples, 50),
+        "p90": percentile(samples, 90),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "min": min(samples),
+        "max": max(samples),
+        "ops_per_second": len(samples) / total if total else 0.0,
+        "unit": unit_name,
+        "units_per_second": units / total if total else 0.0,
+        "peak_rss_bytes": peak_rss_bytes(resource.RUSAGE_SELF),
+        "peak_child_rss_bytes": peak_rss_bytes(resource.RUSAGE_CHILDREN),
+        # Mean seconds per run spent in each stage (download, decode, ffmpeg, upload, ...)
+        "stages": {name: stage["seconds"] / runs for name, stage in node_metrics.get("stages", {}).items()},
+        "counters": {name: value / runs for name, value in node_metrics.get("counters", {}).items()},
+    }
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+
+def compare(current, baseline, threshold):
+    """Print p50/p90/throughput/RSS changes against a previous run; returns the regressed nodes."""
+    base_rev = (baseline.get("git") or {}).get("commit", "?")[:12]
+    print(f"\ncompared with {base_rev} ({baseline.get('created', '?')})")
+    print(f"{'node':<24}{'p50 ms':>12}{'Δp50':>9}{'p90 ms':>12}{'Δp90':>9}{'Δthroughput':>13}{'ΔRSS MB':>10}")
+    regressions = []
+    for node, result in current["results"].items():
+        base = baseline.get("results", {}).get(node)
+        if base is None:
+            print(f"{node:<24}{result['p50'] * 1000:>12.1f}{'new':>9}")
+            continue
+
+        def change(key):
+            return (result[key] - base[key]) / base[key] if base[key] else 0.0
+
+        rss_delta = (result["peak_rss_bytes"] - base["peak_rss_bytes"]) / 1e6
+        flag = ""
+        if change("p50") > threshold:
+            regressions.append(node)
+            flag = "  REGRESSION"
+        print(f"{node:<24}{result['p50'] * 1000:>12.1f}{change('p50'):>+9.1%}{result['p90'] * 1000:>12.1f}"
+              f"{change('p90'):>+9.1%}{change('units_per_second'):>+13.1%}{rss_delta:>+10.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", nargs="+", choices=NODES, default=NODES)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--warm", action="store_true", help="keep the node caches between iterations")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seconds", type=int, default=10, help="test video length")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--audio-seconds", type=int, default=120, help="test audio length (Wav2Srt, LoadAudioByUrl)")
+    parser.add_argument("--frame-limit", type=int, default=0, help="LoadVideoByUrl frame_limit")
+    parser.add_argument("--video-codec", default="copy", help="SeparateVideoAudio video_codec")
+    parser.add_argument("--encoder-profile", default="balanced", help="AddVideoTextWatermark encoder_profile")
+    parser.add_argument("--chunk-seconds", type=int, default=0, help="Wav2Srt chunk_seconds")
+    parser.add_argument("--upload-format", default="original", help="Wav2Srt upload_format")
+    parser.add_argument("--asr-latency", type=float, default=0.05, help="stub ASR processing time per request")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "luma_bench"))
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--config", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.config, args.result)
+        return
+
+    args.workdir = os.path.abspath(args.workdir)
+    install_folder_paths(os.path.join(args.workdir, "comfy"))
+    media_dir, media, ffmpeg_capabilities = prepare_media(args)
+
+    _StubAsrHandler.audio_seconds = float(args.audio_seconds)
+    _StubAsrHandler.latency = args.asr_latency
+    media_server, media_url = start_server(partial(_QuietHandler, directory=media_dir))
+    asr_server, asr_url = start_server(_StubAsrHandler)
+
+    config = {
+        "workdir": args.workdir, "media_dir": media_dir, "media": media, "media_url": media_url,
+        "asr_url": f"{asr_url}/asr", "repeat": args.repeat, "warmup": args.warmup, "warm": args.warm,
+        "seconds": args.seconds, "fps": args.fps, "audio_seconds": args.audio_seconds,
+        "frame_limit": args.frame_limit, "video_codec": args.video_codec, "encoder_profile": args.encoder_profile,
+        "chunk_seconds": args.chunk_seconds, "upload_format": args.upload_format,
+    }
+    config_path = os.path.join(args.workdir, "bench_nodes_config.json")
+    result_path = os.path.join(args.workdir, "bench_nodes_result.json")
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    # Workers keep their persistent caches inside the workdir
+    env = dict(os.environ, LUMA_CACHE_DIR=os.path.join(args.workdir, "cache"), LUMA_METRICS_FILE="")
+    results = {}
+    print(f"{'node':<24}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'throughput':>28}{'peak RSS MB':>13}")
+    try:
+        for node in args.nodes:
+            if os.path.exists(result_path):
+                os.remove(result_path)
+            cmd = [sys.executable, os.path.abspath(__file__), "--worker", node, "--config", config_path,
+                   "--result", result_path]
+            completed = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if completed.returncode != 0 or not os.path.exists(result_path):
+                print(f"{node:<24} failed:\n{completed.stderr[-2000:]}")
+                continue
+            with open(result_path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            results[node] = result
+            throughput = f"{result['units_per_second']:.1f} {result['unit']}/s"
+            print(f"{node:<24}{result['p50'] * 1000:>10.1f}{result['p90'] * 1000:>10.1f}{result['p99'] * 1000:>10.1f}"
+                  f"{throughput:>28}{result['peak_rss_bytes'] / 1e6:>13.1f}")
+    finally:
+        media_server.shutdown()
+        asr_server.shutdown()
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "ffmpeg": ffmpeg_capabilities["version"] if ffmpeg_capabilities else None,
+        },
+        "config": {key: value for key, value in config.items() if key not in ("media_url", "asr_url")},
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}) != report["config"]:
+            print("warning: baseline was recorded with a different configuration")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(f"p50 regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
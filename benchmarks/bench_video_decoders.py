@@ -0,0 +1,74 @@
+"""Compare the LoadVideoByUrl decoder backends on a generated clip.
+
+    python benchmarks/bench_video_decoders.py --width 1920 --height 1080 --seconds 10
+
+The decoder="auto" order comes from a short calibration run the first time it
+is needed; --save-auto-order replaces it with the ranking measured here (at the
+first --threads value), e.g. on clips that look like the real workload.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from _common import import_module, generate_video, measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--threads", type=int, nargs="+", default=[0, 1])
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "luma_bench"))
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--save-auto-order", action="store_true",
+                        help="use this ranking for decoder=\"auto\" on this machine")
+    args = parser.parse_args()
+
+    ffmpeg_utils = import_module("ffmpeg_utils")
+    video_decoders = import_module("video_decoders")
+
+    ffmpeg_path = ffmpeg_utils.find_ffmpeg()
+    if not ffmpeg_path:
+        sys.exit("ffmpeg is required to generate the test clip")
+
+    os.makedirs(args.workdir, exist_ok=True)
+    clip = os.path.join(args.workdir, f"testsrc_{args.width}x{args.height}_{args.seconds}s_{args.fps}fps.mp4")
+    generate_video(clip, ffmpeg_path, args.width, args.height, args.seconds, args.fps, audio=False)
+
+    results = []
+    print(f"clip: {clip}")
+    print(f"{'backend':<10}{'threads':>8}{'frames':>8}{'median s':>10}{'fps':>10}")
+    for backend in video_decoders.available_decoders():
+        for threads in args.threads:
+            def run():
+                count = 0
+                with video_decoders.open_decoder(clip, backend, threads) as decoder:
+                    for _ in decoder.frames(0, 0, args.step):
+                        count += 1
+                return count
+
+            stats, frames = measure(run, repeat=args.repeat)
+            fps = frames / stats["median"] if stats["median"] else 0.0
+            results.append({"backend": backend, "threads": threads, "frames": frames, **stats, "fps": fps})
+            print(f"{backend:<10}{threads:>8}{frames:>8}{stats['median']:>10.3f}{fps:>10.1f}")
+
+    ranking = {result["backend"]: result["fps"] for result in results if result["threads"] == args.threads[0]}
+    if args.save_auto_order:
+        print(f"auto order: {', '.join(video_decoders.save_auto_order(ranking))} (saved)")
+    else:
+        print(f"auto order: {', '.join(video_decoders.auto_order())}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"clip": clip, "step": args.step, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
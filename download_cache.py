@@ -0,0 +1,122 @@
+import os
+import hashlib
+import threading
+import folder_paths
+
+from .file_cache import LRUFileCache
+from .http_session import download_to_file, requests
+
+# Byte budget for downloaded URL assets kept in the input directory (0 = unlimited)
+DEFAULT_MAX_MB = 10 * 1024
+INDEX_NAME = ".luma_url_cache.json"
+
+
+def url_extension(url, default, allowed=None):
+    """Extract a file extension from a URL path, falling back to ``default``."""
+    filename = os.path.basename(url.split("?")[0])
+    _, ext = os.path.splitext(filename)
+    if not ext or (allowed is not None and ext.lower() not in allowed):
+        return default
+    return ext
+
+
+def cache_filename(url, prefix, ext):
+    """Stable local filename for a URL, e.g. ``url_video_<md5>.mp4``."""
+    url_hash = hashlib.md5(url.encode()).hexdigest()
+    return f"{prefix}_{url_hash}{ext}"
+
+
+class _InFlight:
+    """A download in progress that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class DownloadCache(LRUFileCache):
+    """Content cache for assets fetched by the URL loader nodes."""
+
+    metrics_name = "download"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._inflight = {}
+
+    def fetch(self, url, filename, kind="file", timeout=60):
+        """Return a local path for ``url``, downloading it into the cache on a miss.
+
+        Concurrent callers asking for the same file share a single transfer.
+        """
+        if requests is None:
+            raise ImportError("requests library is not installed. Please install it using 'pip install requests'")
+
+        destination_path = self._abs(filename)
+        with self._lock:
+            # Callers arriving while the file is being downloaded wait for that transfer
+            # and are counted as (coalesced) hits rather than misses
+            inflight = self._inflight.get(filename)
+            is_leader = inflight is None
+            if is_leader:
+                if self.get(filename) is not None:
+                    return destination_path
+
+                # Adopt files downloaded before the index existed
+                if os.path.exists(destination_path):
+                    self.put(filename, [destination_path])
+                    return destination_path
+
+                inflight = _InFlight()
+                self._inflight[filename] = inflight
+
+        if not is_leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise RuntimeError(f"Failed to download {kind}: {str(inflight.error)}")
+            with self._lock:
+                entry = self._entries.get(filename)
+                self._count_hit(entry["size"] if entry else 0, coalesced=True)
+            return destination_path
+
+        try:
+            self._download(url, destination_path, kind, timeout)
+            self.put(filename, [destination_path])
+        except Exception as e:
+            inflight.error = e
+            raise RuntimeError(f"Failed to download {kind}: {str(e)}")
+        finally:
+            with self._lock:
+                self._inflight.pop(filename, None)
+            inflight.done.set()
+
+        return destination_path
+
+    @staticmethod
+    def _download(url, destination_path, kind, timeout):
+        """Stream ``url`` to a temp file and atomically rename it into place."""
+        print(f"Downloading {kind} from {url} to {destination_path}...")
+        tmp_path = f"{destination_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            download_to_file(url, tmp_path, timeout=timeout)
+            # Readers only ever see the complete file under its final name
+            os.replace(tmp_path, destination_path)
+        finally:
+            # Clean up if download failed
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_download_cache():
+    """Return the process-wide download cache for the current input directory."""
+    input_dir = folder_paths.get_input_directory()
+    with _caches_lock:
+        cache = _caches.get(input_dir)
+        if cache is None:
+            max_mb = int(os.environ.get("LUMA_URL_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            cache = DownloadCache(input_dir, INDEX_NAME, max_bytes=max_mb * 1024 * 1024)
+            _caches[input_dir] = cache
+        return cache
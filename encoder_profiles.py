@@ -0,0 +1,84 @@
+# 编码速度/质量档位：throughput 适合批量任务，balanced 与原来的默认参数一致，quality 用于最终成片
+ENCODER_PROFILES = ["throughput", "balanced", "quality"]
+DEFAULT_PROFILE = "balanced"
+
+# 每种编码器在各档位下的预设和质量参数（CRF/CQ越小质量越高、文件越大）
+# job_threads: 批量并行时每个任务的目标线程数，档位越快，越倾向于多开任务而不是多开线程；
+# 单个视频的节点不限制线程数（交给编码器自己决定），档位只影响预设和质量参数
+PROFILE_SETTINGS = {
+    "libx264": {
+        "throughput": {"preset": "veryfast", "crf": "26", "extra_args": [], "job_threads": 2},
+        "balanced": {"preset": "medium", "crf": "23", "extra_args": [], "job_threads": 4},
+        "quality": {"preset": "slow", "crf": "20", "extra_args": [], "job_threads": 8},
+    },
+    "h264_nvenc": {
+        # NVENC预设：p1-p7，使用CQ而不是CRF
+        "throughput": {"preset": "p1", "crf": None, "extra_args": ["-rc", "vbr", "-cq", "27", "-b:v", "0"]},
+        "balanced": {"preset": "p4", "crf": None, "extra_args": ["-rc", "vbr", "-cq", "23", "-b:v", "0"]},
+        "quality": {"preset": "p6", "crf": None, "extra_args": ["-rc", "vbr", "-cq", "19", "-b:v", "0"]},
+    },
+    "h264_videotoolbox": {
+        "throughput": {"preset": None, "crf": None, "extra_args": ["-allow_sw", "1", "-b:v", "3000k", "-realtime", "1"]},
+        "balanced": {"preset": None, "crf": None, "extra_args": ["-allow_sw", "1", "-b:v", "5000k", "-realtime", "1"]},
+        "quality": {"preset": None, "crf": None, "extra_args": ["-allow_sw", "1", "-b:v", "8000k"]},
+    },
+    "h264_qsv": {
+        "throughput": {"preset": "veryfast", "crf": "26", "extra_args": []},
+        "balanced": {"preset": "medium", "crf": "23", "extra_args": []},
+        "quality": {"preset": "slow", "crf": "20", "extra_args": []},
+    },
+    "h264_amf": {
+        "throughput": {"preset": "speed", "crf": None,
+                       "extra_args": ["-quality", "speed", "-rc", "vbr_peak", "-qmin", "20", "-qmax", "32"]},
+        "balanced": {"preset": "balanced", "crf": None,
+                     "extra_args": ["-quality", "balanced", "-rc", "vbr_peak", "-qmin", "18", "-qmax", "28"]},
+        "quality": {"preset": "quality", "crf": None,
+                    "extra_args": ["-quality", "quality", "-rc", "vbr_peak", "-qmin", "16", "-qmax", "24"]},
+    },
+}
+
+# 可以直接复制进MP4容器的音频编码
+MP4_AUDIO_CODECS = {"aac", "mp3", "alac", "ac3", "eac3"}
+
+
+def encoder_config(encoder, profile=DEFAULT_PROFILE):
+    """返回编码器在指定档位下的配置：{"encoder", "preset", "crf", "extra_args"}"""
+    settings = PROFILE_SETTINGS.get(encoder)
+    if settings is None:
+        raise ValueError(f"不支持的视频编码器: {encoder}")
+    if profile not in settings:
+        raise ValueError(f"未知的编码档位: {profile}，可选: {', '.join(ENCODER_PROFILES)}")
+    config = settings[profile]
+    return {
+        "encoder": encoder,
+        "preset": config["preset"],
+        "crf": config["crf"],
+        "extra_args": list(config["extra_args"]),
+    }
+
+
+def job_threads(encoder, profile=DEFAULT_PROFILE):
+    """批量并行时每个任务的目标线程数；硬件编码器返回 0（不限制）"""
+    return PROFILE_SETTINGS.get(encoder, {}).get(profile, {}).get("job_threads", 0)
+
+
+def encoder_args(config, threads=0):
+    """把编码器配置转换为ffmpeg视频编码参数"""
+    args = ["-c:v", config["encoder"]]
+    if config["preset"]:
+        args.extend(["-preset", config["preset"]])
+    if config["crf"]:
+        args.extend(["-crf", config["crf"]])
+    args.extend(config["extra_args"])
+
+    # 批量并行编码时限制每个任务的线程数
+    if threads > 0:
+        args.extend(["-threads", str(threads)])
+    return args
+
+
+def mp4_audio_args(source_codec, bitrate="192k"):
+    """输出MP4时的音频参数：源音频编码兼容时直接复制，否则转码为AAC"""
+    if source_codec in MP4_AUDIO_CODECS:
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", bitrate]
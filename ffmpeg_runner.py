@@ -0,0 +1,169 @@
+import os
+import threading
+import subprocess
+from collections import deque
+
+from . import metrics
+
+try:
+    import comfy.utils
+    import comfy.model_management
+except ImportError:
+    comfy = None
+
+# 失败时保留的ffmpeg stderr末尾行数
+STDERR_TAIL_LINES = 200
+
+
+def _parse_speed(value):
+    try:
+        return float(value.rstrip("x"))
+    except (AttributeError, ValueError):
+        return None
+
+
+class FFmpegJob:
+    """在后台运行一个ffmpeg进程，增量读取 -progress 输出
+
+    stderr 只保留最后 ``stderr_lines`` 行，内存占用不随日志量增长。
+    """
+
+    def __init__(self, cmd, duration=None, stderr_lines=STDERR_TAIL_LINES):
+        # -progress 是全局参数，放在可执行文件之后即可
+        self.cmd = [cmd[0], "-progress", "pipe:1", "-nostats"] + list(cmd[1:])
+        self.duration = duration if duration and duration > 0 else None
+        self.stderr_tail = deque(maxlen=stderr_lines)
+        self.progress = {}
+        self.cancelled = False
+        self.process = None
+        self._threads = []
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+            env=os.environ.copy()
+        )
+        for target, stream in ((self._read_progress, self.process.stdout), (self._read_stderr, self.process.stderr)):
+            thread = threading.Thread(target=target, args=(stream,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _read_progress(self, stream):
+        block = {}
+        for line in stream:
+            key, sep, value = line.strip().partition("=")
+            if not sep:
+                continue
+            block[key] = value
+            if key == "progress":
+                # 每个进度块以 progress=continue/end 结尾
+                self.progress = self._summarize(block)
+                block = {}
+
+    def _read_stderr(self, stream):
+        for line in stream:
+            self.stderr_tail.append(line.rstrip("\n"))
+
+    def _summarize(self, block):
+        out_time_us = block.get("out_time_us") or block.get("out_time_ms")
+        try:
+            out_time = max(0.0, int(out_time_us) / 1_000_000)
+        except (TypeError, ValueError):
+            out_time = 0.0
+
+        percent = None
+        if self.duration:
+            percent = min(100.0, out_time / self.duration * 100)
+        if block.get("progress") == "end":
+            percent = 100.0
+
+        try:
+            fps = float(block.get("fps", 0))
+        except ValueError:
+            fps = 0.0
+
+        return {
+            "frame": int(block.get("frame", 0) or 0),
+            "fps": fps,
+            "speed": _parse_speed(block.get("speed")),
+            "out_time": out_time,
+            "percent": percent,
+            "done": block.get("progress") == "end",
+        }
+
+    def cancel(self):
+        """立即结束ffmpeg；被取消任务的输出会被丢弃，不需要等待编码器刷新"""
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.cancelled = True
+        self.process.kill()
+        self.process.wait()
+
+    def wait(self, on_progress=None, should_cancel=None, poll_interval=0.25):
+        """等待进程结束；期间定期回调 on_progress(progress)，should_cancel() 为真时取消"""
+        last_progress = None
+        while True:
+            try:
+                self.process.wait(timeout=poll_interval)
+                finished = True
+            except subprocess.TimeoutExpired:
+                finished = False
+
+            progress = self.progress
+            if on_progress is not None and progress and progress is not last_progress:
+                on_progress(progress)
+                last_progress = progress
+
+            if finished:
+                break
+            if should_cancel is not None and should_cancel():
+                self.cancel()
+                break
+
+        for thread in self._threads:
+            thread.join(timeout=5)
+        return self.process.returncode
+
+    @property
+    def stderr(self):
+        return "\n".join(self.stderr_tail)
+
+
+def processing_interrupted():
+    """用户是否在ComfyUI队列中中断了当前任务"""
+    return comfy is not None and comfy.model_management.processing_interrupted()
+
+
+def run_ffmpeg(cmd, duration=None, on_progress=None, progress_bar=True, should_cancel=None):
+    """运行ffmpeg并把进度显示在ComfyUI进度条上
+
+    与 ``subprocess.run(check=True)`` 一致，失败时抛出 CalledProcessError（stderr 为末尾日志）；
+    用户在队列中中断时终止ffmpeg并抛出ComfyUI的中断异常。传入 should_cancel 时改为由调用方
+    判断是否取消，取消后抛出 RuntimeError（供并发任务使用，避免多个线程争抢中断标志）。
+    """
+    progress_bar = comfy.utils.ProgressBar(100) if progress_bar and comfy is not None else None
+
+    def report(progress):
+        if progress_bar is not None and progress["percent"] is not None:
+            progress_bar.update_absolute(int(progress["percent"]), 100)
+        if on_progress is not None:
+            on_progress(progress)
+
+    with metrics.stage("ffmpeg"):
+        job = FFmpegJob(cmd, duration=duration).start()
+        returncode = job.wait(on_progress=report, should_cancel=should_cancel or processing_interrupted)
+    metrics.count("ffmpeg_frames", job.progress.get("frame", 0))
+
+    if job.cancelled:
+        if should_cancel is None and comfy is not None:
+            comfy.model_management.throw_exception_if_processing_interrupted()
+        raise RuntimeError("FFmpeg 任务已取消")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, job.cmd, output="", stderr=job.stderr)
+    return job
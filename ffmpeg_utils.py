@@ -0,0 +1,534 @@
+import os
+import re
+import json
+import shutil
+import struct
+import platform
+import threading
+import subprocess
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from . import metrics
+from .file_cache import get_cache_dir
+
+_ffmpeg_path = None
+_capabilities = {}
+_capabilities_lock = threading.Lock()
+# 编码器试编码结果：(ffmpeg路径, 编码器) -> 是否可用，每个进程只测试一次
+_usable_encoders = {}
+_usable_encoders_lock = threading.Lock()
+
+
+def find_ffmpeg():
+    """查找ffmpeg可执行文件的路径（找到后在进程内缓存）"""
+    global _ffmpeg_path
+    if _ffmpeg_path and os.path.exists(_ffmpeg_path):
+        return _ffmpeg_path
+    _ffmpeg_path = _search_ffmpeg()
+    return _ffmpeg_path
+
+
+def _search_ffmpeg():
+    # 首先尝试使用shutil.which（会检查PATH）
+    ffmpeg_path = shutil.which("ffmpeg")
+    if ffmpeg_path:
+        return ffmpeg_path
+
+    # 如果找不到，尝试常见的安装路径
+    common_paths = [
+        "/opt/homebrew/bin/ffmpeg",  # macOS Homebrew (Apple Silicon)
+        "/usr/local/bin/ffmpeg",     # macOS Homebrew (Intel) / Linux
+        "/usr/bin/ffmpeg",           # Linux系统路径
+        "C:\\ffmpeg\\bin\\ffmpeg.exe",  # Windows常见路径
+        "C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",  # Windows另一个常见路径
+    ]
+
+    for path in common_paths:
+        if os.path.exists(path) and os.access(path, os.X_OK):
+            return path
+
+    return None
+
+
+def _run_listing(ffmpeg_path, flag):
+    """运行 `ffmpeg -hide_banner <flag>` 并返回输出文本"""
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, "-hide_banner", flag],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            env=os.environ.copy()
+        )
+        return result.stdout + result.stderr
+    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
+        return ""
+
+
+def _parse_codec_listing(output):
+    """解析 -encoders / -decoders 的输出，返回名称集合"""
+    names = set()
+    in_table = False
+    for line in output.splitlines():
+        if line.strip().startswith("------"):
+            in_table = True
+            continue
+        parts = line.split()
+        if in_table and len(parts) >= 2:
+            names.add(parts[1])
+    return names
+
+
+def _parse_filter_listing(output):
+    names = set()
+    for line in output.splitlines():
+        match = re.match(r"^\s*[T.][S.][C.]\s+(\S+)\s+\S*->\S*", line)
+        if match:
+            names.add(match.group(1))
+    return names
+
+
+def _parse_hwaccel_listing(output):
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    if lines and lines[0].startswith("Hardware acceleration methods"):
+        lines = lines[1:]
+    return lines
+
+
+def _probe_capabilities(ffmpeg_path):
+    version_output = _run_listing(ffmpeg_path, "-version")
+    match = re.search(r"ffmpeg version (\S+)", version_output)
+    return {
+        "path": ffmpeg_path,
+        "version": match.group(1) if match else None,
+        "encoders": sorted(_parse_codec_listing(_run_listing(ffmpeg_path, "-encoders"))),
+        "decoders": sorted(_parse_codec_listing(_run_listing(ffmpeg_path, "-decoders"))),
+        "filters": sorted(_parse_filter_listing(_run_listing(ffmpeg_path, "-filters"))),
+        "hwaccels": _parse_hwaccel_listing(_run_listing(ffmpeg_path, "-hwaccels")),
+    }
+
+
+def _capabilities_cache_path():
+    return os.path.join(get_cache_dir(), "ffmpeg_capabilities.json")
+
+
+def get_ffmpeg_capabilities(refresh=False, persist=True):
+    """探测ffmpeg的版本、编码器、解码器、滤镜和硬件加速方式
+
+    每个进程每个ffmpeg二进制只探测一次；persist=True 时结果还会按二进制的
+    路径、大小和修改时间写入磁盘缓存，重启后无需再次探测。ffmpeg不可用时返回 None。
+    """
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        return None
+
+    stat = os.stat(ffmpeg_path)
+    key = f"{os.path.realpath(ffmpeg_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    with _capabilities_lock:
+        if not refresh and key in _capabilities:
+            return _capabilities[key]
+
+        capabilities = None
+        disk_cache = {}
+        if persist:
+            try:
+                with open(_capabilities_cache_path(), "r", encoding="utf-8") as f:
+                    disk_cache = json.load(f)
+            except (OSError, ValueError):
+                disk_cache = {}
+            if not refresh:
+                capabilities = disk_cache.get(key)
+
+        if capabilities is None:
+            capabilities = _probe_capabilities(ffmpeg_path)
+            if persist:
+                disk_cache[key] = capabilities
+                tmp_path = f"{_capabilities_cache_path()}.{os.getpid()}.tmp"
+                try:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(disk_cache, f)
+                    os.replace(tmp_path, _capabilities_cache_path())
+                except OSError as e:
+                    print(f"警告: 无法写入ffmpeg能力缓存: {e}")
+
+        _capabilities[key] = capabilities
+        return capabilities
+
+
+def has_encoder(name):
+    capabilities = get_ffmpeg_capabilities()
+    return bool(capabilities) and name in capabilities["encoders"]
+
+
+def encoder_usable(name):
+    """用1帧试编码检查编码器在本机能否真正使用（结果在进程内缓存）
+
+    发行版和静态编译的ffmpeg通常都带 h264_nvenc / h264_qsv，
+    但没有对应硬件或驱动时打开编码器就会失败。
+    """
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path or not has_encoder(name):
+        return False
+    key = (ffmpeg_path, name)
+    with _usable_encoders_lock:
+        if key not in _usable_encoders:
+            cmd = [ffmpeg_path, "-hide_banner", "-nostdin", "-v", "error",
+                   "-f", "lavfi", "-i", "color=black:size=256x256:rate=25", "-frames:v", "1",
+                   "-pix_fmt", "yuv420p", "-c:v", name, "-f", "null", "-"]
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=30, env=os.environ.copy())
+                _usable_encoders[key] = result.returncode == 0
+            except (OSError, subprocess.TimeoutExpired):
+                _usable_encoders[key] = False
+        return _usable_encoders[key]
+
+
+def compiled_hardware_encoders():
+    """返回ffmpeg编译进来的H.264硬件编码器，键为编码器类型，没有时值为 None（不代表本机可用）"""
+    capabilities = get_ffmpeg_capabilities()
+    encoders = set(capabilities["encoders"]) if capabilities else set()
+    return {
+        "cpu": "libx264",  # 默认CPU编码器
+        # NVIDIA NVENC
+        "nvenc": "h264_nvenc" if "h264_nvenc" in encoders else None,
+        # Apple VideoToolbox (仅macOS)
+        "videotoolbox": "h264_videotoolbox" if platform.system() == "Darwin" and "h264_videotoolbox" in encoders else None,
+        # Intel Quick Sync Video
+        "qsv": "h264_qsv" if "h264_qsv" in encoders else None,
+        # AMD AMF
+        "amf": "h264_amf" if "h264_amf" in encoders else None,
+    }
+
+
+def detect_hardware_encoders():
+    """返回系统可用的H.264编码器，键为编码器类型，不可用时值为 None
+
+    只包含编译进ffmpeg且试编码成功的硬件编码器。
+    """
+    return {key: encoder if key == "cpu" or (encoder and encoder_usable(encoder)) else None
+            for key, encoder in compiled_hardware_encoders().items()}
+
+
+def find_ffprobe(ffmpeg_path=None):
+    """查找ffprobe，优先使用与ffmpeg同目录的版本"""
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if ffmpeg_path:
+        directory, name = os.path.split(ffmpeg_path)
+        candidate = os.path.join(directory, name.replace("ffmpeg", "ffprobe"))
+        if candidate != ffmpeg_path and os.path.exists(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    return shutil.which("ffprobe")
+
+
+def _parse_rate(value):
+    """解析 "30000/1001" 形式的帧率"""
+    try:
+        if "/" in str(value):
+            num, den = str(value).split("/", 1)
+            return float(num) / float(den) if float(den) else 0.0
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _probe_with_ffprobe(ffprobe_path, path):
+    result = subprocess.run(
+        [ffprobe_path, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True,
+        text=True,
+        timeout=30,
+        env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe 执行失败: {result.stderr}")
+    data = json.loads(result.stdout)
+
+    info = {"duration": _parse_rate(data.get("format", {}).get("duration")), "video": None, "audio": None}
+    for stream in data.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type == "video" and info["video"] is None:
+            rotation = 0
+            for side_data in stream.get("side_data_list", []):
+                if "rotation" in side_data:
+                    rotation = int(side_data["rotation"])
+            rotation = int(stream.get("tags", {}).get("rotate", rotation))
+            info["video"] = {
+                "codec": stream.get("codec_name"),
+                "pix_fmt": stream.get("pix_fmt"),
+                "width": int(stream.get("width", 0)),
+                "height": int(stream.get("height", 0)),
+                "fps": _parse_rate(stream.get("avg_frame_rate")) or _parse_rate(stream.get("r_frame_rate")),
+                "frame_count": int(stream.get("nb_frames", 0) or 0),
+                "rotation": rotation,
+            }
+        elif codec_type == "audio" and info["audio"] is None:
+            info["audio"] = {
+                "codec": stream.get("codec_name"),
+                "sample_rate": int(stream.get("sample_rate", 0) or 0),
+                "channels": int(stream.get("channels", 0) or 0),
+            }
+    return info
+
+
+_CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "quad": 4, "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+def _probe_with_ffmpeg(ffmpeg_path, path):
+    """没有ffprobe时，解析 `ffmpeg -i` 的输出"""
+    result = subprocess.run(
+        [ffmpeg_path, "-hide_banner", "-nostdin", "-i", path],
+        capture_output=True,
+        text=True,
+        timeout=30,
+        env=os.environ.copy()
+    )
+    output = result.stderr
+
+    info = {"duration": 0.0, "video": None, "audio": None}
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    for line in output.splitlines():
+        line = line.strip()
+        if info["video"] is None and re.match(r"Stream #\d+:\d+.*: Video: ", line):
+            codec = re.search(r"Video: (\w+)", line).group(1)
+            pix_fmt = re.search(r"Video: [^,]+, (\w+)", line)
+            size = re.search(r", (\d{2,5})x(\d{2,5})", line)
+            fps = re.search(r", (\d+(?:\.\d+)?)k? fps", line)
+            info["video"] = {
+                "codec": codec,
+                "pix_fmt": pix_fmt.group(1) if pix_fmt else None,
+                "width": int(size.group(1)) if size else 0,
+                "height": int(size.group(2)) if size else 0,
+                "fps": float(fps.group(1)) if fps else 0.0,
+                "frame_count": 0,
+                "rotation": 0,
+            }
+        elif info["audio"] is None and re.match(r"Stream #\d+:\d+.*: Audio: ", line):
+            codec = re.search(r"Audio: (\w+)", line).group(1)
+            rate = re.search(r", (\d+) Hz", line)
+            layout = re.search(r" Hz, ([^,]+)", line)
+            channels = 0
+            if layout:
+                layout = layout.group(1).strip()
+                count = re.match(r"(\d+) channels", layout)
+                channels = int(count.group(1)) if count else _CHANNEL_LAYOUTS.get(layout.split("(")[0], 0)
+            info["audio"] = {
+                "codec": codec,
+                "sample_rate": int(rate.group(1)) if rate else 0,
+                "channels": channels,
+            }
+        elif info["video"] is not None and "rotation of" in line:
+            rotation = re.search(r"rotation of (-?\d+(?:\.\d+)?) degrees", line)
+            if rotation:
+                info["video"]["rotation"] = int(float(rotation.group(1)))
+    return info
+
+
+def probe_media(path, ffmpeg_path=None):
+    """获取媒体文件的时长和首个视频/音频流的信息
+
+    返回 {"duration": 秒, "video": {...} 或 None, "audio": {...} 或 None}
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    ffprobe_path = find_ffprobe(ffmpeg_path)
+    with metrics.stage("probe"):
+        if ffprobe_path:
+            return _probe_with_ffprobe(ffprobe_path, path)
+        if not ffmpeg_path:
+            raise RuntimeError("未找到 ffmpeg，请确保已安装 FFmpeg。")
+        return _probe_with_ffmpeg(ffmpeg_path, path)
+
+
+def media_duration(path, ffmpeg_path=None):
+    """返回媒体时长（秒），无法探测时返回 None，用于计算进度百分比"""
+    try:
+        return probe_media(path, ffmpeg_path)["duration"] or None
+    except Exception:
+        return None
+
+
+def video_packets(path, ffmpeg_path=None):
+    """按解码顺序返回首个视频流的 [(pts秒, 是否关键帧), ...]，只读取包头不解码；没有ffprobe时返回 None"""
+    ffprobe_path = find_ffprobe(ffmpeg_path)
+    if not ffprobe_path:
+        return None
+    result = subprocess.run(
+        [ffprobe_path, "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags",
+         "-of", "csv=p=0", path],
+        capture_output=True,
+        text=True,
+        timeout=120,
+        env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        return None
+
+    packets = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        try:
+            packets.append((float(pts_time), "K" in flags))
+        except ValueError:
+            # 没有时间戳的包无法定位
+            return None
+    return packets
+
+
+def _read_wav_header(stream):
+    """从WAV流中读取头部，返回 (声道数, 采样率)，流位置停在data块的起始处"""
+    riff = stream.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise RuntimeError("ffmpeg 输出不是有效的 WAV 数据")
+
+    channels = sample_rate = None
+    while True:
+        chunk_header = stream.read(8)
+        if len(chunk_header) < 8:
+            raise RuntimeError("WAV 数据缺少 data 块")
+        chunk_id, chunk_size = chunk_header[:4], struct.unpack("<I", chunk_header[4:])[0]
+        if chunk_id == b"data":
+            break
+        chunk = stream.read(chunk_size + (chunk_size & 1))
+        if chunk_id == b"fmt ":
+            channels, sample_rate = struct.unpack("<HI", chunk[2:8])
+
+    if not channels or not sample_rate:
+        raise RuntimeError("WAV 数据缺少 fmt 块")
+    return channels, sample_rate
+
+
+def decode_audio(path, start=0.0, duration=None, ffmpeg_path=None):
+    """用一次流式ffmpeg解码读取音频的指定时间段
+
+    返回 (float32 数组 [channels, samples], 采样率)；文件没有音轨时返回 None。
+    """
+    if np is None:
+        raise ImportError("numpy library is not installed.")
+
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if not ffmpeg_path:
+        raise RuntimeError("未找到 ffmpeg，请确保已安装 FFmpeg。")
+
+    cmd = [ffmpeg_path, "-nostdin", "-v", "error"]
+    if start > 0:
+        # 放在 -i 之前做输入端快速定位，只解码需要的部分
+        cmd.extend(["-ss", f"{start:.6f}"])
+    cmd.extend(["-i", path])
+    if duration is not None:
+        cmd.extend(["-t", f"{duration:.6f}"])
+    cmd.extend([
+        "-map", "0:a:0?",  # 第一条音轨（没有音轨时不报错）
+        "-vn", "-sn", "-dn",
+        "-c:a", "pcm_f32le",
+        "-f", "wav",
+        "pipe:1",
+    ])
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=os.environ.copy())
+    try:
+        channels = sample_rate = None
+        if process.stdout.peek(1):
+            channels, sample_rate = _read_wav_header(process.stdout)
+        data = process.stdout.read()
+        _, stderr = process.communicate()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    if process.returncode != 0:
+        error_output = stderr.decode(errors="replace")
+        if "does not contain any stream" in error_output:
+            # 文件没有音轨
+            return None
+        raise RuntimeError(f"FFmpeg 解码音频失败: {error_output}")
+    if channels is None:
+        return None
+
+    frame_bytes = 4 * channels
+    data = data[:len(data) - len(data) % frame_bytes]
+    samples = np.frombuffer(data, dtype="<f4").reshape(-1, channels).T.copy()
+    return samples, sample_rate
+
+
+def detect_silences(path, noise_db=-35.0, min_duration=0.4, ffmpeg_path=None):
+    """用 silencedetect 滤镜找出音频中的静音段，返回 [(开始秒, 结束秒), ...]"""
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if not ffmpeg_path:
+        raise RuntimeError("未找到 ffmpeg，请确保已安装 FFmpeg。")
+
+    result = subprocess.run(
+        [ffmpeg_path, "-nostdin", "-hide_banner", "-nostats", "-i", path, "-map", "0:a:0", "-vn",
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_duration}", "-f", "null", "-"],
+        capture_output=True,
+        text=True,
+        errors="replace",
+        env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg 静音检测失败: {result.stderr}")
+
+    silences = []
+    start = None
+    for match in re.finditer(r"silence_(start|end): (-?\d+(?:\.\d+)?)", result.stderr):
+        kind, value = match.group(1), max(0.0, float(match.group(2)))
+        if kind == "start":
+            start = value
+        elif start is not None:
+            silences.append((start, value))
+            start = None
+    return silences
+
+
+def stream_audio(path, codec_args, container, sample_rate=0, channels=0, start=0.0, duration=None,
+                 ffmpeg_path=None, chunk_size=256 * 1024):
+    """边转码边读取：用ffmpeg把音频转成指定编码和容器，按块产出字节，不写临时文件
+
+    sample_rate/channels 为 0 时保持原样。ffmpeg失败时在读完输出后抛出 RuntimeError；
+    调用方提前关闭生成器时结束ffmpeg进程。
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if not ffmpeg_path:
+        raise RuntimeError("未找到 ffmpeg，请确保已安装 FFmpeg。")
+
+    cmd = [ffmpeg_path, "-nostdin", "-v", "error"]
+    if start > 0:
+        cmd.extend(["-ss", f"{start:.3f}"])
+    if duration is not None:
+        cmd.extend(["-t", f"{duration:.3f}"])
+    cmd.extend(["-i", path, "-map", "0:a:0", "-vn", "-sn", "-dn"])
+    if sample_rate:
+        cmd.extend(["-ar", str(sample_rate)])
+    if channels:
+        cmd.extend(["-ac", str(channels)])
+    cmd.extend(list(codec_args) + ["-f", container, "pipe:1"])
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=os.environ.copy())
+    # stderr 在后台读取，避免管道写满阻塞ffmpeg
+    stderr_chunks = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_thread.start()
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        process.wait()
+        stderr_thread.join()
+        if process.returncode != 0:
+            error_output = b"".join(stderr_chunks).decode(errors="replace")
+            raise RuntimeError(f"FFmpeg 音频转码失败: {error_output}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
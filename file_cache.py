@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+from . import metrics
+
+
+def get_cache_dir(*parts):
+    """Directory for persistent caches that must survive ComfyUI restarts.
+
+    Defaults to ``~/.cache/comfyui-luma`` and can be moved with ``LUMA_CACHE_DIR``.
+    """
+    root = os.environ.get("LUMA_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "comfyui-luma")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+_content_hashes = {}
+_content_hashes_lock = threading.Lock()
+
+
+def file_content_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, memoized by path, size and mtime."""
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    with _content_hashes_lock:
+        digest = _content_hashes.get(key)
+    if digest is not None:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _content_hashes_lock:
+        _content_hashes[key] = digest
+    return digest
+
+
+class LRUFileCache:
+    """Size-bounded LRU index over files stored in a single directory.
+
+    Entries map a key to one or more files (stored relative to ``root``) and are
+    persisted to a JSON index so the working set survives restarts. With
+    ``max_age`` (seconds) entries also expire that long after they were stored.
+
+    Hits only update the in-memory LRU order; the index is rewritten on
+    put/remove/eviction, and otherwise at most every ``save_interval`` seconds
+    and at interpreter exit.
+    """
+
+    # Prefix of the <name>_cache_hits / <name>_cache_misses node metrics
+    metrics_name = "file"
+    # Minimum seconds between index writes caused only by hits
+    save_interval = 5.0
+
+    def __init__(self, root, index_name, max_bytes=0, max_age=0):
+        self.root = root
+        self.index_path = os.path.join(root, index_name)
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_age = max(0, float(max_age))
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        # Requests served by waiting on another caller's in-flight fill (also counted as hits)
+        self.coalesced = 0
+        self._dirty = False
+        self._saved_at = 0.0
+        self._load()
+        atexit.register(self.flush)
+
+    def _abs(self, name):
+        return os.path.join(self.root, name)
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        entries = sorted(data.get("entries", {}).items(), key=lambda item: item[1].get("atime", 0))
+        for key, entry in entries:
+            files = entry.get("files") or []
+            if files and all(os.path.exists(self._abs(name)) for name in files):
+                self._entries[key] = entry
+
+        stats = data.get("stats", {})
+        self.hits = int(stats.get("hits", 0))
+        self.misses = int(stats.get("misses", 0))
+        self.bytes_saved = int(stats.get("bytes_saved", 0))
+        self.evictions = int(stats.get("evictions", 0))
+        self.coalesced = int(stats.get("coalesced", 0))
+
+    def _save(self):
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        data = {
+            "entries": dict(self._entries),
+            "stats": {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+            },
+        }
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: failed to write cache index {self.index_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _touch(self):
+        """Note an index change that can wait, writing it if the last write is old enough."""
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_interval:
+            self._save()
+
+    def flush(self):
+        """Write pending LRU updates to the index."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def _expired(self, entry, now=None):
+        if not self.max_age:
+            return False
+        created = entry.get("ctime", entry.get("atime", 0))
+        return (now or time.time()) - created > self.max_age
+
+    def get(self, key):
+        """Return the absolute file paths for ``key`` and mark it recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            removed = False
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self._delete_files(entry)
+                self.evictions += 1
+                entry, removed = None, True
+            if entry is not None:
+                paths = [self._abs(name) for name in entry["files"]]
+                if all(os.path.exists(path) for path in paths):
+                    entry["atime"] = time.time()
+                    self._entries.move_to_end(key)
+                    self._count_hit(entry["size"])
+                    return paths
+                # Files were removed behind our back
+                del self._entries[key]
+                removed = True
+            self.misses += 1
+            metrics.count(f"{self.metrics_name}_cache_misses")
+            if removed:
+                # Like eviction, dropping an entry is persisted right away
+                self._save()
+            else:
+                self._dirty = True
+            return None
+
+    def _count_hit(self, size, coalesced=False):
+        self.hits += 1
+        self.bytes_saved += size
+        metrics.count(f"{self.metrics_name}_cache_hits")
+        metrics.count(f"{self.metrics_name}_cache_bytes_saved", size)
+        if coalesced:
+            self.coalesced += 1
+            metrics.count(f"{self.metrics_name}_cache_coalesced")
+        self._touch()
+
+    def put(self, key, paths):
+        """Register existing files under ``key`` and evict old entries over budget."""
+        with self._lock:
+            files = [os.path.relpath(path, self.root) for path in paths]
+            size = sum(os.path.getsize(path) for path in paths)
+            now = time.time()
+            self._entries[key] = {"files": files, "size": size, "atime": now, "ctime": now}
+            self._entries.move_to_end(key)
+            self._evict(protect=key)
+            self._save()
+
+    def remove(self, key, delete_files=True):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and delete_files:
+                self._delete_files(entry)
+            self._save()
+
+    def clear(self, delete_files=True):
+        """Drop every entry (and by default its files)."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            if delete_files:
+                for entry in entries:
+                    self._delete_files(entry)
+            self._save()
+
+    def _delete_files(self, entry):
+        for name in entry["files"]:
+            path = self._abs(name)
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                print(f"Warning: failed to evict cached file {path}: {e}")
+
+    def _evict(self, protect=None):
+        if self.max_age:
+            now = time.time()
+            for key, entry in list(self._entries.items()):
+                if key != protect and self._expired(entry, now):
+                    del self._entries[key]
+                    self._delete_files(entry)
+                    self.evictions += 1
+        if not self.max_bytes:
+            return
+        total = sum(entry["size"] for entry in self._entries.values())
+        for key in list(self._entries.keys()):
+            if total <= self.max_bytes:
+                break
+            if key == protect:
+                continue
+            entry = self._entries.pop(key)
+            self._delete_files(entry)
+            total -= entry["size"]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": sum(entry["size"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "max_age": self.max_age,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+            }
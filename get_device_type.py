@@ -1,5 +1,13 @@
+import os
+import json
+import time
+import threading
+
 import torch
 
+from . import metrics
+from .ffmpeg_utils import get_ffmpeg_capabilities, compiled_hardware_encoders, detect_hardware_encoders
+
 class GetDeviceType:
     @classmethod
     def INPUT_TYPES(s):
@@ -12,6 +20,7 @@ class GetDeviceType:
     FUNCTION = "get_device_type"
     CATEGORY = "Luma"
 
+    @metrics.instrument
     def get_device_type(self):
         if torch.cuda.is_available():
             device_type = "cuda"
@@ -19,11 +28,175 @@ class GetDeviceType:
             device_type = "cpu"
         return (device_type,)
 
+
+# Capabilities are re-probed at most this often (seconds)
+DEFAULT_CAPABILITIES_TTL = 60
+
+# ffmpeg decoder name suffixes that indicate hardware decoding
+HW_DECODER_SUFFIXES = ("_cuvid", "_qsv", "_mediacodec", "_v4l2m2m", "_rkmpp", "_amf")
+
+# Hardware encoder types in order of preference for video_encoder
+HW_ENCODER_PRIORITY = ("nvenc", "videotoolbox", "qsv", "amf")
+
+_capabilities = None
+_capabilities_lock = threading.Lock()
+
+
+def _system_memory():
+    """Return (total, available) system memory in bytes, or (0, 0) when unknown."""
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        return memory.total, memory.available
+    except ImportError:
+        pass
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        return os.sysconf("SC_PHYS_PAGES") * page_size, os.sysconf("SC_AVPHYS_PAGES") * page_size
+    except (AttributeError, ValueError, OSError):
+        return 0, 0
+
+
+def _torch_devices():
+    devices = []
+    if torch.cuda.is_available():
+        for index in range(torch.cuda.device_count()):
+            properties = torch.cuda.get_device_properties(index)
+            try:
+                free, total = torch.cuda.mem_get_info(index)
+            except RuntimeError:
+                free, total = 0, properties.total_memory
+            devices.append({
+                "type": "cuda",
+                "index": index,
+                "name": properties.name,
+                "total_memory": total,
+                "free_memory": free,
+                "compute_capability": f"{properties.major}.{properties.minor}",
+            })
+
+    xpu = getattr(torch, "xpu", None)
+    if xpu is not None and xpu.is_available():
+        for index in range(xpu.device_count()):
+            properties = xpu.get_device_properties(index)
+            total = getattr(properties, "total_memory", 0)
+            free = total - xpu.memory_reserved(index) if total else 0
+            devices.append({"type": "xpu", "index": index, "name": properties.name,
+                            "total_memory": total, "free_memory": free})
+
+    if torch.backends.mps.is_available():
+        # Apple silicon shares system memory with the GPU
+        total, available = _system_memory()
+        if hasattr(torch.mps, "recommended_max_memory"):
+            total = torch.mps.recommended_max_memory()
+            available = max(0, total - torch.mps.driver_allocated_memory())
+        devices.append({"type": "mps", "index": 0, "name": "Apple MPS",
+                        "total_memory": total, "free_memory": available})
+    return devices
+
+
+def _ffmpeg_capabilities():
+    capabilities = get_ffmpeg_capabilities()
+    if capabilities is None:
+        return {"available": False, "version": None, "hw_encoders_compiled": [], "hw_encoders_usable": [],
+                "hw_decoders": [], "hwaccels": []}
+    compiled = compiled_hardware_encoders()
+    usable = detect_hardware_encoders()
+    return {
+        "available": True,
+        "version": capabilities["version"],
+        # Built into ffmpeg; says nothing about the hardware or drivers on this machine
+        "hw_encoders_compiled": [compiled[key] for key in HW_ENCODER_PRIORITY if compiled[key]],
+        # Passed a 1-frame test encode here
+        "hw_encoders_usable": [usable[key] for key in HW_ENCODER_PRIORITY if usable[key]],
+        "hw_decoders": [name for name in capabilities["decoders"] if name.endswith(HW_DECODER_SUFFIXES)],
+        "hwaccels": capabilities["hwaccels"],
+    }
+
+
+def _probe_capabilities():
+    devices = _torch_devices()
+    total_memory, available_memory = _system_memory()
+    xpu = getattr(torch, "xpu", None)
+    backends = {
+        "cuda": torch.cuda.is_available(),
+        "mps": torch.backends.mps.is_available(),
+        "xpu": xpu is not None and xpu.is_available(),
+    }
+    return {
+        # Preferred torch device: the first available accelerator, otherwise the CPU
+        "device_type": next((name for name in ("cuda", "xpu", "mps") if backends[name]), "cpu"),
+        "torch": {"version": torch.__version__, "cuda_version": torch.version.cuda, "backends": backends},
+        "devices": devices,
+        "cpu": {
+            "count": os.cpu_count() or 1,
+            "total_memory": total_memory,
+            "available_memory": available_memory,
+        },
+        "ffmpeg": _ffmpeg_capabilities(),
+        "probed_at": time.time(),
+    }
+
+
+def get_device_capabilities(ttl=DEFAULT_CAPABILITIES_TTL, refresh=False):
+    """Structured report of torch devices, CPU and ffmpeg hardware support.
+
+    The probe runs at most once per ``ttl`` seconds; memory figures are as of
+    the last probe.
+    """
+    global _capabilities
+    with _capabilities_lock:
+        if refresh or _capabilities is None or time.time() - _capabilities["probed_at"] >= ttl:
+            _capabilities = _probe_capabilities()
+        return _capabilities
+
+
+class GetDeviceCapabilities:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {},
+            "optional": {
+                "ttl_seconds": ("INT", {"default": DEFAULT_CAPABILITIES_TTL, "min": 0, "max": 86400}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "INT", "INT", "INT", "INT", "STRING")
+    RETURN_NAMES = ("capabilities_json", "device_type", "device_count", "total_vram_mb", "free_vram_mb",
+                    "cpu_count", "video_encoder")
+    FUNCTION = "get_device_capabilities"
+    CATEGORY = "Luma"
+
+    @classmethod
+    def IS_CHANGED(s, ttl_seconds=DEFAULT_CAPABILITIES_TTL):
+        # Re-run whenever the cached probe expires
+        return get_device_capabilities(ttl_seconds)["probed_at"]
+
+    @metrics.instrument
+    def get_device_capabilities(self, ttl_seconds=DEFAULT_CAPABILITIES_TTL):
+        capabilities = get_device_capabilities(ttl_seconds)
+        accelerators = [device for device in capabilities["devices"] if device["type"] == capabilities["device_type"]]
+        total_vram = sum(device["total_memory"] for device in accelerators) // (1024 * 1024)
+        free_vram = sum(device["free_memory"] for device in accelerators) // (1024 * 1024)
+        # Best H.264 encoder that works on this machine, falling back to libx264
+        hw_encoders = capabilities["ffmpeg"]["hw_encoders_usable"]
+        video_encoder = hw_encoders[0] if hw_encoders else "libx264"
+        return (
+            json.dumps(capabilities),
+            capabilities["device_type"],
+            len(accelerators),
+            total_vram,
+            free_vram,
+            capabilities["cpu"]["count"],
+            video_encoder,
+        )
+
 NODE_CLASS_MAPPINGS = {
-    "GetDeviceType": GetDeviceType
+    "GetDeviceType": GetDeviceType,
+    "GetDeviceCapabilities": GetDeviceCapabilities,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "GetDeviceType": "Get Device Type"
+    "GetDeviceType": "Get Device Type",
+    "GetDeviceCapabilities": "Get Device Capabilities",
 }
-
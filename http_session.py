@@ -0,0 +1,243 @@
+import os
+import time
+import uuid
+import itertools
+import random
+import threading
+
+from . import metrics
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    requests = None
+
+# Defaults, overridable through the environment
+RETRIES = int(os.environ.get("LUMA_HTTP_RETRIES", 3))
+BACKOFF_FACTOR = float(os.environ.get("LUMA_HTTP_BACKOFF", 0.5))
+# Number of distinct hosts whose connection pools are kept alive
+POOL_HOSTS = int(os.environ.get("LUMA_HTTP_POOL_HOSTS", 16))
+# Maximum simultaneous connections per host; extra requests wait for a free one
+POOL_MAXSIZE = int(os.environ.get("LUMA_HTTP_POOL_MAXSIZE", 8))
+# Bytes read per iteration when streaming response bodies to disk
+CHUNK_SIZE = int(os.environ.get("LUMA_HTTP_CHUNK_SIZE", 1024 * 1024))
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Upload failures where the server did not process the request, so resending is safe
+UPLOAD_RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=RETRIES,
+        status=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_HOSTS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Return the shared keep-alive session used by all HTTP-based nodes."""
+    global _session
+    if requests is None:
+        raise ImportError("requests library is not installed. Please install it using 'pip install requests'")
+
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def configure(retries=None, backoff_factor=None, pool_hosts=None, pool_maxsize=None, chunk_size=None):
+    """Override pool/retry settings; the shared session is rebuilt on next use."""
+    global RETRIES, BACKOFF_FACTOR, POOL_HOSTS, POOL_MAXSIZE, CHUNK_SIZE, _session
+    with _session_lock:
+        if retries is not None:
+            RETRIES = int(retries)
+        if backoff_factor is not None:
+            BACKOFF_FACTOR = float(backoff_factor)
+        if pool_hosts is not None:
+            POOL_HOSTS = int(pool_hosts)
+        if pool_maxsize is not None:
+            POOL_MAXSIZE = int(pool_maxsize)
+        if chunk_size is not None:
+            CHUNK_SIZE = int(chunk_size)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def download_to_file(url, path, timeout=60):
+    """Stream ``url`` into ``path`` using the shared session. Returns bytes written."""
+    written = 0
+    with metrics.stage("download"):
+        with get_session().get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+    metrics.count("bytes_downloaded", written)
+    return written
+
+
+class MultipartStream:
+    """Streaming multipart/form-data body that is never held in memory as a whole.
+
+    ``files`` is a list of ``(field, filename, content_type, source)`` where
+    ``source`` is a file path, bytes, or a callable returning an iterator of
+    bytes (e.g. a transcoding pipe). When every source has a known size the
+    body has a length and is sent with Content-Length, otherwise chunked.
+    ``on_progress(sent, total)`` is called as bytes are handed to the socket
+    (``total`` is None when unknown). A body can only be iterated once.
+    """
+
+    def __init__(self, files, fields=None, on_progress=None, chunk_size=None):
+        self.boundary = uuid.uuid4().hex
+        self.on_progress = on_progress
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self._parts = []
+        for name, value in (fields or {}).items():
+            header = (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                      f'{value}\r\n').encode("utf-8")
+            self._parts.append((header, None))
+        for field, filename, content_type, source in files:
+            header = (f'--{self.boundary}\r\n'
+                      f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                      f'Content-Type: {content_type}\r\n\r\n').encode("utf-8")
+            self._parts.append((header, source))
+        self._trailer = f"--{self.boundary}--\r\n".encode("utf-8")
+        self._iterators = []
+        self.total = self._total_size()
+        self.sent = 0
+
+    def _source_size(self, source):
+        if source is None:
+            return 0
+        if isinstance(source, (bytes, bytearray)):
+            return len(source) + 2
+        if isinstance(source, str):
+            return os.path.getsize(source) + 2
+        return None
+
+    def _total_size(self):
+        total = len(self._trailer)
+        for header, source in self._parts:
+            size = self._source_size(source)
+            if size is None:
+                return None
+            total += len(header) + size
+        return total
+
+    @property
+    def headers(self):
+        headers = {"Content-Type": f"multipart/form-data; boundary={self.boundary}"}
+        if self.total is not None:
+            headers["Content-Length"] = str(self.total)
+        return headers
+
+    def __len__(self):
+        # requests streams objects with a length using Content-Length, and falls
+        # back to chunked transfer encoding when the length is 0
+        return self.total or 0
+
+    def __bool__(self):
+        # requests replaces falsy data with an empty body, so a body of unknown
+        # length must stay truthy even though its length is reported as 0
+        return True
+
+    def _source_chunks(self, source):
+        if source is None:
+            return
+        if isinstance(source, (bytes, bytearray)):
+            yield bytes(source)
+        elif isinstance(source, str):
+            with open(source, "rb") as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                    yield chunk
+        else:
+            iterator = source()
+            self._iterators.append(iterator)
+            yield from iterator
+        yield b"\r\n"
+
+    def __iter__(self):
+        for header, source in self._parts:
+            for chunk in itertools.chain([header], self._source_chunks(source)):
+                self.sent += len(chunk)
+                yield chunk
+                if self.on_progress is not None:
+                    self.on_progress(self.sent, self.total)
+        self.sent += len(self._trailer)
+        yield self._trailer
+        if self.on_progress is not None:
+            self.on_progress(self.sent, self.total)
+
+    def close(self):
+        """Stop any source iterators (e.g. kill a transcoding process) left unfinished."""
+        for iterator in self._iterators:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        self._iterators = []
+
+
+def upload_with_retries(url, make_body, timeout=300, retries=None, backoff_factor=None):
+    """POST a streamed body with the shared session, retrying transient failures.
+
+    ``make_body()`` must return a fresh MultipartStream per attempt, since a
+    streamed body can only be sent once. Connection errors and 429/502/503/504
+    responses are retried with exponential backoff (honouring Retry-After);
+    the last response is returned, or the last connection error raised.
+    """
+    retries = RETRIES if retries is None else retries
+    backoff_factor = BACKOFF_FACTOR if backoff_factor is None else backoff_factor
+    session = get_session()
+
+    for attempt in range(retries + 1):
+        body = make_body()
+        retry_after = None
+        try:
+            # The stage includes waiting for the server to process the upload
+            with metrics.stage("upload"):
+                response = session.post(url, data=body, headers=body.headers, timeout=timeout)
+        except requests.exceptions.ConnectionError as e:
+            if attempt == retries:
+                raise
+            reason = str(e)
+        else:
+            if response.status_code not in UPLOAD_RETRY_STATUS_CODES or attempt == retries:
+                return response
+            reason = f"HTTP {response.status_code}"
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+        finally:
+            body.close()
+            metrics.count("bytes_uploaded", body.sent)
+
+        metrics.count("upload_retries")
+        delay = backoff_factor * (2 ** attempt) * (1 + random.random() * 0.25)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        print(f"Warning: upload to {url} failed ({reason}), retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+        time.sleep(delay)
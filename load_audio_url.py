@@ -1,7 +1,7 @@
-import os
-import hashlib
 import torch
-import folder_paths
+
+from . import metrics
+from .download_cache import get_download_cache, cache_filename, url_extension
 
 try:
     import requests
@@ -27,6 +27,7 @@ class LoadAudioByUrl:
     FUNCTION = "load_audio"
     CATEGORY = "Luma"
 
+    @metrics.instrument
     def load_audio(self, url):
         if requests is None:
             raise ImportError("requests library is not installed. Please install it using 'pip install requests'")
@@ -37,40 +38,11 @@ class LoadAudioByUrl:
         if not url or not url.startswith("http"):
              raise ValueError("Invalid URL provided")
              
-        # Generate a unique filename based on the URL
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        
-        # Try to extract extension from URL
-        filename = os.path.basename(url.split("?")[0])
-        _, ext = os.path.splitext(filename)
-        
-        # Map common content types if extension is missing (simplified)
-        # For now, if no extension, default to .wav or let torchaudio handle it if possible, 
-        # but torchaudio usually needs extension hint or valid header.
-        if not ext:
-            ext = ".wav" 
-            
-        local_filename = f"url_audio_{url_hash}{ext}"
-        input_dir = folder_paths.get_input_directory()
-        destination_path = os.path.join(input_dir, local_filename)
-        
-        # Download if file doesn't exist
-        if not os.path.exists(destination_path):
-            print(f"Downloading audio from {url} to {destination_path}...")
-            try:
-                response = requests.get(url, stream=True, timeout=30)
-                response.raise_for_status()
-                
-                # Check header for extension if we defaulted? (Optional improvement)
-                
-                with open(destination_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            except Exception as e:
-                # Clean up if download failed
-                if os.path.exists(destination_path):
-                    os.remove(destination_path)
-                raise RuntimeError(f"Failed to download audio: {str(e)}")
+        # Download into the shared URL cache (no-op on a cache hit)
+        # torchaudio usually needs an extension hint, so default to .wav
+        ext = url_extension(url, ".wav")
+        local_filename = cache_filename(url, "url_audio", ext)
+        destination_path = get_download_cache().fetch(url, local_filename, kind="audio", timeout=30)
         
         # Try loading audio with different backends for better compatibility
         waveform = None
@@ -93,16 +65,17 @@ class LoadAudioByUrl:
             # If we can't list backends, just try default
             backends_to_try = [None]
         
-        for backend in backends_to_try:
-            try:
-                if backend:
-                    waveform, sample_rate = torchaudio.load(destination_path, backend=backend)
-                else:
-                    waveform, sample_rate = torchaudio.load(destination_path)
-                break  # Success, exit loop
-            except Exception as e:
-                last_error = e
-                continue
+        with metrics.stage("decode"):
+            for backend in backends_to_try:
+                try:
+                    if backend:
+                        waveform, sample_rate = torchaudio.load(destination_path, backend=backend)
+                    else:
+                        waveform, sample_rate = torchaudio.load(destination_path)
+                    break  # Success, exit loop
+                except Exception as e:
+                    last_error = e
+                    continue
         
         if waveform is None:
             raise RuntimeError(f"Failed to load audio file {destination_path}. Tried backends: {backends_to_try}. Last error: {str(last_error)}")
@@ -110,6 +83,8 @@ class LoadAudioByUrl:
         # Convert to ComfyUI AUDIO format: {"waveform": [batch, channels, samples], "sample_rate": int}
         # torchaudio.load returns [channels, samples]
         audio = {"waveform": waveform.unsqueeze(0), "sample_rate": sample_rate}
+        metrics.count("audio_samples_decoded", waveform.shape[-1])
+        metrics.record_tensor(audio["waveform"])
         
         return (audio, )
 
@@ -1,8 +1,6 @@
-import os
-import hashlib
-import folder_paths
 import torch
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageOps
 
 try:
@@ -10,6 +8,33 @@ try:
 except ImportError:
     requests = None
 
+from . import metrics
+from .download_cache import get_download_cache, cache_filename, url_extension
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff']
+
+
+def fetch_image(url):
+    """Download an image URL through the shared cache and return its local path."""
+    if not url or not url.startswith("http"):
+         raise ValueError("Invalid URL provided")
+
+    # Download into the shared URL cache (no-op on a cache hit)
+    ext = url_extension(url, ".png", IMAGE_EXTENSIONS)
+    local_filename = cache_filename(url, "url_image", ext)
+    return get_download_cache().fetch(url, local_filename, kind="image", timeout=60)
+
+
+def open_image(path):
+    """Open an image file with EXIF orientation applied and 16-bit greyscale reduced to 8-bit."""
+    img = Image.open(path)
+    img = ImageOps.exif_transpose(img)
+
+    if img.mode == 'I':
+        img = img.point(lambda i: i * (1 / 256)).convert('L')
+    return img
+
+
 class LoadImageByUrl:
     @classmethod
     def INPUT_TYPES(s):
@@ -24,71 +49,159 @@ class LoadImageByUrl:
     FUNCTION = "load_image"
     CATEGORY = "Luma"
 
+    @metrics.instrument
     def load_image(self, url):
         if requests is None:
             raise ImportError("requests library is not installed. Please install it using 'pip install requests'")
 
-        if not url or not url.startswith("http"):
-             raise ValueError("Invalid URL provided")
-             
-        # Generate a unique filename based on the URL
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        
-        # Try to extract extension from URL, default to .png if none or weird
-        filename = os.path.basename(url.split("?")[0])
-        _, ext = os.path.splitext(filename)
-        if not ext.lower() in ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff']:
-            ext = ".png"
-            
-        local_filename = f"url_image_{url_hash}{ext}"
-        input_dir = folder_paths.get_input_directory()
-        destination_path = os.path.join(input_dir, local_filename)
-        
-        # Download if file doesn't exist
-        if not os.path.exists(destination_path):
-            print(f"Downloading image from {url} to {destination_path}...")
-            try:
-                response = requests.get(url, stream=True, timeout=60)
-                response.raise_for_status()
-                
-                with open(destination_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            except Exception as e:
-                # Clean up if download failed
-                if os.path.exists(destination_path):
-                    os.remove(destination_path)
-                raise RuntimeError(f"Failed to download image: {str(e)}")
-        
+        destination_path = fetch_image(url)
+
         # Load Image
         try:
-            img = Image.open(destination_path)
-            img = ImageOps.exif_transpose(img)
-            
-            # Convert to RGB to ensure consistency
-            if img.mode == 'I':
-                img = img.point(lambda i: i * (1 / 256)).convert('L')
-                
-            image = img.convert("RGB")
-            image = np.array(image).astype(np.float32) / 255.0
-            image = torch.from_numpy(image)[None,]
-            
-            # Handle Mask
-            if 'A' in img.getbands():
-                mask = np.array(img.getchannel('A')).astype(np.float32) / 255.0
-                mask = 1. - torch.from_numpy(mask)
-            else:
-                mask = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
-                
+            with metrics.stage("decode"):
+                img = open_image(destination_path)
+
+                # Convert to RGB to ensure consistency
+                image = img.convert("RGB")
+                image = np.array(image).astype(np.float32) / 255.0
+                image = torch.from_numpy(image)[None,]
+
+                # Handle Mask
+                if 'A' in img.getbands():
+                    mask = np.array(img.getchannel('A')).astype(np.float32) / 255.0
+                    mask = 1. - torch.from_numpy(mask)
+                else:
+                    mask = torch.zeros((64, 64), dtype=torch.float32, device="cpu")
+
+            metrics.count("images_decoded")
+            metrics.record_tensor(image, mask)
             return (image, mask)
-            
+
         except Exception as e:
              raise RuntimeError(f"Failed to load image from {destination_path}: {str(e)}")
 
+
+class LoadImageBatchByUrl:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "urls": ("STRING", {"default": "", "multiline": True}),
+                "resize_mode": (["pad", "resize"], {"default": "pad"}),
+                "width": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 1}),
+                "height": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 1}),
+                "max_workers": ("INT", {"default": 8, "min": 1, "max": 64, "step": 1}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "MASK", "INT", "STRING")
+    RETURN_NAMES = ("images", "masks", "count", "errors")
+    FUNCTION = "load_images"
+    CATEGORY = "Luma"
+
+    @staticmethod
+    def _load_one(url):
+        """Download and decode one URL into (RGB uint8 array, alpha uint8 array or None)."""
+        path = fetch_image(url)
+        with metrics.stage("decode"):
+            img = open_image(path)
+            rgb = np.array(img.convert("RGB"))
+            alpha = np.array(img.getchannel('A')) if 'A' in img.getbands() else None
+        return rgb, alpha
+
+    @staticmethod
+    def _fit(rgb, alpha, target_w, target_h, resize_mode):
+        """Bring one decoded image to the target size; returns (rgb, alpha) where alpha 0 marks padding."""
+        h, w = rgb.shape[:2]
+        if alpha is None:
+            alpha = np.full((h, w), 255, dtype=np.uint8)
+
+        if resize_mode == "resize":
+            new_w, new_h = target_w, target_h
+        else:
+            # Letterbox: keep aspect ratio, then pad the remainder
+            scale = min(target_w / w, target_h / h)
+            new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+
+        if (new_w, new_h) != (w, h):
+            rgb = np.array(Image.fromarray(rgb).resize((new_w, new_h), Image.LANCZOS))
+            alpha = np.array(Image.fromarray(alpha).resize((new_w, new_h), Image.BILINEAR))
+
+        if (new_w, new_h) == (target_w, target_h):
+            return rgb, alpha
+
+        top = (target_h - new_h) // 2
+        left = (target_w - new_w) // 2
+        padded_rgb = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+        padded_alpha = np.zeros((target_h, target_w), dtype=np.uint8)
+        padded_rgb[top:top + new_h, left:left + new_w] = rgb
+        padded_alpha[top:top + new_h, left:left + new_w] = alpha
+        return padded_rgb, padded_alpha
+
+    @metrics.instrument
+    def load_images(self, urls, resize_mode="pad", width=0, height=0, max_workers=8):
+        if requests is None:
+            raise ImportError("requests library is not installed. Please install it using 'pip install requests'")
+
+        url_list = [line.strip() for line in urls.splitlines() if line.strip()]
+        if not url_list:
+            raise ValueError("No URLs provided")
+
+        def try_load(url):
+            try:
+                return self._load_one(url), None
+            except Exception as e:
+                return None, e
+
+        errors = []
+        loaded = []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(url_list))) as executor:
+            # bind() lets downloads in the worker threads record into this node's metrics
+            results = executor.map(metrics.bind(try_load), url_list)
+            for index, (url, (result, error)) in enumerate(zip(url_list, results)):
+                if error is not None:
+                    print(f"Failed to load image {index} ({url}): {error}")
+                    errors.append(f"{index}\t{url}\t{error}")
+                else:
+                    loaded.append(result)
+
+        if not loaded:
+            raise RuntimeError("No images could be loaded:\n" + "\n".join(errors))
+
+        # Width/height of 0 mean "derive from the batch"
+        if resize_mode == "resize":
+            target_h = height or loaded[0][0].shape[0]
+            target_w = width or loaded[0][0].shape[1]
+        else:
+            target_h = height or max(rgb.shape[0] for rgb, _ in loaded)
+            target_w = width or max(rgb.shape[1] for rgb, _ in loaded)
+
+        images = torch.empty((len(loaded), target_h, target_w, 3), dtype=torch.float32)
+        masks = torch.empty((len(loaded), target_h, target_w), dtype=torch.float32)
+
+        def fit_into(index):
+            rgb, alpha = self._fit(*loaded[index], target_w, target_h, resize_mode)
+            images[index].copy_(torch.from_numpy(rgb)).div_(255.0)
+            masks[index].copy_(torch.from_numpy(alpha)).div_(255.0)
+            loaded[index] = None
+
+        with metrics.stage("resize"), ThreadPoolExecutor(max_workers=min(max_workers, len(loaded))) as executor:
+            list(executor.map(fit_into, range(len(loaded))))
+
+        # ComfyUI masks are inverted alpha: 1 marks transparent (or padded) pixels
+        masks.neg_().add_(1.)
+        metrics.count("images_decoded", len(images))
+        metrics.record_tensor(images, masks)
+
+        return (images, masks, len(loaded), "\n".join(errors))
+
+
 NODE_CLASS_MAPPINGS = {
-    "LoadImageByUrl": LoadImageByUrl
+    "LoadImageByUrl": LoadImageByUrl,
+    "LoadImageBatchByUrl": LoadImageBatchByUrl,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "LoadImageByUrl": "Load Image By URL"
+    "LoadImageByUrl": "Load Image By URL",
+    "LoadImageBatchByUrl": "Load Image Batch By URL",
 }
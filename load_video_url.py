@@ -1,8 +1,6 @@
-import os
-import hashlib
-import folder_paths
 import torch
 import numpy as np
+from PIL import Image
 
 try:
     import requests
@@ -19,6 +17,17 @@ try:
 except ImportError:
     torchaudio = None
 
+from . import metrics
+from .download_cache import get_download_cache, cache_filename, url_extension
+from .ffmpeg_utils import find_ffmpeg, decode_audio
+from .video_decoders import DECODERS, open_decoder
+
+OUTPUT_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "uint8": torch.uint8,
+}
+
 class LoadVideoByUrl:
     @classmethod
     def INPUT_TYPES(s):
@@ -28,6 +37,18 @@ class LoadVideoByUrl:
                 "frame_limit": ("INT", {"default": 0, "min": 0, "max": 10000, "step": 1}),
                 "start_frame": ("INT", {"default": 0, "min": 0, "max": 10000, "step": 1}),
                 "step": ("INT", {"default": 1, "min": 1, "max": 100, "step": 1}),
+            },
+            "optional": {
+                # 0 disables the corresponding constraint; resizing happens on uint8 frames while decoding
+                "max_side": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 8}),
+                "target_width": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 8}),
+                "target_height": ("INT", {"default": 0, "min": 0, "max": 16384, "step": 8}),
+                # uint8 keeps raw 0-255 values and is only understood by nodes that expect it
+                "output_dtype": (list(OUTPUT_DTYPES.keys()), {"default": "float32"}),
+                # "auto" picks the fastest installed backend, measured once per machine (video_decoders.auto_order)
+                "decoder": (["auto"] + list(DECODERS.keys()), {"default": "auto"}),
+                # 0 lets the backend choose the number of decoding threads
+                "decode_threads": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
             }
         }
 
@@ -36,115 +57,168 @@ class LoadVideoByUrl:
     FUNCTION = "load_video"
     CATEGORY = "Luma"
 
-    def load_video(self, url, frame_limit=0, start_frame=0, step=1):
+    @staticmethod
+    def _output_size(width, height, max_side=0, target_width=0, target_height=0):
+        """Compute the (width, height) frames are resized to; keeps aspect ratio unless both targets are set."""
+        if target_width > 0 and target_height > 0:
+            return target_width, target_height
+        if target_width > 0:
+            return target_width, max(1, round(height * target_width / width))
+        if target_height > 0:
+            return max(1, round(width * target_height / height)), target_height
+        if max_side > 0 and max(width, height) > max_side:
+            scale = max_side / max(width, height)
+            return max(1, round(width * scale)), max(1, round(height * scale))
+        return width, height
+
+    @staticmethod
+    def _resize(frame, out_size):
+        """Resize an RGB uint8 frame to (width, height)."""
+        height, width = frame.shape[:2]
+        if cv2 is not None:
+            interpolation = cv2.INTER_AREA if out_size[0] * out_size[1] < width * height else cv2.INTER_LINEAR
+            return cv2.resize(frame, out_size, interpolation=interpolation)
+        return np.asarray(Image.fromarray(frame).resize(out_size, Image.BILINEAR))
+
+    @classmethod
+    def _read_frames(cls, decoder, start_frame, end_frame, step, size=None, dtype=torch.float32):
+        """Decode every ``step``-th frame in [start_frame, end_frame) into one [B, H, W, C] tensor.
+
+        The output is preallocated from the frame count, so peak memory is the
+        output tensor plus a single decoded frame. ``end_frame <= 0`` means the
+        container did not report a frame count; frames are then read to EOF.
+        ``size`` is a callable mapping the native (width, height) to the output size.
+        """
+        if end_frame > 0:
+            expected = max(0, (end_frame - start_frame + step - 1) // step)
+        else:
+            expected = None
+
+        output = None
+        out_size = None
+        pending = []  # uint8 frames, only used when the frame count is unknown
+        frames_loaded = 0
+
+        for frame in decoder.frames(start_frame, end_frame, step):
+            if out_size is None:
+                height, width = frame.shape[:2]
+                out_size = size(width, height) if size is not None else (width, height)
+            if out_size != (frame.shape[1], frame.shape[0]):
+                frame = cls._resize(frame, out_size)
+
+            if expected is None:
+                pending.append(frame)
+            else:
+                if output is None:
+                    output = torch.empty((expected, *frame.shape), dtype=dtype)
+                # Convert directly inside the batch tensor
+                target = output[frames_loaded]
+                target.copy_(torch.from_numpy(frame))
+                if dtype != torch.uint8:
+                    target.div_(255.0)
+            frames_loaded += 1
+            if expected is not None and frames_loaded >= expected:
+                break
+
+        if frames_loaded == 0:
+            return None
+
+        if expected is None:
+            output = torch.from_numpy(np.stack(pending))
+            if dtype != torch.uint8:
+                output = output.to(dtype).div_(255.0)
+        elif frames_loaded < expected:
+            # The container over-reported its frame count
+            output = output[:frames_loaded].clone()
+
+        return output
+
+    @staticmethod
+    def _load_audio(path, start, duration):
+        """Decode the audio track between ``start`` and ``start + duration`` seconds, or None."""
+        # It's okay if audio fails or doesn't exist, the caller substitutes silence
+        ffmpeg_path = find_ffmpeg()
+        if ffmpeg_path:
+            try:
+                decoded = decode_audio(path, start, duration, ffmpeg_path=ffmpeg_path)
+            except Exception as e:
+                print(f"Failed to decode audio from {path}: {e}")
+                return None
+            if decoded is None:
+                return None
+            samples, sample_rate = decoded
+            return {"waveform": torch.from_numpy(samples).unsqueeze(0), "sample_rate": sample_rate}
+
+        if torchaudio is not None:
+            # Without ffmpeg fall back to decoding the whole track and slicing it
+            try:
+                waveform, sample_rate = torchaudio.load(path)
+            except Exception:
+                return None
+            first = int(start * sample_rate)
+            last = waveform.shape[-1] if duration is None else first + int(duration * sample_rate)
+            return {"waveform": waveform[:, first:last].unsqueeze(0), "sample_rate": sample_rate}
+
+        return None
+
+    @metrics.instrument
+    def load_video(self, url, frame_limit=0, start_frame=0, step=1,
+                   max_side=0, target_width=0, target_height=0, output_dtype="float32",
+                   decoder="auto", decode_threads=0):
         if requests is None:
             raise ImportError("requests library is not installed. Please install it using 'pip install requests'")
-            
-        if cv2 is None:
-            raise ImportError("opencv-python library is not installed. Please install it using 'pip install opencv-python'")
 
         if not url or not url.startswith("http"):
              raise ValueError("Invalid URL provided")
              
-        # Generate a unique filename based on the URL
-        url_hash = hashlib.md5(url.encode()).hexdigest()
-        
-        # Try to extract extension from URL
-        filename = os.path.basename(url.split("?")[0])
-        _, ext = os.path.splitext(filename)
-        
-        # Default to .mp4 if no extension found
-        if not ext:
-            ext = ".mp4" 
-            
-        local_filename = f"url_video_{url_hash}{ext}"
-        input_dir = folder_paths.get_input_directory()
-        destination_path = os.path.join(input_dir, local_filename)
-        
-        # Download if file doesn't exist
-        if not os.path.exists(destination_path):
-            print(f"Downloading video from {url} to {destination_path}...")
-            try:
-                response = requests.get(url, stream=True, timeout=60)
-                response.raise_for_status()
-                
-                with open(destination_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            except Exception as e:
-                # Clean up if download failed
-                if os.path.exists(destination_path):
-                    os.remove(destination_path)
-                raise RuntimeError(f"Failed to download video: {str(e)}")
+        # Download into the shared URL cache (no-op on a cache hit)
+        ext = url_extension(url, ".mp4")
+        local_filename = cache_filename(url, "url_video", ext)
+        destination_path = get_download_cache().fetch(url, local_filename, kind="video", timeout=60)
         
         # Load Video Frames
-        cap = cv2.VideoCapture(destination_path)
-        if not cap.isOpened():
-             raise RuntimeError(f"Failed to open video file: {destination_path}")
+        decoder = open_decoder(destination_path, decoder, decode_threads)
 
         # Get FPS
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = decoder.fps
 
         # Handle frame skipping and limits
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        total_frames = decoder.frame_count
         
         # Calculate start and end frames
         start_frame = max(0, start_frame)
         if frame_limit > 0:
-            end_frame = min(total_frames, start_frame + frame_limit * step)
+            end_frame = start_frame + frame_limit * step
+            if total_frames > 0:
+                end_frame = min(total_frames, end_frame)
         else:
             end_frame = total_frames
 
-        images = []
-        current_frame = 0
-        frames_loaded = 0
+        try:
+            size = lambda width, height: self._output_size(width, height, max_side, target_width, target_height)
+            with metrics.stage("decode"):
+                images_output = self._read_frames(decoder, start_frame, end_frame, step, size, OUTPUT_DTYPES[output_dtype])
+        finally:
+            decoder.close()
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-                
-            if current_frame >= end_frame:
-                break
-                
-            if current_frame >= start_frame and (current_frame - start_frame) % step == 0:
-                # Convert BGR to RGB
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # Convert to numpy array and normalize to 0-1
-                frame = frame.astype(np.float32) / 255.0
-                # Extract tensor
-                image_tensor = torch.from_numpy(frame)
-                images.append(image_tensor)
-                frames_loaded += 1
-                
-                # Check if we hit limit (if not using end_frame logic, but simpler here)
-                if frame_limit > 0 and frames_loaded >= frame_limit:
-                    break
-            
-            current_frame += 1
-            
-        cap.release()
-        
-        if not images:
+        if images_output is None:
              raise RuntimeError("No frames could be loaded from the video.")
 
-        # Stack images into a batch [B, H, W, C]
-        images_output = torch.stack(images)
-
-        # Load Audio (Optional)
-        audio_output = None
-        if torchaudio is not None:
-             try:
-                 waveform, sample_rate = torchaudio.load(destination_path)
-                 audio_output = {"waveform": waveform.unsqueeze(0), "sample_rate": sample_rate}
-             except Exception:
-                 # It's okay if audio fails or doesn't exist, just return empty/None for audio
-                 pass
+        # Load Audio (Optional), only for the time span covered by the selected frames
+        if fps > 0:
+            audio_start = start_frame / fps
+            audio_duration = images_output.shape[0] * step / fps
+        else:
+            audio_start, audio_duration = 0.0, None
+        with metrics.stage("decode_audio"):
+            audio_output = self._load_audio(destination_path, audio_start, audio_duration)
         
         if audio_output is None:
              # Create a dummy silent audio
              audio_output = {"waveform": torch.zeros(1, 1, 0), "sample_rate": 44100}
 
+        metrics.count("frames_decoded", images_output.shape[0])
+        metrics.record_tensor(images_output, audio_output["waveform"])
         return (images_output, audio_output, destination_path, float(fps))
 
 NODE_CLASS_MAPPINGS = {
@@ -0,0 +1,265 @@
+"""Per-node performance instrumentation shared by all Luma nodes.
+
+Node entry points are wrapped with ``@instrument``; while a node runs, shared
+helpers record into it through the module-level functions (no-ops outside a
+node):
+
+* ``stage(name)`` - context manager adding wall time to a stage ("download",
+  "upload", "ffmpeg", "decode", ...). Stages run from worker threads are summed,
+  so they can exceed the node's wall time.
+* ``count(name, value)`` - counters such as bytes_downloaded, frames_decoded or
+  <cache>_cache_hits.
+* ``record_tensor(...)`` - size of the tensors a node returns (``numel *
+  element_size``; this is the output size, not peak memory use).
+
+Every finished run is logged as one JSON line on the ``luma.metrics`` logger,
+aggregated per node, optionally written to ``LUMA_METRICS_FILE`` (Prometheus
+text, or JSON when the name ends in .json) and served by ComfyUI at
+``/luma/metrics`` and ``/luma/metrics.json``. Set LUMA_METRICS=0 to disable.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger("luma.metrics")
+
+ENABLED = os.environ.get("LUMA_METRICS", "1").lower() not in ("0", "false", "no")
+METRICS_FILE = os.environ.get("LUMA_METRICS_FILE", "")
+
+_current = contextvars.ContextVar("luma_node_run", default=None)
+
+
+class NodeRun:
+    """Measurements of a single node execution."""
+
+    def __init__(self, node):
+        self.node = node
+        self.started = time.time()
+        self.duration = None
+        self.error = None
+        self.stages = {}
+        self.counters = {}
+        self.output_tensor_bytes = 0
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, seconds):
+        with self._lock:
+            total, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + seconds, calls + 1)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_tensor_bytes(self, nbytes):
+        with self._lock:
+            self.output_tensor_bytes = max(self.output_tensor_bytes, nbytes)
+
+    def finish(self, error=None):
+        self.duration = time.perf_counter() - self._start
+        self.error = None if error is None else type(error).__name__
+
+    def summary(self):
+        with self._lock:
+            return {
+                "node": self.node,
+                "started": self.started,
+                "duration": self.duration,
+                "error": self.error,
+                "stages": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.stages.items()},
+                "counters": dict(self.counters),
+                "output_tensor_bytes": self.output_tensor_bytes,
+            }
+
+
+class MetricsRegistry:
+    """Process-wide totals per node, exported as JSON or Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}
+
+    def record(self, run):
+        summary = run.summary()
+        with self._lock:
+            node = self._nodes.setdefault(run.node, {
+                "runs": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                "stages": {}, "counters": {}, "max_output_tensor_bytes": 0, "last_run": None,
+            })
+            node["runs"] += 1
+            node["errors"] += run.error is not None
+            node["seconds"] += run.duration
+            node["max_seconds"] = max(node["max_seconds"], run.duration)
+            for name, stage in summary["stages"].items():
+                total = node["stages"].setdefault(name, {"seconds": 0.0, "calls": 0})
+                total["seconds"] += stage["seconds"]
+                total["calls"] += stage["calls"]
+            for name, value in summary["counters"].items():
+                node["counters"][name] = node["counters"].get(name, 0) + value
+            node["max_output_tensor_bytes"] = max(node["max_output_tensor_bytes"], run.output_tensor_bytes)
+            node["last_run"] = summary
+        return summary
+
+    def snapshot(self):
+        with self._lock:
+            return {"generated": time.time(), "nodes": json.loads(json.dumps(self._nodes))}
+
+    def reset(self):
+        with self._lock:
+            self._nodes.clear()
+
+    def prometheus(self):
+        nodes = self.snapshot()["nodes"]
+        families = {}
+
+        def add(name, kind, help_text, labels, value):
+            family = families.setdefault(name, (kind, help_text, []))
+            label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+            family[2].append(f"{name}{{{label_text}}} {value}")
+
+        for node_name, node in sorted(nodes.items()):
+            labels = {"node": node_name}
+            add("luma_node_runs_total", "counter", "Node executions.", labels, node["runs"])
+            add("luma_node_errors_total", "counter", "Node executions that raised.", labels, node["errors"])
+            add("luma_node_seconds_total", "counter", "Wall time spent in the node.", labels, node["seconds"])
+            add("luma_node_max_seconds", "gauge", "Slowest single execution.", labels, node["max_seconds"])
+            add("luma_node_max_output_tensor_bytes", "gauge", "Largest size of the tensors returned by one run.",
+                labels, node["max_output_tensor_bytes"])
+            for stage_name, stage in sorted(node["stages"].items()):
+                stage_labels = {"node": node_name, "stage": stage_name}
+                add("luma_stage_seconds_total", "counter", "Time spent per stage.", stage_labels, stage["seconds"])
+                add("luma_stage_calls_total", "counter", "Times each stage ran.", stage_labels, stage["calls"])
+            for counter_name, value in sorted(node["counters"].items()):
+                add(f"luma_{counter_name}_total", "counter", f"Sum of {counter_name}.", labels, value)
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+_file_lock = threading.Lock()
+
+
+def write_metrics_file(path=None):
+    """Atomically write the current metrics to ``path`` (default LUMA_METRICS_FILE)."""
+    path = path or METRICS_FILE
+    if not path:
+        return
+    if path.endswith(".json"):
+        content = json.dumps(registry.snapshot())
+    else:
+        content = registry.prometheus()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with _file_lock:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def current_run():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add_stage(name, time.perf_counter() - start)
+
+
+def count(name, value=1):
+    run = _current.get()
+    if run is not None and value:
+        run.count(name, value)
+
+
+def record_tensor(*tensors):
+    """Record the combined size of the tensors the running node returns (None entries are ignored)."""
+    run = _current.get()
+    if run is None:
+        return
+    nbytes = sum(tensor.numel() * tensor.element_size() for tensor in tensors if tensor is not None)
+    run.record_tensor_bytes(nbytes)
+
+
+def bind(fn):
+    """Wrap ``fn`` so calls from worker threads record into the node that created the wrapper."""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call gets its own copy
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def instrument(func):
+    """Decorator for node FUNCTION methods: measure the call and export it when it returns."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not ENABLED or _current.get() is not None:
+            return func(self, *args, **kwargs)
+        run = NodeRun(type(self).__name__)
+        token = _current.set(run)
+        error = None
+        try:
+            return func(self, *args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            run.finish(error)
+            _export(run)
+    return wrapper
+
+
+def _export(run):
+    summary = registry.record(run)
+    logger.info("node_metrics %s", json.dumps(summary, ensure_ascii=False, separators=(",", ":")))
+    try:
+        write_metrics_file()
+    except OSError as e:
+        logger.warning("Failed to write metrics file %s: %s", METRICS_FILE, e)
+
+
+def register_routes():
+    """Serve the metrics from ComfyUI's web server when running inside ComfyUI."""
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except ImportError:
+        return False
+    instance = getattr(PromptServer, "instance", None)
+    if instance is None:
+        return False
+
+    @instance.routes.get("/luma/metrics")
+    async def prometheus_metrics(request):
+        return web.Response(text=registry.prometheus(), content_type="text/plain", charset="utf-8")
+
+    @instance.routes.get("/luma/metrics.json")
+    async def json_metrics(request):
+        return web.json_response(registry.snapshot())
+
+    return True
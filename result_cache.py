@@ -0,0 +1,50 @@
+import os
+import json
+import hashlib
+import threading
+import folder_paths
+
+from .file_cache import LRUFileCache, file_content_hash
+
+# 结果缓存占用输出目录的字节上限（0 表示不限制），超出后按最近最少使用淘汰
+DEFAULT_MAX_MB = 20 * 1024
+INDEX_NAME = ".luma_result_cache.json"
+
+
+class ResultCache(LRUFileCache):
+    """ffmpeg类节点的输出结果缓存，键由输入文件内容和节点参数共同决定"""
+
+    metrics_name = "result"
+
+    @staticmethod
+    def make_key(node_name, input_path, params):
+        """根据节点名、输入文件内容哈希和参数生成缓存键"""
+        payload = json.dumps(
+            {"node": node_name, "input": file_content_hash(input_path), "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_result_cache():
+    """返回当前输出目录对应的进程级结果缓存"""
+    output_dir = folder_paths.get_output_directory()
+    with _caches_lock:
+        cache = _caches.get(output_dir)
+        if cache is None:
+            max_mb = int(os.environ.get("LUMA_RESULT_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            cache = ResultCache(output_dir, INDEX_NAME, max_bytes=max_mb * 1024 * 1024)
+            _caches[output_dir] = cache
+        return cache
+
+
+def input_file_hash(path):
+    """供 IS_CHANGED 使用：按文件内容而不是路径/修改时间判断输入是否变化"""
+    if not path or not os.path.exists(path):
+        return ""
+    return file_content_hash(path)
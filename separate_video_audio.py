@@ -3,7 +3,21 @@ import os
 import folder_paths
 import time
 import random
-import shutil
+
+from . import metrics
+from .ffmpeg_utils import find_ffmpeg, probe_media
+from .ffmpeg_runner import run_ffmpeg
+from .result_cache import get_result_cache, input_file_hash
+from .encoder_profiles import ENCODER_PROFILES, DEFAULT_PROFILE, encoder_config, encoder_args
+
+# 源音频已经是这些编码时直接复制到对应格式，不重新编码
+COPYABLE_AUDIO_CODECS = {
+    "mp3": {"mp3"},
+    "aac": {"aac"},
+    "wav": {"pcm_s16le"},
+    "flac": {"flac"},
+    "m4a": {"aac", "alac"},
+}
 
 class SeparateVideoAudio:
     @classmethod
@@ -13,6 +27,10 @@ class SeparateVideoAudio:
                 "video_path": ("STRING", {"default": "", "multiline": False}),
                 "audio_format": (["mp3", "aac", "wav", "flac", "m4a"], {"default": "mp3"}),
                 "video_codec": (["copy", "libx264", "h264_nvenc", "h264_videotoolbox"], {"default": "copy"}),
+            },
+            "optional": {
+                # 视频需要重新编码时的速度/质量档位（只影响预设和质量参数，线程数交给编码器决定）
+                "encoder_profile": (ENCODER_PROFILES, {"default": DEFAULT_PROFILE}),
             }
         }
 
@@ -21,30 +39,18 @@ class SeparateVideoAudio:
     FUNCTION = "separate"
     CATEGORY = "Luma"
 
+    @classmethod
+    def IS_CHANGED(s, video_path, **kwargs):
+        # 按文件内容判断，而不是路径或修改时间
+        return input_file_hash(video_path)
+
     @staticmethod
     def find_ffmpeg():
         """查找ffmpeg可执行文件的路径"""
-        # 首先尝试使用shutil.which（会检查PATH）
-        ffmpeg_path = shutil.which("ffmpeg")
-        if ffmpeg_path:
-            return ffmpeg_path
-        
-        # 如果找不到，尝试常见的安装路径
-        common_paths = [
-            "/opt/homebrew/bin/ffmpeg",  # macOS Homebrew (Apple Silicon)
-            "/usr/local/bin/ffmpeg",     # macOS Homebrew (Intel) / Linux
-            "/usr/bin/ffmpeg",           # Linux系统路径
-            "C:\\ffmpeg\\bin\\ffmpeg.exe",  # Windows常见路径
-            "C:\\Program Files\\ffmpeg\\bin\\ffmpeg.exe",  # Windows另一个常见路径
-        ]
-        
-        for path in common_paths:
-            if os.path.exists(path) and os.access(path, os.X_OK):
-                return path
-        
-        return None
+        return find_ffmpeg()
 
-    def separate(self, video_path, audio_format, video_codec):
+    @metrics.instrument
+    def separate(self, video_path, audio_format, video_codec, encoder_profile=DEFAULT_PROFILE):
         if not video_path or not os.path.exists(video_path):
             raise ValueError(f"视频文件不存在: {video_path}")
 
@@ -53,6 +59,18 @@ class SeparateVideoAudio:
         if not ffmpeg_path:
             raise RuntimeError("未找到 ffmpeg，请确保已安装 FFmpeg。常见路径: /opt/homebrew/bin/ffmpeg (macOS), /usr/local/bin/ffmpeg, /usr/bin/ffmpeg")
 
+        # 相同视频内容和参数已经处理过时直接返回之前的输出
+        result_cache = get_result_cache()
+        cache_key = result_cache.make_key("SeparateVideoAudio", video_path, {
+            "audio_format": audio_format,
+            "video_codec": video_codec,
+            "encoder_profile": encoder_profile if video_codec != "copy" else None,
+        })
+        cached = result_cache.get(cache_key)
+        if cached:
+            print(f"命中结果缓存，跳过ffmpeg: {cached[0]}, {cached[1]}")
+            return (cached[0], cached[1])
+
         # 获取输出目录
         output_dir = folder_paths.get_output_directory()
         os.makedirs(output_dir, exist_ok=True)
@@ -66,63 +84,58 @@ class SeparateVideoAudio:
         video_output_path = os.path.join(output_dir, f"{base_name}_video_{timestamp}_{random_suffix}.mp4")
         audio_output_path = os.path.join(output_dir, f"{base_name}_audio_{timestamp}_{random_suffix}.{audio_format}")
 
-        # 分离音频
-        audio_codec = self._get_audio_codec(audio_format)
-        audio_cmd = [
+        # 单次ffmpeg调用同时输出音频和视频，输入文件只读取和解复用一次
+        cmd = [
             ffmpeg_path,
+            "-y",  # 覆盖输出文件
             "-i", video_path,
+        ]
+
+        try:
+            media_info = probe_media(video_path, ffmpeg_path)
+        except Exception:
+            media_info = {"duration": 0.0, "video": None, "audio": None}
+        source_codec = media_info["audio"]["codec"] if media_info["audio"] else None
+
+        # 输出1：分离音频
+        audio_codec = self._get_audio_codec(audio_format)
+        if source_codec in COPYABLE_AUDIO_CODECS.get(audio_format, ()):
+            # 源音频编码与目标格式一致，直接复制
+            audio_codec = "copy"
+        cmd.extend([
+            "-map", "0:a:0",
             "-vn",  # 不包含视频
             "-acodec", audio_codec,
-            "-y",  # 覆盖输出文件
-            audio_output_path
-        ]
+        ])
         
-        # 添加音频格式特定参数
-        if audio_format == "mp3":
-            audio_cmd.extend(["-b:a", "192k"])
-        elif audio_format == "aac" or audio_format == "m4a":
-            audio_cmd.extend(["-b:a", "192k"])
-        # WAV和FLAC不需要额外的比特率参数
-
-        # 分离视频（移除音频轨道）
-        video_cmd = [
-            ffmpeg_path,
-            "-i", video_path,
+        # 添加音频格式特定参数（直接复制时不需要）
+        if audio_codec != "copy":
+            if audio_format == "mp3":
+                cmd.extend(["-b:a", "192k"])
+            elif audio_format == "aac" or audio_format == "m4a":
+                cmd.extend(["-b:a", "192k"])
+            # WAV和FLAC不需要额外的比特率参数
+
+        cmd.append(audio_output_path)
+
+        # 输出2：分离视频（移除音频轨道）
+        cmd.extend([
+            "-map", "0:v:0",
             "-an",  # 不包含音频
-            "-c:v", video_codec,
-            "-y",  # 覆盖输出文件
-            video_output_path
-        ]
+        ])
         
-        # 如果视频编码器不是copy，添加编码参数
-        if video_codec != "copy":
-            if video_codec == "libx264":
-                video_cmd.extend(["-preset", "medium", "-crf", "23"])
-            elif video_codec == "h264_nvenc":
-                video_cmd.extend(["-preset", "p4", "-rc", "vbr", "-cq", "23", "-b:v", "0"])
-            elif video_codec == "h264_videotoolbox":
-                video_cmd.extend(["-allow_sw", "1", "-b:v", "5000k", "-realtime", "1"])
-            
-            video_cmd.extend(["-pix_fmt", "yuv420p"])
+        # 如果视频编码器不是copy，按编码档位添加编码参数
+        if video_codec == "copy":
+            cmd.extend(["-c:v", "copy"])
+        else:
+            cmd.extend(encoder_args(encoder_config(video_codec, encoder_profile)))
+            cmd.extend(["-pix_fmt", "yuv420p"])
+
+        cmd.append(video_output_path)
 
         try:
-            # 执行分离音频命令
-            result_audio = subprocess.run(
-                audio_cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                env=os.environ.copy()
-            )
-            
-            # 执行分离视频命令
-            result_video = subprocess.run(
-                video_cmd,
-                capture_output=True,
-                text=True,
-                check=True,
-                env=os.environ.copy()
-            )
+            # 执行分离命令
+            run_ffmpeg(cmd, duration=media_info["duration"] or None)
             
             # 验证输出文件
             if not os.path.exists(audio_output_path) or os.path.getsize(audio_output_path) == 0:
@@ -131,11 +144,12 @@ class SeparateVideoAudio:
             if not os.path.exists(video_output_path) or os.path.getsize(video_output_path) == 0:
                 raise RuntimeError(f"视频文件生成失败: {video_output_path}")
             
+            result_cache.put(cache_key, [video_output_path, audio_output_path])
             return (video_output_path, audio_output_path)
                 
         except subprocess.CalledProcessError as e:
             error_output = e.stderr if e.stderr else e.stdout
-            error_msg = f"FFmpeg 执行失败:\n命令: {' '.join(e.cmd if hasattr(e, 'cmd') else audio_cmd)}\n错误: {error_output}"
+            error_msg = f"FFmpeg 执行失败:\n命令: {' '.join(cmd)}\n错误: {error_output}"
             raise RuntimeError(error_msg)
         except FileNotFoundError:
             raise RuntimeError(f"未找到 ffmpeg 可执行文件。已尝试路径: {ffmpeg_path}")
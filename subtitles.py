@@ -0,0 +1,165 @@
+import re
+import json
+
+import numpy as np
+
+# 每次写入文件的字幕条数，避免逐条 write 也避免一次拼出整个文件
+WRITE_BATCH = 4096
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+_SRT_CUE = re.compile(
+    r"(\d+)[ \t]*\n"
+    r"(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[ \t]*-->[ \t]*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})[^\n]*\n"
+    r"(.*?)(?:\n[ \t]*\n|\n*\Z)",
+    re.DOTALL,
+)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def parse_times(values):
+    """批量把API返回的时间（秒数或 HH:MM:SS.mmm / HH:MM:SS,mmm 字符串）转换为整数毫秒数组
+
+    无法解析的值按 0 处理，与 Wav2Srt.parse_time_to_seconds 一致。
+    """
+    seconds = np.zeros(len(values), dtype=np.float64)
+    clock_index, clock_text = [], []
+    for index, value in enumerate(values):
+        if isinstance(value, (int, float)):
+            seconds[index] = value
+            continue
+        text = str(value).strip()
+        if text.count(":") == 2:
+            clock_index.append(index)
+            clock_text.append(text)
+        else:
+            seconds[index] = _to_float(text)
+
+    if clock_text:
+        # 所有时钟格式的时间拼成一个字符串后一次性转换为 (N, 3) 的时/分/秒数组
+        # （每个值恰好两个冒号，按冒号切分后字段数一定是 3N）
+        fields = ":".join(clock_text).replace(",", ".").split(":")
+        try:
+            parts = np.array(fields, dtype=np.float64).reshape(-1, 3)
+        except ValueError:
+            # 有非数字字段时逐个解析
+            parts = np.array([[_to_float(p) for p in text.replace(",", ".").split(":")] for text in clock_text])
+        seconds[clock_index] = parts @ np.array([3600.0, 60.0, 1.0])
+
+    return np.maximum(np.rint(seconds * 1000), 0).astype(np.int64)
+
+
+def parse_time(value):
+    """单个时间值转换为秒数"""
+    return float(parse_times([value])[0]) / 1000
+
+
+def _clock_fields(ms):
+    ms = np.asarray(ms, dtype=np.int64)
+    hours, rest = np.divmod(ms, 3600000)
+    minutes, rest = np.divmod(rest, 60000)
+    secs, millis = np.divmod(rest, 1000)
+    return hours.tolist(), minutes.tolist(), secs.tolist(), millis.tolist()
+
+
+def format_times(ms, separator=","):
+    """整数毫秒数组格式化为 HH:MM:SS,mmm（VTT 使用 "." 分隔毫秒）"""
+    template = "%02d:%02d:%02d" + separator + "%03d"
+    return [template % fields for fields in zip(*_clock_fields(ms))]
+
+
+def format_time(seconds, separator=","):
+    return format_times([int(round(max(seconds, 0) * 1000))], separator)[0]
+
+
+class SubtitleTrack:
+    """数组存储的字幕轨：开始/结束时间为 int64 毫秒数组，编号和文本为列表"""
+
+    __slots__ = ("ids", "start_ms", "end_ms", "texts")
+
+    def __init__(self, start_ms, end_ms, texts, ids=None):
+        self.start_ms = np.asarray(start_ms, dtype=np.int64)
+        self.end_ms = np.asarray(end_ms, dtype=np.int64)
+        self.texts = list(texts)
+        self.ids = list(ids) if ids is not None else list(range(1, len(self.texts) + 1))
+        if not (len(self.start_ms) == len(self.end_ms) == len(self.texts) == len(self.ids)):
+            raise ValueError("字幕的编号、时间和文本数量不一致")
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def from_subtitles(cls, subtitles):
+        """从API返回的字幕列表构建，兼容 id/ID、start/Start、end/End、text/Text 字段"""
+        ids, starts, ends, texts = [], [], [], []
+        for number, subtitle in enumerate(subtitles, 1):
+            ids.append(subtitle.get("id", subtitle.get("ID", number)))
+            starts.append(subtitle.get("start", subtitle.get("Start", 0)))
+            ends.append(subtitle.get("end", subtitle.get("End", 0)))
+            texts.append(subtitle.get("text", subtitle.get("Text", "")))
+        return cls(parse_times(starts), parse_times(ends), texts, ids)
+
+    def to_subtitles(self):
+        """转换为 [{"id", "start", "end", "text"}] 列表，时间为秒数"""
+        return [
+            {"id": idx, "start": start / 1000, "end": end / 1000, "text": text}
+            for idx, start, end, text in zip(self.ids, self.start_ms.tolist(), self.end_ms.tolist(), self.texts)
+        ]
+
+    def _write_cues(self, path, header, separator):
+        with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(header)
+            for offset in range(0, len(self), WRITE_BATCH):
+                window = slice(offset, offset + WRITE_BATCH)
+                starts = format_times(self.start_ms[window], separator)
+                ends = format_times(self.end_ms[window], separator)
+                f.write("".join(f"{idx}\n{start} --> {end}\n{text}\n\n"
+                                for idx, start, end, text in zip(self.ids[window], starts, ends, self.texts[window])))
+
+    def write_srt(self, path):
+        self._write_cues(path, "", ",")
+
+    def write_vtt(self, path):
+        self._write_cues(path, "WEBVTT\n\n", ".")
+
+    def write_jsonl(self, path):
+        """每行一条 {"id", "start", "end", "text"}，时间为秒数"""
+        encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        with open(path, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+            for offset in range(0, len(self), WRITE_BATCH):
+                window = slice(offset, offset + WRITE_BATCH)
+                f.write("".join(
+                    encoder.encode({"id": idx, "start": start / 1000, "end": end / 1000, "text": text}) + "\n"
+                    for idx, start, end, text in zip(self.ids[window], self.start_ms[window].tolist(),
+                                                     self.end_ms[window].tolist(), self.texts[window])))
+
+    def write(self, path, subtitle_format="srt"):
+        writers = {"srt": self.write_srt, "vtt": self.write_vtt, "jsonl": self.write_jsonl}
+        if subtitle_format not in writers:
+            raise ValueError(f"不支持的字幕格式: {subtitle_format}")
+        writers[subtitle_format](path)
+
+
+def parse_srt(text):
+    """解析SRT文本为 SubtitleTrack"""
+    text = text.lstrip("﻿").replace("\r\n", "\n").replace("\r", "\n")
+    matches = _SRT_CUE.findall(text)
+    if not matches:
+        return SubtitleTrack([], [], [])
+    fields = np.array([match[1:9] for match in matches], dtype=np.int64).reshape(-1, 2, 4)
+    # 毫秒字段不足三位时按小数补齐（如 ",5" 表示 500 毫秒）
+    digits = np.array([[len(match[4]), len(match[8])] for match in matches])
+    millis = fields[:, :, 3] * 10 ** (3 - digits)
+    ms = fields[:, :, 0] * 3600000 + fields[:, :, 1] * 60000 + fields[:, :, 2] * 1000 + millis
+    return SubtitleTrack(ms[:, 0], ms[:, 1], [match[9].rstrip("\n") for match in matches],
+                         [int(match[0]) for match in matches])
+
+
+def read_srt(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_srt(f.read())
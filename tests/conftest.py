@@ -0,0 +1,74 @@
+"""Load the node modules outside ComfyUI.
+
+The repository is registered as a package and ``folder_paths`` points at a
+scratch directory, the same way the benchmarks do it. Caches go to a temporary
+LUMA_CACHE_DIR so test runs never touch the user's cache.
+"""
+import os
+import sys
+import types
+import shutil
+import importlib
+import threading
+import subprocess
+import http.server
+from functools import partial
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "comfyui_luma"
+
+
+@pytest.fixture(scope="session")
+def luma(tmp_path_factory):
+    """Return ``import_module(name)`` for ``<repo>/<name>.py``."""
+    base_dir = tmp_path_factory.mktemp("comfy")
+    os.environ["LUMA_CACHE_DIR"] = str(base_dir / "cache")
+    module = types.ModuleType("folder_paths")
+    for kind in ("input", "output", "temp"):
+        directory = str(base_dir / kind)
+        os.makedirs(directory, exist_ok=True)
+        setattr(module, f"get_{kind}_directory", lambda directory=directory: directory)
+    sys.modules["folder_paths"] = module
+
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPO_ROOT]
+        sys.modules[PACKAGE_NAME] = package
+    return lambda name: importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+@pytest.fixture(scope="session")
+def ffmpeg_path():
+    path = shutil.which("ffmpeg")
+    if not path or not shutil.which("ffprobe"):
+        pytest.skip("ffmpeg/ffprobe not installed")
+    return path
+
+
+@pytest.fixture(scope="session")
+def sample_video(tmp_path_factory, ffmpeg_path):
+    """30s 320x240 25fps H.264/AAC clip with a keyframe every 2s."""
+    path = str(tmp_path_factory.mktemp("media") / "sample.mp4")
+    subprocess.run([ffmpeg_path, "-nostdin", "-v", "error", "-y",
+                    "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25:duration=30",
+                    "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000:duration=30",
+                    "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-g", "50",
+                    "-c:a", "aac", "-shortest", path], check=True)
+    return path
+
+
+@pytest.fixture(scope="session")
+def media_server(tmp_path_factory):
+    """Serve a scratch directory over HTTP; returns (directory, base URL)."""
+    directory = tmp_path_factory.mktemp("www")
+
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield directory, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
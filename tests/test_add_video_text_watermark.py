@@ -0,0 +1,55 @@
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+
+def test_enable_window_has_no_bare_commas(luma):
+    watermark = luma("add_video_text_watermark")
+    assert watermark.enable_window(1.5, 4) == "between(t\\,1.500\\,4.000)"
+    assert watermark.enable_window(2) == "gte(t\\,2.000)"
+    for window in (watermark.enable_window(1, 2), watermark.enable_window(1)):
+        assert not re.search(r"(?<!\\),", window)
+
+
+@pytest.mark.parametrize("start_time, end_time, spliced", [
+    (3.0, 6.0, True),     # 只重编码覆盖时间段的GOP
+    (3.0, 0.0, False),    # 到结尾，需要重编码的部分太多，整段重编码
+    (0.5, 29.5, False),
+])
+def test_time_range_with_apostrophe(luma, sample_video, capsys, start_time, end_time, spliced):
+    node = luma("add_video_text_watermark").AddVideoTextWatermark()
+    (output_path,) = node.add_text_watermark(sample_video, "Tom's clip", "bottom-right", 10, 10, 24, "white", "cpu",
+                                             start_time=start_time, end_time=end_time)
+    out = capsys.readouterr().out
+    assert os.path.getsize(output_path) > 0
+    assert ("分段水印" in out) == spliced
+    assert "分段拼接失败" not in out
+
+
+def _frame_times(path):
+    output = subprocess.run([shutil.which("ffprobe"), "-v", "error", "-select_streams", "v:0",
+                             "-show_entries", "frame=pts_time", "-of", "csv=p=0", path],
+                            capture_output=True, text=True, check=True).stdout
+    return [float(line.strip(",")) for line in output.split()]
+
+
+def _frame(ffmpeg_path, path, seconds):
+    return subprocess.run([ffmpeg_path, "-v", "error", "-ss", str(seconds), "-i", path, "-frames:v", "1",
+                           "-f", "rawvideo", "-pix_fmt", "gray", "-"], capture_output=True, check=True).stdout
+
+
+def test_splice_keeps_timing(luma, sample_video, ffmpeg_path, capsys):
+    node = luma("add_video_text_watermark").AddVideoTextWatermark()
+    (output_path,) = node.add_text_watermark(sample_video, "Luma", "bottom-right", 10, 10, 24, "white", "cpu",
+                                             start_time=3.0, end_time=6.0, encoder_profile="throughput")
+    assert "分段水印" in capsys.readouterr().out
+
+    source_times, output_times = _frame_times(sample_video), _frame_times(output_path)
+    assert len(output_times) == len(source_times)
+    assert output_times == pytest.approx(source_times, abs=1e-3)
+    # 窗口之后的帧是流复制的，和源视频同一时间点的画面应完全一致
+    for seconds in (1.0, 6.5, 20.0, 29.5):
+        assert _frame(ffmpeg_path, output_path, seconds) == _frame(ffmpeg_path, sample_video, seconds)
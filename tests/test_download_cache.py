@@ -0,0 +1,65 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def cache(luma, tmp_path, monkeypatch):
+    download_cache = luma("download_cache")
+    cache = download_cache.DownloadCache(str(tmp_path), "index.json")
+    cache.downloads = []
+    cache.fail = False
+    started = threading.Event()
+
+    def fake_download(url, destination_path, kind, timeout):
+        cache.downloads.append(url)
+        started.set()
+        time.sleep(0.3)
+        if cache.fail:
+            raise OSError("connection reset")
+        with open(destination_path, "wb") as f:
+            f.write(b"x" * 1000)
+
+    monkeypatch.setattr(cache, "_download", fake_download)
+    cache.started = started
+    return cache
+
+
+def _fetch_concurrently(cache, count):
+    def fetch(_):
+        try:
+            return cache.fetch("http://example.invalid/a.png", "url_image_a.png", "image")
+        except RuntimeError as e:
+            return e
+
+    with ThreadPoolExecutor(count) as executor:
+        leader = executor.submit(fetch, 0)
+        cache.started.wait(5)
+        waiters = list(executor.map(fetch, range(count - 1)))
+    return [leader.result()] + waiters
+
+
+def test_concurrent_fetches_share_one_download(cache):
+    results = _fetch_concurrently(cache, 8)
+    assert cache.downloads == ["http://example.invalid/a.png"]
+    assert len(set(results)) == 1 and results[0].endswith("url_image_a.png")
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 7 and stats["coalesced"] == 7
+    assert stats["bytes_saved"] == 7 * 1000
+
+    # Later fetches are ordinary hits
+    cache.fetch("http://example.invalid/a.png", "url_image_a.png", "image")
+    assert cache.downloads == ["http://example.invalid/a.png"]
+    assert cache.stats()["hits"] == 8 and cache.stats()["coalesced"] == 7
+
+
+def test_failed_download_fails_every_waiter(cache):
+    cache.fail = True
+    results = _fetch_concurrently(cache, 4)
+    assert len(cache.downloads) == 1
+    assert all(isinstance(result, RuntimeError) and "connection reset" in str(result) for result in results)
+    assert cache.stats()["coalesced"] == 0
@@ -0,0 +1,57 @@
+import json
+
+
+def _make_cache(luma, root, entries=3):
+    cache = luma("file_cache").LRUFileCache(str(root), "index.json")
+    for index in range(entries):
+        path = root / f"file{index}"
+        path.write_bytes(b"x" * 10)
+        cache.put(f"key{index}", [str(path)])
+    return cache
+
+
+def test_hits_do_not_rewrite_index(luma, tmp_path, monkeypatch):
+    cache = _make_cache(luma, tmp_path)
+    saves = []
+    original_save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda: saves.append(1) or original_save())
+
+    for _ in range(100):
+        assert cache.get("key0") is not None
+    assert len(saves) <= 1
+    assert list(cache._entries) == ["key1", "key2", "key0"]
+
+
+def test_flush_persists_lru_order(luma, tmp_path):
+    cache = _make_cache(luma, tmp_path)
+    cache.save_interval = 3600
+    cache.get("key0")
+    with open(tmp_path / "index.json", encoding="utf-8") as f:
+        assert json.load(f)["stats"]["hits"] == 0
+
+    cache.flush()
+    reloaded = luma("file_cache").LRUFileCache(str(tmp_path), "index.json")
+    assert list(reloaded._entries) == ["key1", "key2", "key0"]
+    assert reloaded.hits == 1
+
+
+def test_put_saves_immediately(luma, tmp_path):
+    cache = _make_cache(luma, tmp_path, entries=2)
+    with open(tmp_path / "index.json", encoding="utf-8") as f:
+        assert sorted(json.load(f)["entries"]) == ["key0", "key1"]
+    assert not cache._dirty
+
+
+def test_removed_entries_are_saved_immediately(luma, tmp_path):
+    cache = _make_cache(luma, tmp_path)
+    cache.save_interval = 3600
+    (tmp_path / "file1").unlink()
+    assert cache.get("key1") is None
+
+    cache.max_age = 1
+    cache._entries["key2"]["ctime"] -= 10
+    assert cache.get("key2") is None
+    assert not (tmp_path / "file2").exists()
+
+    with open(tmp_path / "index.json", encoding="utf-8") as f:
+        assert sorted(json.load(f)["entries"]) == ["key0"]
@@ -0,0 +1,36 @@
+import json
+
+
+def _fake_build(luma, monkeypatch, encoders):
+    """Pretend the ffmpeg build lists ``encoders`` (e.g. h264_nvenc without an NVIDIA GPU)."""
+    ffmpeg_utils = luma("ffmpeg_utils")
+    capabilities = dict(ffmpeg_utils.get_ffmpeg_capabilities())
+    capabilities["encoders"] = sorted(set(capabilities["encoders"]) | set(encoders))
+    monkeypatch.setattr(ffmpeg_utils, "get_ffmpeg_capabilities", lambda *args, **kwargs: capabilities)
+    monkeypatch.setattr(luma("get_device_type"), "get_ffmpeg_capabilities", lambda *args, **kwargs: capabilities)
+    monkeypatch.setattr(ffmpeg_utils, "_usable_encoders", {})
+
+
+def test_compiled_but_unusable_encoder_is_not_recommended(luma, ffmpeg_path, monkeypatch):
+    _fake_build(luma, monkeypatch, ["h264_nvenc", "h264_qsv"])
+    ffmpeg_utils = luma("ffmpeg_utils")
+    assert ffmpeg_utils.compiled_hardware_encoders()["nvenc"] == "h264_nvenc"
+    assert ffmpeg_utils.detect_hardware_encoders()["nvenc"] is None
+    assert ffmpeg_utils.encoder_usable("libx264")
+
+    device_type = luma("get_device_type")
+    result = device_type.GetDeviceCapabilities().get_device_capabilities(ttl_seconds=0)
+    report = json.loads(result[0])["ffmpeg"]
+    assert report["hw_encoders_compiled"] == ["h264_nvenc", "h264_qsv"]
+    assert report["hw_encoders_usable"] == []
+    assert result[-1] == "libx264"
+
+
+def test_encoder_test_is_cached(luma, ffmpeg_path, monkeypatch):
+    ffmpeg_utils = luma("ffmpeg_utils")
+    monkeypatch.setattr(ffmpeg_utils, "_usable_encoders", {})
+    calls = []
+    run = ffmpeg_utils.subprocess.run
+    monkeypatch.setattr(ffmpeg_utils.subprocess, "run", lambda *args, **kwargs: calls.append(1) or run(*args, **kwargs))
+    assert ffmpeg_utils.encoder_usable("libx264") and ffmpeg_utils.encoder_usable("libx264")
+    assert len(calls) == 1
@@ -0,0 +1,91 @@
+import threading
+import http.server
+
+import pytest
+
+
+@pytest.fixture
+def upload_server():
+    """Record POST bodies; answer with the next queued status code, 200 once the queue is empty."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.headers.get("Transfer-Encoding") == "chunked":
+                body = b""
+                while True:
+                    size = int(self.rfile.readline().strip(), 16)
+                    body += self.rfile.read(size)
+                    self.rfile.readline()
+                    if size == 0:
+                        break
+            else:
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+            server.requests.append((dict(self.headers), body))
+            status = server.statuses.pop(0) if server.statuses else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    server.statuses = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/upload"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def test_multipart_stream_sends_content_length(luma, tmp_path, upload_server):
+    http_session = luma("http_session")
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(b"a" * 3000)
+    progress = []
+    body = http_session.MultipartStream([("file", "audio.mp3", "audio/mpeg", str(path))], fields={"lang": "en"},
+                                        on_progress=lambda sent, total: progress.append((sent, total)),
+                                        chunk_size=1024)
+    response = http_session.get_session().post(upload_server.url, data=body, headers=body.headers)
+    assert response.status_code == 200
+
+    headers, received = upload_server.requests[0]
+    assert int(headers["Content-Length"]) == len(received) == len(body) == body.sent
+    assert progress[-1] == (len(body), len(body))
+    assert b'name="lang"\r\n\r\nen\r\n' in received
+    assert b'filename="audio.mp3"\r\nContent-Type: audio/mpeg\r\n\r\n' + b"a" * 3000 + b"\r\n" in received
+    assert received.endswith(f"--{body.boundary}--\r\n".encode())
+
+
+def test_upload_retries_with_a_fresh_body(luma, upload_server):
+    http_session = luma("http_session")
+    upload_server.statuses = [503, 429]
+    bodies = []
+
+    def make_body():
+        # Unknown length: sent with chunked transfer encoding
+        bodies.append(http_session.MultipartStream([("file", "a.bin", "application/octet-stream",
+                                                     lambda: iter([b"x" * 100, b"y" * 100]))]))
+        return bodies[-1]
+
+    response = http_session.upload_with_retries(upload_server.url, make_body, timeout=10, retries=3,
+                                                backoff_factor=0)
+    assert response.status_code == 200
+    assert len(upload_server.requests) == len(bodies) == 3
+    for body, (headers, received) in zip(bodies, upload_server.requests):
+        assert "Content-Length" not in headers
+        assert len(received) == body.sent and b"x" * 100 + b"y" * 100 in received
+
+
+@pytest.mark.parametrize("statuses, expected_requests, expected_status", [
+    ([400], 1, 400),                # the server rejected the upload, resending would not help
+    ([503, 503, 503], 3, 503),      # retries exhausted, the last response is returned
+])
+def test_upload_stops_retrying(luma, upload_server, statuses, expected_requests, expected_status):
+    http_session = luma("http_session")
+    upload_server.statuses = statuses
+    response = http_session.upload_with_retries(
+        upload_server.url, lambda: http_session.MultipartStream([("file", "a.bin", "application/octet-stream", b"x")]),
+        timeout=10, retries=2, backoff_factor=0)
+    assert response.status_code == expected_status
+    assert len(upload_server.requests) == expected_requests
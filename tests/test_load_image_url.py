@@ -0,0 +1,39 @@
+import pytest
+import torch
+from PIL import Image
+
+
+@pytest.fixture(scope="module")
+def images(media_server):
+    directory, base_url = media_server
+    Image.new("RGB", (40, 20), (255, 0, 0)).save(directory / "red.png")
+    Image.new("RGBA", (20, 20), (0, 0, 255, 0)).save(directory / "clear.png")
+    (directory / "broken.png").write_bytes(b"not an image")
+    return base_url
+
+
+def test_batch_reports_each_failed_url(luma, images):
+    node = luma("load_image_url").LoadImageBatchByUrl()
+    urls = [f"{images}/red.png", f"{images}/missing.png", "not-a-url", f"{images}/clear.png",
+            f"{images}/broken.png"]
+    batch, masks, count, errors = node.load_images("\n".join(urls), resize_mode="pad")
+
+    assert count == 2 and batch.shape == (2, 20, 40, 3) and masks.shape == (2, 20, 40)
+    lines = errors.splitlines()
+    assert [line.split("\t")[:2] for line in lines] == [
+        ["1", urls[1]],
+        ["2", urls[2]],
+        ["4", urls[4]],
+    ]
+    assert "404" in lines[0] and "Invalid URL" in lines[1]
+
+    # Loaded images keep their order; padding and transparency are masked
+    assert torch.allclose(batch[0, 0, 0], torch.tensor([1.0, 0.0, 0.0]))
+    assert masks[0].max() == 0
+    assert masks[1, :, 10:30].min() == 1 and masks[1, :, :10].min() == 1
+
+
+def test_batch_fails_when_nothing_loads(luma, images):
+    node = luma("load_image_url").LoadImageBatchByUrl()
+    with pytest.raises(RuntimeError, match="No images could be loaded"):
+        node.load_images(f"{images}/missing.png\nnot-a-url")
@@ -0,0 +1,27 @@
+import torch
+
+
+def test_output_tensor_bytes(luma):
+    metrics = luma("metrics")
+    registry = metrics.MetricsRegistry()
+
+    class Node:
+        @metrics.instrument
+        def run(self):
+            metrics.record_tensor(torch.zeros(4, 8, dtype=torch.float32), None)
+            metrics.record_tensor(torch.zeros(2, dtype=torch.uint8))
+            return ()
+
+    original = metrics.registry
+    metrics.registry = registry
+    try:
+        Node().run()
+    finally:
+        metrics.registry = original
+
+    node = registry.snapshot()["nodes"]["Node"]
+    assert node["last_run"]["output_tensor_bytes"] == 4 * 8 * 4
+    assert node["max_output_tensor_bytes"] == 4 * 8 * 4
+    text = registry.prometheus()
+    assert 'luma_node_max_output_tensor_bytes{node="Node"} 128' in text
+    assert "peak" not in text
@@ -0,0 +1,59 @@
+import os
+import sys
+import importlib
+import importlib.util
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def load_package(luma, monkeypatch):
+    """Execute the package ``__init__`` the way ComfyUI does, under a name of its own."""
+
+    def load(eager=False):
+        monkeypatch.setenv("LUMA_EAGER_IMPORT", "1" if eager else "0")
+        name = f"luma_registration_{'eager' if eager else 'lazy'}"
+        for module_name in [m for m in sys.modules if m == name or m.startswith(name + ".")]:
+            monkeypatch.delitem(sys.modules, module_name)
+        spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, "__init__.py"),
+                                                      submodule_search_locations=[REPO_ROOT])
+        package = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, name, package)
+        spec.loader.exec_module(package)
+        return package
+
+    return load
+
+
+def _loaded_node_modules(package):
+    module_names = {module_name for module_name, _ in package.NODE_MANIFEST.values()}
+    return sorted(m for m in module_names if f"{package.__name__}.{m}" in sys.modules)
+
+
+def test_registration_does_not_import_node_modules(load_package):
+    package = load_package()
+    assert _loaded_node_modules(package) == []
+    assert list(package.NODE_DISPLAY_NAME_MAPPINGS) == list(package.NODE_CLASS_MAPPINGS)
+
+    placeholder = package.NODE_CLASS_MAPPINGS["Wav2Srt"]
+    placeholder.RELATIVE_PYTHON_MODULE = "custom_nodes.luma"     # set by ComfyUI on registration
+    assert "required" in placeholder.INPUT_TYPES()
+    assert _loaded_node_modules(package) == ["wav2srt"]
+
+    node_class = sys.modules[f"{package.__name__}.wav2srt"].Wav2Srt
+    assert placeholder.FUNCTION == node_class.FUNCTION and placeholder.RETURN_TYPES == node_class.RETURN_TYPES
+    assert type(placeholder()) is node_class
+    assert not hasattr(node_class, "RELATIVE_PYTHON_MODULE")
+
+
+def test_manifest_matches_node_modules(load_package):
+    package = load_package(eager=True)
+    assert sorted(_loaded_node_modules(package)) == sorted({m for m, _ in package.NODE_MANIFEST.values()})
+    for module_name in {m for m, _ in package.NODE_MANIFEST.values()}:
+        module = importlib.import_module(f"{package.__name__}.{module_name}")
+        manifest = {name: display_name for name, (m, display_name) in package.NODE_MANIFEST.items()
+                    if m == module_name}
+        assert module.NODE_DISPLAY_NAME_MAPPINGS == manifest
+        assert all(package.NODE_CLASS_MAPPINGS[name] is module.NODE_CLASS_MAPPINGS[name] for name in manifest)
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+SUBTITLES = [
+    {"id": 1, "start": 0.5, "end": 2.25, "text": "第一句"},
+    {"ID": 2, "Start": "00:00:02,250", "End": "00:00:04.5", "Text": "two\nlines"},
+    {"id": 3, "start": "3661.001", "end": "01:01:02,999", "text": "late"},
+    {"id": 4, "start": "bad", "end": "00:00:01,000", "text": "unparsable start"},
+]
+
+
+def test_parse_and_format_times(luma):
+    subtitles = luma("subtitles")
+    ms = subtitles.parse_times([0.5, "00:00:02,250", "00:00:04.5", "3661.001", "01:01:02,999", "bad", -1])
+    assert ms.tolist() == [500, 2250, 4500, 3661001, 3662999, 0, 0]
+    assert subtitles.format_times(ms[:5]) == ["00:00:00,500", "00:00:02,250", "00:00:04,500", "01:01:01,001",
+                                              "01:01:02,999"]
+    assert subtitles.format_times([3723004], ".") == ["01:02:03.004"]
+    assert subtitles.format_time(2.0005) == "00:00:02,001"
+
+
+def test_srt_round_trip(luma, tmp_path):
+    subtitles = luma("subtitles")
+    track = subtitles.SubtitleTrack.from_subtitles(SUBTITLES)
+    path = tmp_path / "track.srt"
+    track.write(str(path), "srt")
+
+    reloaded = subtitles.read_srt(str(path))
+    assert reloaded.ids == [1, 2, 3, 4]
+    assert reloaded.start_ms.tolist() == [500, 2250, 3661001, 0]
+    assert reloaded.end_ms.tolist() == [2250, 4500, 3662999, 1000]
+    assert reloaded.texts == ["第一句", "two\nlines", "late", "unparsable start"]
+    assert reloaded.to_subtitles() == track.to_subtitles()
+
+
+def test_parse_srt_tolerates_loose_input(luma):
+    text = "﻿1\r\n00:00:01,5 --> 00:00:02.25 X1:0\r\nhello\r\n\r\n\r\n2\r\n0:00:03,000-->0:00:04,000\r\nbye"
+    track = luma("subtitles").parse_srt(text)
+    assert track.start_ms.tolist() == [1500, 3000] and track.end_ms.tolist() == [2250, 4000]
+    assert track.texts == ["hello", "bye"]
+
+
+def test_write_vtt_and_jsonl(luma, tmp_path):
+    subtitles = luma("subtitles")
+    track = subtitles.SubtitleTrack.from_subtitles(SUBTITLES[:2])
+    track.write(str(tmp_path / "track.vtt"), "vtt")
+    assert (tmp_path / "track.vtt").read_text(encoding="utf-8") == (
+        "WEBVTT\n\n1\n00:00:00.500 --> 00:00:02.250\n第一句\n\n2\n00:00:02.250 --> 00:00:04.500\ntwo\nlines\n\n")
+
+    track.write(str(tmp_path / "track.jsonl"), "jsonl")
+    with open(tmp_path / "track.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == track.to_subtitles()
+
+    with pytest.raises(ValueError):
+        track.write(str(tmp_path / "track.ass"), "ass")
@@ -0,0 +1,69 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def decoders(luma, monkeypatch, tmp_path):
+    video_decoders = luma("video_decoders")
+    monkeypatch.setattr(video_decoders, "_auto_order", None)
+    monkeypatch.setattr(video_decoders, "get_cache_dir", lambda: str(tmp_path))
+    return video_decoders
+
+
+def test_auto_order_uses_measured_ranking(decoders, monkeypatch, tmp_path):
+    available = decoders.available_decoders()
+    if len(available) < 2:
+        pytest.skip("needs two decoder backends")
+    calls = []
+    fps = {name: float(index + 1) for index, name in enumerate(available)}
+    monkeypatch.setattr(decoders, "measure_decoders", lambda names: calls.append(names) or fps)
+
+    assert decoders.auto_order() == available[::-1]
+    # Cached in memory and on disk
+    decoders._auto_order = None
+    assert decoders.auto_order() == available[::-1]
+    assert len(calls) == 1
+    with open(os.path.join(tmp_path, decoders.ORDER_CACHE_NAME), encoding="utf-8") as f:
+        assert list(json.load(f).values())[0]["order"] == available[::-1]
+
+
+def test_auto_order_falls_back_when_measuring_fails(decoders, monkeypatch):
+    def fail(names):
+        raise RuntimeError("no ffmpeg")
+
+    monkeypatch.setattr(decoders, "measure_decoders", fail)
+    assert decoders.auto_order() == decoders.available_decoders()
+
+
+def _reference_frames(decoders, path, indices):
+    """Frames at ``indices`` from a plain sequential read of the first backend, without seeking."""
+    wanted = set(indices)
+    with decoders.open_decoder(path, decoders.available_decoders()[0]) as decoder:
+        return [frame for index, frame in enumerate(decoder.frames(0, max(indices) + 1, 1)) if index in wanted]
+
+
+@pytest.mark.parametrize("start_frame, end_frame, step", [
+    (0, 10, 1),
+    (263, 300, 7),      # seek into the middle of a GOP
+    (740, 0, 3),        # read to EOF
+])
+def test_backends_agree_on_seek_and_step(decoders, sample_video, start_frame, end_frame, step):
+    available = decoders.available_decoders()
+    if len(available) < 2:
+        pytest.skip("needs two decoder backends")
+    indices = list(range(start_frame, end_frame if end_frame > 0 else 750, step))
+    reference = _reference_frames(decoders, sample_video, indices)
+
+    for name in available:
+        with decoders.open_decoder(sample_video, name) as decoder:
+            assert decoder.fps == pytest.approx(25.0)
+            frames = list(decoder.frames(start_frame, end_frame, step))
+        assert len(frames) == len(indices), name
+        for index, frame, expected in zip(indices, frames, reference):
+            assert frame.shape == (240, 320, 3) and frame.dtype == np.uint8
+            # Backends convert YUV to RGB slightly differently; a wrong frame differs far more
+            difference = np.abs(frame.astype(np.int16) - expected.astype(np.int16)).mean()
+            assert difference < 2, f"{name} frame {index}: mean difference {difference:.1f}"
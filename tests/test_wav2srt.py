@@ -0,0 +1,90 @@
+import os
+import subprocess
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def sample_audio(tmp_path_factory, ffmpeg_path):
+    """20s 44.1kHz stereo tone as WAV and MP3."""
+    directory = tmp_path_factory.mktemp("audio")
+    paths = {}
+    for extension, codec_args in ((".wav", ["-c:a", "pcm_s16le"]), (".mp3", ["-c:a", "libmp3lame", "-b:a", "128k"])):
+        paths[extension] = str(directory / f"tone{extension}")
+        subprocess.run([ffmpeg_path, "-nostdin", "-v", "error", "-y",
+                        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100:duration=20", "-ac", "2"]
+                       + codec_args + [paths[extension]], check=True)
+    return paths
+
+
+@pytest.mark.parametrize("source, audio_codec, expected", [
+    (".mp3", "mp3", ".mp3"),            # 直接流复制
+    (".wav", "pcm_s16le", ".wav"),
+    (".wav", "wmav2", ".flac"),         # 没有对应容器，压缩为FLAC
+    (".wav", "mp3", ".flac"),           # 流复制失败时回退
+    (".mp3", None, ".flac"),
+])
+def test_extract_chunk_container(luma, ffmpeg_path, sample_audio, tmp_path, source, audio_codec, expected):
+    wav2srt = luma("wav2srt")
+    chunk = {"start": 5.0, "end": 15.0}
+    path = wav2srt.Wav2Srt.extract_chunk(ffmpeg_path, sample_audio[source], chunk, str(tmp_path / "chunk"),
+                                         audio_codec)
+    assert os.path.splitext(path)[1] == expected
+    duration = luma("ffmpeg_utils").media_duration(path)
+    assert duration == pytest.approx(10.0, abs=0.1)
+    if expected == ".mp3":
+        # 流复制的分块和原文件码率相同，而不是解码成PCM
+        assert os.path.getsize(path) < os.path.getsize(sample_audio[".mp3"]) * 0.6
+
+
+def test_subtitle_file_rewritten_after_new_transcription(luma, sample_audio, monkeypatch):
+    wav2srt = luma("wav2srt")
+    node = wav2srt.Wav2Srt()
+    responses = [
+        [{"id": 1, "start": 0.0, "end": 1.0, "text": "first"}],
+        [{"id": 1, "start": 0.0, "end": 1.0, "text": "second"}],
+    ]
+    calls = []
+    monkeypatch.setattr(node, "wav2srt_api", lambda *args, **kwargs: calls.append(1) or responses[len(calls) - 1])
+
+    _, path, _ = node.wav2srt(sample_audio[".wav"], "http://asr.invalid/api", chunk_seconds=0)
+    _, cached_path, _ = node.wav2srt(sample_audio[".wav"], "http://asr.invalid/api", chunk_seconds=0)
+    assert cached_path == path and len(calls) == 1
+
+    # 识别缓存被清掉后重新识别，同名字幕文件要写入新结果
+    wav2srt.get_transcription_cache().clear()
+    _, new_path, _ = node.wav2srt(sample_audio[".wav"], "http://asr.invalid/api", chunk_seconds=0)
+    assert new_path == path and len(calls) == 2
+    with open(new_path, encoding="utf-8") as f:
+        assert "second" in f.read()
+
+
+def test_plan_chunks_cuts_at_silence(luma):
+    plan_chunks = luma("wav2srt").Wav2Srt.plan_chunks
+    chunks = plan_chunks(100.0, [(27.0, 29.0), (55.0, 56.0)], chunk_seconds=30, overlap_seconds=2)
+    assert [(c["keep_start"], c["keep_end"]) for c in chunks] == [(0.0, 28.0), (28.0, 55.5), (55.5, 85.5), (85.5, 100.0)]
+    assert chunks[0]["start"] == 0.0 and chunks[1]["start"] == 26.0 and chunks[-1]["end"] == 100.0
+    assert plan_chunks(30.0, [], chunk_seconds=30, overlap_seconds=2) == [
+        {"start": 0.0, "end": 30.0, "keep_start": 0.0, "keep_end": 30.0}]
+
+
+def test_merge_chunk_subtitles_offsets_and_dedup(luma):
+    node = luma("wav2srt").Wav2Srt()
+    chunks = [
+        {"start": 0.0, "end": 32.0, "keep_start": 0.0, "keep_end": 30.0},
+        {"start": 28.0, "end": 60.0, "keep_start": 30.0, "keep_end": 60.0},
+    ]
+    results = [
+        [{"id": 1, "start": 1.0, "end": 3.0, "text": "a"},
+         {"id": 2, "start": 28.5, "end": 30.5, "text": "b"},         # 中点29.5，归第一块
+         {"id": 3, "start": 30.5, "end": 31.9, "text": "c"}],        # 重叠区，归第二块
+        [{"id": 1, "start": "00:00:00,500", "end": "00:00:02,500", "text": "b"},
+         {"id": 2, "start": "00:00:02,500", "end": "00:00:03,900", "text": "c"},
+         {"id": 3, "start": "00:00:30,000", "end": "00:00:31,000", "text": "d"}],   # 最后一块保留到结尾
+    ]
+    merged = node.merge_chunk_subtitles(chunks, results)
+    assert [(s["id"], s["text"]) for s in merged] == [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+    assert merged[1]["start"] == 28.5
+    # 时间字段保持API返回的类型，并平移到全局时间
+    assert merged[2]["start"] == "00:00:30,500" and merged[2]["end"] == "00:00:31,900"
+    assert merged[3]["end"] == "00:00:59,000"
@@ -0,0 +1,62 @@
+import os
+import json
+import hashlib
+import threading
+
+from .file_cache import LRUFileCache, file_content_hash, get_cache_dir
+
+# 识别结果缓存的大小上限和有效期，可通过环境变量调整（0 表示不限制）
+DEFAULT_MAX_MB = 512
+DEFAULT_MAX_AGE_DAYS = 30
+INDEX_NAME = ".luma_wav2srt_cache.json"
+
+
+class TranscriptionCache(LRUFileCache):
+    """Wav2Srt 的识别结果缓存：键由音频内容哈希、API地址和识别参数决定，值为字幕JSON"""
+
+    metrics_name = "transcription"
+
+    @staticmethod
+    def make_key(audio_path, api_url, params):
+        payload = json.dumps(
+            {"audio": file_content_hash(audio_path), "api_url": api_url, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, key):
+        """返回缓存的字幕列表，未命中或文件损坏时返回 None"""
+        paths = self.get(key)
+        if not paths:
+            return None
+        try:
+            with open(paths[0], "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            self.remove(key)
+            return None
+
+    def store(self, key, subtitles):
+        path = self._abs(f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(subtitles, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.put(key, [path])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcription_cache():
+    """返回进程级的识别结果缓存（位于持久缓存目录的 wav2srt 子目录）"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            max_mb = int(os.environ.get("LUMA_WAV2SRT_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            max_age_days = float(os.environ.get("LUMA_WAV2SRT_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+            _cache = TranscriptionCache(get_cache_dir("wav2srt"), INDEX_NAME,
+                                        max_bytes=max_mb * 1024 * 1024, max_age=max_age_days * 86400)
+        return _cache
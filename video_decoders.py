@@ -0,0 +1,380 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+try:
+    import av
+except ImportError:
+    av = None
+
+from .ffmpeg_utils import find_ffmpeg, probe_media
+from .file_cache import get_cache_dir
+
+
+class VideoDecoder:
+    """Common interface of the frame decoders used by LoadVideoByUrl.
+
+    Subclasses expose ``fps``, ``frame_count`` (0 when unknown) and yield RGB
+    uint8 frames of shape [H, W, 3] from ``frames``.
+    """
+
+    name = None
+
+    def __init__(self, path, threads=0):
+        self.path = path
+        self.threads = threads
+        self.fps = 0.0
+        self.frame_count = 0
+
+    @classmethod
+    def available(cls):
+        return False
+
+    def frames(self, start_frame, end_frame, step):
+        """Yield every ``step``-th frame in [start_frame, end_frame); ``end_frame <= 0`` reads to EOF."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class OpenCVDecoder(VideoDecoder):
+    name = "opencv"
+
+    def __init__(self, path, threads=0):
+        super().__init__(path, threads)
+        params = []
+        # Decoder thread count (0 lets the FFmpeg backend choose); needs OpenCV >= 4.6
+        if threads > 0 and hasattr(cv2, "CAP_PROP_N_THREADS"):
+            params = [cv2.CAP_PROP_N_THREADS, threads]
+        self.cap = cv2.VideoCapture(path, cv2.CAP_ANY, params) if params else cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+             raise RuntimeError(f"Failed to open video file: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = max(0, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+
+    @classmethod
+    def available(cls):
+        return cv2 is not None
+
+    def _seek(self, start_frame):
+        """Position on ``start_frame``, falling back to grabbing frames if seeking fails."""
+        if start_frame <= 0:
+            return True
+        if self.cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame) and int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == start_frame:
+            return True
+        # Some containers don't support random access; skip without decoding to RGB
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for _ in range(start_frame):
+            if not self.cap.grab():
+                return False
+        return True
+
+    def frames(self, start_frame, end_frame, step):
+        if not self._seek(start_frame):
+            return
+        index = start_frame
+        while end_frame <= 0 or index < end_frame:
+            ret, frame = self.cap.read()
+            if not ret:
+                return
+            # Convert BGR to RGB
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+
+            # Skip intermediate frames without decoding them
+            for _ in range(step - 1):
+                if not self.cap.grab():
+                    return
+                index += 1
+
+    def close(self):
+        self.cap.release()
+
+
+class PyAVDecoder(VideoDecoder):
+    name = "pyav"
+
+    def __init__(self, path, threads=0):
+        super().__init__(path, threads)
+        self.container = av.open(path)
+        if not self.container.streams.video:
+            self.container.close()
+            raise RuntimeError(f"No video stream found in: {path}")
+        self.stream = self.container.streams.video[0]
+        # Frame- and slice-threaded decoding
+        self.stream.thread_type = "AUTO"
+        if threads > 0:
+            self.stream.codec_context.thread_count = threads
+        rate = self.stream.average_rate or self.stream.guessed_rate
+        self.fps = float(rate) if rate else 0.0
+        self.frame_count = max(0, int(self.stream.frames or 0))
+
+    @classmethod
+    def available(cls):
+        return av is not None
+
+    def _frame_index(self, frame):
+        if frame.pts is None or not self.fps:
+            return None
+        start = self.stream.start_time or 0
+        return int(round(float((frame.pts - start) * self.stream.time_base) * self.fps))
+
+    def frames(self, start_frame, end_frame, step):
+        if start_frame > 0 and self.fps:
+            # Jump to the keyframe before start_frame, then decode forward
+            start = self.stream.start_time or 0
+            target_pts = start + int(start_frame / self.fps / self.stream.time_base)
+            self.container.seek(target_pts, stream=self.stream, backward=True, any_frame=False)
+            counter = None
+        else:
+            counter = 0
+
+        for frame in self.container.decode(self.stream):
+            if counter is None:
+                index = self._frame_index(frame)
+                if index is None:
+                    # No timestamps: restart from the beginning and count frames
+                    self.container.seek(0, stream=self.stream)
+                    yield from self._count_frames(start_frame, end_frame, step)
+                    return
+            else:
+                index = counter
+                counter += 1
+
+            if end_frame > 0 and index >= end_frame:
+                return
+            if index >= start_frame and (index - start_frame) % step == 0:
+                # Only selected frames pay for the colorspace conversion
+                yield frame.to_ndarray(format="rgb24")
+
+    def _count_frames(self, start_frame, end_frame, step):
+        for index, frame in enumerate(self.container.decode(self.stream)):
+            if end_frame > 0 and index >= end_frame:
+                return
+            if index >= start_frame and (index - start_frame) % step == 0:
+                yield frame.to_ndarray(format="rgb24")
+
+    def close(self):
+        self.container.close()
+
+
+class FFmpegPipeDecoder(VideoDecoder):
+    name = "ffmpeg"
+
+    def __init__(self, path, threads=0):
+        super().__init__(path, threads)
+        self.ffmpeg_path = find_ffmpeg()
+        info = probe_media(path, self.ffmpeg_path)
+        video = info["video"]
+        if video is None:
+            raise RuntimeError(f"No video stream found in: {path}")
+        self.width, self.height = video["width"], video["height"]
+        if abs(video["rotation"]) % 180 == 90:
+            # ffmpeg applies the display rotation on output
+            self.width, self.height = self.height, self.width
+        if not self.width or not self.height:
+            raise RuntimeError(f"Failed to determine the frame size of: {path}")
+        self.fps = video["fps"]
+        self.frame_count = video["frame_count"]
+        self.process = None
+
+    @classmethod
+    def available(cls):
+        return np is not None and find_ffmpeg() is not None
+
+    def frames(self, start_frame, end_frame, step):
+        cmd = [self.ffmpeg_path, "-nostdin", "-v", "error", "-threads", str(self.threads)]
+        if start_frame > 0 and self.fps:
+            cmd.extend(["-ss", f"{start_frame / self.fps:.6f}"])
+        cmd.extend(["-i", self.path, "-map", "0:v:0"])
+        if step > 1:
+            cmd.extend(["-vf", f"select=not(mod(n\\,{step}))", "-vsync", "0"])
+        if end_frame > 0:
+            cmd.extend(["-frames:v", str((end_frame - start_frame + step - 1) // step)])
+        cmd.extend(["-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"])
+
+        frame_bytes = self.width * self.height * 3
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        bufsize=frame_bytes, env=os.environ.copy())
+        try:
+            while True:
+                # A fresh writable buffer per frame, since callers may keep frames around
+                buffer = bytearray(frame_bytes)
+                view = memoryview(buffer)
+                filled = 0
+                while filled < frame_bytes:
+                    count = self.process.stdout.readinto(view[filled:])
+                    if not count:
+                        return
+                    filled += count
+                yield np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, self.width, 3)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+
+DECODERS = {
+    decoder.name: decoder for decoder in (PyAVDecoder, FFmpegPipeDecoder, OpenCVDecoder)
+}
+
+# Fallback order for "auto" when the backends cannot be measured (e.g. no ffmpeg to
+# generate the calibration clip): threaded in-process decode, then the ffmpeg pipe, then OpenCV
+AUTO_ORDER = ["pyav", "ffmpeg", "opencv"]
+
+# Calibration clip used to rank the backends for "auto"
+CALIBRATION_SIZE = (1280, 720)
+CALIBRATION_FRAMES = 30
+ORDER_CACHE_NAME = "video_decoder_order.json"
+
+_auto_order = None
+_auto_order_lock = threading.Lock()
+
+
+def available_decoders():
+    return [name for name in AUTO_ORDER if DECODERS[name].available()]
+
+
+def _environment_key():
+    """Identifies the installed backends; the cached ranking is redone when any of them changes."""
+    parts = [f"cpu={os.cpu_count()}"]
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path:
+        stat = os.stat(ffmpeg_path)
+        parts.append(f"ffmpeg={os.path.realpath(ffmpeg_path)}:{stat.st_size}:{int(stat.st_mtime)}")
+    if av is not None:
+        parts.append(f"av={av.__version__}")
+    if cv2 is not None:
+        parts.append(f"cv2={cv2.__version__}")
+    return "|".join(parts)
+
+
+def _read_order_cache():
+    try:
+        with open(os.path.join(get_cache_dir(), ORDER_CACHE_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_auto_order(fps_by_backend):
+    """Store a measured {backend: frames per second} ranking as the "auto" order for this machine."""
+    global _auto_order
+    order = sorted(fps_by_backend, key=fps_by_backend.get, reverse=True)
+    cache = _read_order_cache()
+    cache[_environment_key()] = {"order": order, "fps": fps_by_backend, "measured_at": time.time()}
+    path = os.path.join(get_cache_dir(), ORDER_CACHE_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: failed to write decoder ranking {path}: {e}")
+    with _auto_order_lock:
+        _auto_order = order
+    return order
+
+
+def measure_decoders(names=None, threads=0):
+    """Decode a generated H.264 clip with each backend and return {backend: frames per second}."""
+    ffmpeg_path = find_ffmpeg()
+    if not ffmpeg_path:
+        raise RuntimeError("ffmpeg is required to generate the calibration clip")
+    names = names or available_decoders()
+    temp_dir = tempfile.mkdtemp(prefix="luma_decoders_")
+    try:
+        clip = os.path.join(temp_dir, "calibration.mp4")
+        width, height = CALIBRATION_SIZE
+        subprocess.run([ffmpeg_path, "-nostdin", "-v", "error", "-y", "-f", "lavfi",
+                        "-i", f"testsrc2=size={width}x{height}:rate=30", "-frames:v", str(CALIBRATION_FRAMES),
+                        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", clip],
+                       check=True, capture_output=True, env=os.environ.copy())
+        fps = {}
+        for name in names:
+            best = None
+            # The first pass absorbs one-off costs (imports, codec init, page cache)
+            for _ in range(2):
+                start = time.perf_counter()
+                with DECODERS[name](clip, threads) as decoder:
+                    count = sum(1 for _ in decoder.frames(0, 0, 1))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            if count:
+                fps[name] = count / best
+        return fps
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def auto_order():
+    """Backends in the order "auto" tries them: fastest first as measured on this machine.
+
+    The ranking is measured once (a few seconds) and cached on disk per set of
+    installed backends; benchmarks/bench_video_decoders.py --save-auto-order
+    replaces it with a fuller measurement. Falls back to AUTO_ORDER.
+    """
+    global _auto_order
+    with _auto_order_lock:
+        if _auto_order is not None:
+            return _auto_order
+        cached = _read_order_cache().get(_environment_key())
+        if cached:
+            _auto_order = cached["order"]
+            return _auto_order
+
+    available = available_decoders()
+    if len(available) < 2:
+        order = available
+    else:
+        try:
+            return save_auto_order(measure_decoders(available))
+        except Exception as e:
+            print(f"Warning: failed to rank video decoders, using the default order: {e}")
+            order = available
+    with _auto_order_lock:
+        _auto_order = order
+    return order
+
+
+def open_decoder(path, backend="auto", threads=0):
+    """Open ``path`` with the requested backend, or the fastest available one for "auto"."""
+    if backend == "auto":
+        names = [name for name in auto_order() if DECODERS[name].available()] or available_decoders()
+        if not names:
+            raise ImportError("No video decoder available. Please install opencv-python or av, or put ffmpeg on PATH")
+        backend = names[0]
+
+    decoder_class = DECODERS.get(backend)
+    if decoder_class is None:
+        raise ValueError(f"Unknown video decoder: {backend}")
+    if not decoder_class.available():
+        raise ImportError(f"Video decoder '{backend}' is not available in this environment")
+    return decoder_class(path, threads)
@@ -1,8 +1,10 @@
 import os
 import json
-import time
-import random
+import shutil
+import tempfile
+import subprocess
 import folder_paths
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import List, Dict, Any
 
 try:
@@ -11,6 +13,39 @@ try:
 except ImportError:
     HAS_REQUESTS = False
 
+try:
+    import comfy.utils
+    import comfy.model_management
+except ImportError:
+    comfy = None
+
+from . import metrics
+from .ffmpeg_utils import find_ffmpeg, media_duration, detect_silences, has_encoder, stream_audio, probe_media
+from .ffmpeg_runner import processing_interrupted
+from .http_session import MultipartStream, upload_with_retries
+from .result_cache import input_file_hash
+from .transcription_cache import get_transcription_cache
+from .subtitles import SubtitleTrack, parse_time, format_time
+
+# 在目标切分点之前多大范围内寻找静音（占分块时长的比例），最后一块最长为 (1 + 该比例) 倍分块时长
+SILENCE_SEARCH_RATIO = 0.25
+
+# 上传前的音频压缩格式：格式 -> (ffmpeg编码参数, 容器格式, 扩展名, MIME类型)
+UPLOAD_FORMATS = {
+    "flac": (["-c:a", "flac"], "flac", ".flac", "audio/flac"),
+    "opus": (["-c:a", "libopus", "-b:a", "32k", "-application", "voip"], "ogg", ".ogg", "audio/ogg"),
+}
+
+# 上传原文件并分块时，这些编码的分块直接流复制到对应容器（不解码、体积与原文件相当）：编码 -> 扩展名
+CHUNK_COPY_CONTAINERS = {
+    "mp3": ".mp3",
+    "aac": ".m4a",
+    "alac": ".m4a",
+    "flac": ".flac",
+    "opus": ".opus",
+    "vorbis": ".ogg",
+}
+
 
 class Wav2Srt:
     @classmethod
@@ -19,6 +54,20 @@ class Wav2Srt:
             "required": {
                 "audio_path": ("STRING", {"default": "", "multiline": False}),
                 "api_url": ("STRING", {"default": "http://localhost:8080/v1/api/wav2SrtEntry", "multiline": False}),
+            },
+            "optional": {
+                # 长音频按静音位置切成约 chunk_seconds 秒的分块并发识别，0 表示整段上传
+                "chunk_seconds": ("INT", {"default": 600, "min": 0, "max": 7200}),
+                # 相邻分块的重叠时长，避免切点附近的句子被截断
+                "overlap_seconds": ("FLOAT", {"default": 2.0, "min": 0.0, "max": 60.0, "step": 0.5}),
+                "max_concurrency": ("INT", {"default": 4, "min": 1, "max": 32}),
+                # 上传前用ffmpeg重采样并压缩（边转码边上传），original 表示上传原文件
+                "upload_format": (["original", "flac", "opus"], {"default": "original"}),
+                # 识别只需要16kHz单声道；0 表示保持原始采样率/声道数
+                "upload_sample_rate": ("INT", {"default": 16000, "min": 0, "max": 192000}),
+                "upload_channels": ("INT", {"default": 1, "min": 0, "max": 8}),
+                # 输出字幕文件格式，jsonl 为每行一条字幕的JSON
+                "subtitle_format": (["srt", "vtt", "jsonl"], {"default": "srt"}),
             }
         }
 
@@ -27,118 +76,327 @@ class Wav2Srt:
     FUNCTION = "wav2srt"
     CATEGORY = "Luma"
 
+    @classmethod
+    def IS_CHANGED(s, audio_path, **kwargs):
+        # 按文件内容判断，而不是路径或修改时间
+        return input_file_hash(audio_path)
+
     def convert_time_to_srt_format(self, seconds: float) -> str:
         """将秒数转换为SRT时间格式 (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+        return format_time(seconds)
 
     def parse_time_to_seconds(self, time_str: str) -> float:
         """将时间字符串转换为秒数，支持多种格式"""
-        if isinstance(time_str, (int, float)):
-            return float(time_str)
-        
-        time_str = str(time_str).strip()
-        
-        # 尝试解析 ISO 格式 (HH:MM:SS.mmm 或 HH:MM:SS,mmm)
-        if ':' in time_str:
-            parts = time_str.replace(',', '.').split(':')
-            if len(parts) == 3:
-                hours = float(parts[0])
-                minutes = float(parts[1])
-                seconds = float(parts[2])
-                return hours * 3600 + minutes * 60 + seconds
-        
-        # 尝试直接解析为数字
-        try:
-            return float(time_str)
-        except ValueError:
-            return 0.0
+        return parse_time(time_str)
 
-    def subtitles_to_srt(self, subtitles: List[Dict[str, Any]], output_path: str):
-        """将字幕数据转换为SRT格式文件"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for subtitle in subtitles:
-                idx = subtitle.get("id", subtitle.get("ID", 0))
-                start_time = subtitle.get("start", subtitle.get("Start", "00:00:00.000"))
-                end_time = subtitle.get("end", subtitle.get("End", "00:00:00.000"))
-                text = subtitle.get("text", subtitle.get("Text", ""))
-                
-                # 转换时间格式
-                start_seconds = self.parse_time_to_seconds(start_time)
-                end_seconds = self.parse_time_to_seconds(end_time)
-                
-                start_srt = self.convert_time_to_srt_format(start_seconds)
-                end_srt = self.convert_time_to_srt_format(end_seconds)
-                
-                # 写入SRT格式
-                f.write(f"{idx}\n")
-                f.write(f"{start_srt} --> {end_srt}\n")
-                f.write(f"{text}\n\n")
+    def subtitles_to_srt(self, subtitles: List[Dict[str, Any]], output_path: str, subtitle_format: str = "srt"):
+        """将字幕数据写入字幕文件（srt/vtt/jsonl），时间批量转换、分批写入"""
+        SubtitleTrack.from_subtitles(subtitles).write(output_path, subtitle_format)
+
+    def wav2srt_api(self, audio_path: str, api_url: str, upload: Dict[str, Any] = None,
+                    start: float = 0.0, duration: float = None, filename: str = None,
+                    on_progress=None) -> List[Dict[str, Any]]:
+        """通过API调用进行语音转字幕
 
-    def wav2srt_api(self, audio_path: str, api_url: str) -> List[Dict[str, Any]]:
-        """通过API调用进行语音转字幕"""
+        upload 为 {"format", "sample_rate", "channels"} 时先用ffmpeg转码，边转码边上传；
+        start/duration 只对转码上传有效，用于直接上传长音频的一段。
+        请求体流式发送，连接失败和 429/502/503/504 会按指数退避重试；
+        on_progress(已发送字节, 总字节或None) 报告上传进度。
+        """
         if not HAS_REQUESTS:
             raise RuntimeError("需要安装 requests 库: pip install requests")
         
         if not os.path.exists(audio_path):
             raise ValueError(f"音频文件不存在: {audio_path}")
-        
+
+        if upload:
+            codec_args, container, extension, content_type = UPLOAD_FORMATS[upload["format"]]
+            name = (filename or os.path.splitext(os.path.basename(audio_path))[0]) + extension
+
+            def source():
+                return stream_audio(audio_path, codec_args, container, upload["sample_rate"], upload["channels"],
+                                    start=start, duration=duration)
+        else:
+            # 原文件大小已知，请求带 Content-Length
+            name, content_type, source = os.path.basename(audio_path), 'audio/*', audio_path
+
+        def make_body():
+            # 每次重试都重新生成请求体（转码管道只能读取一次）
+            return MultipartStream([("file", name, content_type, source)], on_progress=on_progress)
+
         try:
-            with open(audio_path, 'rb') as f:
-                files = {'file': (os.path.basename(audio_path), f, 'audio/*')}
-                response = requests.post(api_url, files=files, timeout=300)
-                response.raise_for_status()
-                
-                result = response.json()
-                
-                # 处理API返回的数据格式
-                # 假设API返回格式: {"code": 200, "data": [...]} 或直接是数组
-                if isinstance(result, dict):
-                    if "data" in result:
-                        subtitles = result["data"]
-                    elif "result" in result:
-                        subtitles = result["result"]
-                    else:
-                        subtitles = result
+            response = upload_with_retries(api_url, make_body, timeout=300)
+            response.raise_for_status()
+            
+            result = response.json()
+            
+            # 处理API返回的数据格式
+            # 假设API返回格式: {"code": 200, "data": [...]} 或直接是数组
+            if isinstance(result, dict):
+                if "data" in result:
+                    subtitles = result["data"]
+                elif "result" in result:
+                    subtitles = result["result"]
                 else:
                     subtitles = result
-                
-                # 确保返回的是列表格式
-                if not isinstance(subtitles, list):
-                    subtitles = [subtitles] if subtitles else []
-                
-                return subtitles
+            else:
+                subtitles = result
+            
+            # 确保返回的是列表格式
+            if not isinstance(subtitles, list):
+                subtitles = [subtitles] if subtitles else []
+            
+            return subtitles
                 
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"API调用失败: {str(e)}")
 
-    def wav2srt(self, audio_path: str, api_url: str):
+    @staticmethod
+    def plan_chunks(duration: float, silences, chunk_seconds: float, overlap_seconds: float) -> List[Dict[str, float]]:
+        """按静音位置把音频切成约 chunk_seconds 秒的分块
+
+        返回 [{"start", "end", "keep_start", "keep_end"}, ...]：start/end 是带重叠的上传范围，
+        keep_start/keep_end 是该分块负责的区间，合并时字幕按中点归属到唯一的分块。
+        """
+        midpoints = [(start + end) / 2 for start, end in silences]
+        cuts = [0.0]
+        while duration - cuts[-1] > chunk_seconds * (1 + SILENCE_SEARCH_RATIO):
+            target = cuts[-1] + chunk_seconds
+            # 取目标切点之前最近的静音中点，找不到时直接在目标位置切
+            candidates = [m for m in midpoints if target - chunk_seconds * SILENCE_SEARCH_RATIO <= m <= target]
+            cuts.append(max(candidates) if candidates else target)
+        cuts.append(duration)
+
+        return [
+            {
+                "start": max(0.0, keep_start - overlap_seconds),
+                "end": min(duration, keep_end + overlap_seconds),
+                "keep_start": keep_start,
+                "keep_end": keep_end,
+            }
+            for keep_start, keep_end in zip(cuts, cuts[1:])
+        ]
+
+    def shift_subtitle(self, subtitle: Dict[str, Any], offset: float):
+        """返回 (平移后的字幕, 开始秒数, 结束秒数)，时间字段保持API返回的类型"""
+        shifted = dict(subtitle)
+        times = []
+        for keys in (("start", "Start"), ("end", "End")):
+            key = next((k for k in keys if k in subtitle), keys[0])
+            value = subtitle.get(key, 0.0)
+            seconds = self.parse_time_to_seconds(value) + offset
+            shifted[key] = seconds if isinstance(value, (int, float)) else self.convert_time_to_srt_format(seconds)
+            times.append(seconds)
+        return shifted, times[0], times[1]
+
+    def merge_chunk_subtitles(self, chunks: List[Dict[str, float]], results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """把各分块的字幕平移到全局时间并去掉重叠部分的重复字幕，重新编号"""
+        merged = []
+        last = len(chunks) - 1
+        for index, (chunk, subtitles) in enumerate(zip(chunks, results)):
+            for subtitle in subtitles:
+                shifted, start, end = self.shift_subtitle(subtitle, chunk["start"])
+                middle = (start + end) / 2
+                if middle < chunk["keep_start"] or (middle >= chunk["keep_end"] and index != last):
+                    # 属于相邻分块负责的区间
+                    continue
+                merged.append((start, shifted))
+
+        merged.sort(key=lambda item: item[0])
+        subtitles = []
+        for number, (_, subtitle) in enumerate(merged, 1):
+            for key in ("id", "ID"):
+                if key in subtitle:
+                    subtitle[key] = number
+            subtitles.append(subtitle)
+        return subtitles
+
+    @staticmethod
+    def extract_chunk(ffmpeg_path: str, audio_path: str, chunk: Dict[str, float], output_stem: str,
+                      audio_codec: str = None) -> str:
+        """用ffmpeg截取分块音频（输入端定位），返回分块文件路径
+
+        源编码能放进独立容器时直接流复制；否则无损压缩为FLAC，都失败时才输出WAV。
+        """
+        attempts = []
+        if audio_codec in CHUNK_COPY_CONTAINERS:
+            attempts.append((["-c:a", "copy"], CHUNK_COPY_CONTAINERS[audio_codec]))
+        elif audio_codec and audio_codec.startswith("pcm_"):
+            attempts.append((["-c:a", "copy"], ".wav"))
+        attempts.append((["-c:a", "flac"], ".flac"))
+        attempts.append((["-c:a", "pcm_s16le"], ".wav"))
+
+        error = None
+        for codec_args, extension in attempts:
+            output_path = output_stem + extension
+            cmd = [
+                ffmpeg_path, "-nostdin", "-v", "error", "-y",
+                "-ss", f"{chunk['start']:.3f}",
+                "-t", f"{chunk['end'] - chunk['start']:.3f}",
+                "-i", audio_path,
+                "-map", "0:a:0", "-vn",
+            ] + codec_args + [output_path]
+            result = subprocess.run(cmd, capture_output=True, text=True, errors="replace", env=os.environ.copy())
+            if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                return output_path
+            error = result.stderr
+            if os.path.exists(output_path):
+                os.remove(output_path)
+        raise RuntimeError(f"FFmpeg 截取音频失败: {error}")
+
+    def wav2srt_chunked(self, audio_path: str, api_url: str, duration: float, chunk_seconds: float,
+                        overlap_seconds: float, max_concurrency: int, upload: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """长音频按静音切块后并发调用API，再合并为一个字幕列表"""
+        ffmpeg_path = find_ffmpeg()
+        with metrics.stage("silence_detection"):
+            silences = detect_silences(audio_path, ffmpeg_path=ffmpeg_path)
+        chunks = self.plan_chunks(duration, silences, chunk_seconds, overlap_seconds)
+        print(f"Wav2Srt: 音频时长 {duration:.1f}s，切分为 {len(chunks)} 块，并发数 {max_concurrency}")
+
+        # 每块的结果单独缓存：中途失败后重新执行时，已完成的分块不会重新上传
+        cache = get_transcription_cache()
+        chunk_keys = [
+            cache.make_key(audio_path, api_url, {"chunk": [chunk["start"], chunk["end"]], "upload": upload})
+            for chunk in chunks
+        ]
+        results = [cache.load(key) for key in chunk_keys]
+        remaining = [index for index, result in enumerate(results) if result is None]
+        if len(remaining) < len(chunks):
+            print(f"Wav2Srt: {len(chunks) - len(remaining)} 块已有识别结果，继续识别剩余 {len(remaining)} 块")
+
+        # 上传原文件时分块先截取到临时目录，能流复制时保持源编码
+        temp_dir, audio_codec = None, None
+        if not upload:
+            temp_dir = tempfile.mkdtemp(prefix="luma_wav2srt_", dir=folder_paths.get_temp_directory())
+            try:
+                audio = probe_media(audio_path, ffmpeg_path)["audio"]
+                audio_codec = audio["codec"] if audio else None
+            except Exception:
+                pass
+
+        def transcribe(index):
+            subtitles = transcribe_chunk(index)
+            cache.store(chunk_keys[index], subtitles)
+            return subtitles
+
+        def transcribe_chunk(index):
+            chunk = chunks[index]
+            if upload:
+                # 直接从原文件转码上传这一段，不需要中间文件
+                return self.wav2srt_api(audio_path, api_url, upload, start=chunk["start"],
+                                        duration=chunk["end"] - chunk["start"], filename=f"chunk_{index:04d}")
+            with metrics.stage("extract_chunk"):
+                chunk_path = self.extract_chunk(ffmpeg_path, audio_path, chunk,
+                                                os.path.join(temp_dir, f"chunk_{index:04d}"), audio_codec)
+            try:
+                return self.wav2srt_api(chunk_path, api_url)
+            finally:
+                os.remove(chunk_path)
+
+        progress_bar = comfy.utils.ProgressBar(len(chunks)) if comfy is not None else None
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                futures = {executor.submit(metrics.bind(transcribe), index): index for index in remaining}
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = futures[future]
+                        try:
+                            results[index] = future.result()
+                        except Exception as e:
+                            for other in pending:
+                                other.cancel()
+                            chunk = chunks[index]
+                            raise RuntimeError(f"第 {index + 1} 块 ({chunk['start']:.1f}s - {chunk['end']:.1f}s) 识别失败: {e}")
+                    if progress_bar is not None:
+                        progress_bar.update_absolute(sum(1 for r in results if r is not None), len(chunks))
+                    if processing_interrupted():
+                        # 取消排队中的分块，正在上传的请求结束后退出
+                        for future in pending:
+                            future.cancel()
+                        comfy.model_management.throw_exception_if_processing_interrupted()
+        finally:
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return self.merge_chunk_subtitles(chunks, results)
+
+    @staticmethod
+    def upload_progress():
+        """返回在ComfyUI进度条上显示上传进度的回调（总大小未知时不显示）"""
+        if comfy is None:
+            return None
+        progress_bar = comfy.utils.ProgressBar(100)
+        last = [-1]
+
+        def on_progress(sent, total):
+            percent = int(sent * 100 / total) if total else None
+            if percent is not None and percent != last[0]:
+                last[0] = percent
+                progress_bar.update_absolute(percent, 100)
+        return on_progress
+
+    @metrics.instrument
+    def wav2srt(self, audio_path: str, api_url: str, chunk_seconds: int = 600, overlap_seconds: float = 2.0,
+                max_concurrency: int = 4, upload_format: str = "original", upload_sample_rate: int = 16000,
+                upload_channels: int = 1, subtitle_format: str = "srt"):
         """主函数：语音转字幕"""
         if not audio_path or not os.path.exists(audio_path):
             raise ValueError(f"音频文件不存在: {audio_path}")
+
+        upload = None
+        if upload_format != "original":
+            if not find_ffmpeg():
+                raise RuntimeError("音频压缩上传需要 ffmpeg，请安装 FFmpeg 或将 upload_format 设为 original")
+            if upload_format == "opus" and not has_encoder("libopus"):
+                raise RuntimeError("当前 ffmpeg 不支持 libopus 编码，请将 upload_format 设为 flac")
+            upload = {"format": upload_format, "sample_rate": upload_sample_rate, "channels": upload_channels}
         
-        # 调用API获取字幕
-        subtitles = self.wav2srt_api(audio_path, api_url)
+        duration = media_duration(audio_path) if chunk_seconds > 0 and find_ffmpeg() else None
+        chunked = bool(duration) and duration > chunk_seconds * (1 + SILENCE_SEARCH_RATIO)
+
+        # 相同音频内容、API和切块参数已经识别过时直接使用缓存结果，不再上传
+        cache = get_transcription_cache()
+        cache_key = cache.make_key(audio_path, api_url, {
+            "chunk_seconds": chunk_seconds if chunked else 0,
+            "overlap_seconds": overlap_seconds if chunked else 0,
+            "upload": upload,
+        })
+        subtitles = cache.load(cache_key)
+        cached = subtitles is not None
+        if cached:
+            print("Wav2Srt: 命中识别结果缓存，跳过API调用")
+        else:
+            # 调用API获取字幕，长音频切块并发识别
+            if chunked:
+                subtitles = self.wav2srt_chunked(audio_path, api_url, duration, chunk_seconds,
+                                                 overlap_seconds, max_concurrency, upload)
+            else:
+                subtitles = self.wav2srt_api(audio_path, api_url, upload, on_progress=self.upload_progress())
+            cache.store(cache_key, subtitles)
         
-        # 转换为JSON字符串返回
-        subtitles_json = json.dumps(subtitles, ensure_ascii=False, indent=2)
+        # 转换为紧凑的JSON字符串返回
+        subtitles_json = json.dumps(subtitles, ensure_ascii=False, separators=(",", ":"))
         
         # 获取数组长度
         subtitles_count = len(subtitles)
+        metrics.count("subtitles", subtitles_count)
         
-        # 生成SRT文件
+        # 生成字幕文件
         output_dir = folder_paths.get_output_directory()
         os.makedirs(output_dir, exist_ok=True)
         
+        # 文件名由缓存键决定：命中识别缓存时复用已有的SRT文件；重新识别的结果可能不同
+        # （例如缓存条目过期后重新调用API），总是重写
         base_name = os.path.splitext(os.path.basename(audio_path))[0]
-        timestamp = int(time.time() * 1000)
-        random_suffix = random.randint(1000, 9999)
-        srt_file_path = os.path.join(output_dir, f"{base_name}_subtitle_{timestamp}_{random_suffix}.srt")
+        srt_file_path = os.path.join(output_dir, f"{base_name}_subtitle_{cache_key[:16]}.{subtitle_format}")
         
-        self.subtitles_to_srt(subtitles, srt_file_path)
+        if not cached or not os.path.exists(srt_file_path):
+            tmp_path = f"{srt_file_path}.{os.getpid()}.tmp"
+            with metrics.stage("write_subtitles"):
+                self.subtitles_to_srt(subtitles, tmp_path, subtitle_format)
+            os.replace(tmp_path, srt_file_path)
         
         return (subtitles_json, srt_file_path, subtitles_count)
 